@@ -0,0 +1,13 @@
+"""Admin password check shared by the admin routes, /metrics and the request profiler."""
+import hmac
+from typing import Optional
+
+from app.config import get_settings
+
+
+def is_admin_password(password: Optional[str]) -> bool:
+    """Whether `password` is ADMIN_PASSWORD; compared in constant time, and never when unset."""
+    expected = get_settings().admin_password
+    if not password or not expected:
+        return False
+    return hmac.compare_digest(password.encode("utf-8"), expected.encode("utf-8"))
@@ -0,0 +1,272 @@
+"""Per-request accounting of S3 operations and SQL statements.
+
+Every boto3 S3 call and every SQL statement made while a request is being
+served is counted and timed against that request. The totals go to the
+`request_io_calls` histogram and the `s3`/`sql` entries of `Server-Timing`;
+with `log_io_calls` on, each request also prints a one-line summary. The
+`X-IO-Calls: s3=2, sql=7` response header describes the backend's storage
+access, so it is only sent with `io_calls_header` on (tests, staging) or to
+requests carrying the admin password.
+
+Hot-path routes declare a budget in `ROUTE_BUDGETS`. A request that goes
+over it is logged and counted in `io_budget_exceeded`, and
+`assert_call_budget()` turns the same check into a failing assertion for
+tests (tests/test_call_budgets.py), so an extra round trip can't ship
+unnoticed.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import metrics
+from app.auth import is_admin_password
+from app.config import get_settings
+
+KINDS = ("s3", "sql")
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Most S3 operations / SQL statements one request may make (None: unchecked)."""
+    s3: Optional[int] = None
+    sql: Optional[int] = None
+
+
+# Keyed by "METHOD route template". Puzzle reads are cached, so the steady
+# state is no S3 calls; the allowance covers a cold cache (active id + puzzle).
+# SQL limits are what a first guess/hint costs a new player (key rows created,
+# guided hint shown); later requests make fewer. tests/test_call_budgets.py
+# drives every route here, so re-measure with it when changing a limit.
+ROUTE_BUDGETS: dict[str, Budget] = {
+    "GET /api/puzzle": Budget(s3=2, sql=0),
+    "GET /api/puzzle/{puzzle_id}": Budget(s3=2, sql=0),
+    "POST /api/puzzle/{puzzle_id}/guess": Budget(s3=2, sql=11),
+    "GET /api/puzzle/{puzzle_id}/hint": Budget(s3=2, sql=11),
+    "GET /api/puzzle/{puzzle_id}/attempts": Budget(s3=2, sql=3),
+    "GET /api/player/stats": Budget(s3=0, sql=2),
+    "GET /api/puzzle/{puzzle_id}/stats": Budget(s3=0, sql=2),
+}
+
+
+class IOUsage:
+    """S3 and SQL calls made on behalf of one request (or one `track()` block)."""
+
+    def __init__(self):
+        # Sync dependencies and to_thread work share this from other threads
+        self._lock = threading.Lock()
+        self.calls: list[tuple[str, str, float]] = []  # (kind, operation, seconds)
+
+    def add(self, kind: str, operation: str, seconds: float) -> None:
+        with self._lock:
+            self.calls.append((kind, operation, seconds))
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return sum(1 for k, _, _ in self.calls if k == kind)
+
+    def seconds(self, kind: str) -> float:
+        with self._lock:
+            return sum(s for k, _, s in self.calls if k == kind)
+
+    def operations(self, kind: str) -> dict[str, int]:
+        ops: dict[str, int] = {}
+        with self._lock:
+            for k, operation, _ in self.calls:
+                if k == kind:
+                    ops[operation] = ops.get(operation, 0) + 1
+        return ops
+
+    def header(self) -> str:
+        return ", ".join(f"{kind}={self.count(kind)}" for kind in KINDS)
+
+    def describe(self) -> str:
+        parts = []
+        for kind in KINDS:
+            ops = " ".join(f"{op}x{n}" for op, n in sorted(self.operations(kind).items()))
+            parts.append(f"{kind}={self.count(kind)} ({self.seconds(kind) * 1000:.1f}ms{': ' + ops if ops else ''})")
+        return " ".join(parts)
+
+    def over_budget(self, budget: Budget) -> list[str]:
+        """Human-readable descriptions of every limit exceeded; empty if within budget."""
+        problems = []
+        for kind in KINDS:
+            limit = getattr(budget, kind)
+            if limit is not None and self.count(kind) > limit:
+                problems.append(f"{kind}: {self.count(kind)} calls > budget {limit} ({self.operations(kind)})")
+        return problems
+
+
+_usage: ContextVar[Optional[IOUsage]] = ContextVar("io_usage", default=None)
+
+
+@contextmanager
+def track() -> Iterator[IOUsage]:
+    """Account the S3 and SQL calls made inside the block (outside a request too)."""
+    usage = IOUsage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def _add(kind: str, operation: str, seconds: float) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.add(kind, operation, seconds)
+        metrics.record(kind, seconds)
+
+
+# --- S3 (botocore events) --------------------------------------------------------
+
+def _s3_started(context, **kwargs):
+    if _usage.get() is not None:
+        context["io_started"] = time.perf_counter()
+
+
+def _s3_finished(model, context, **kwargs):
+    started = context.pop("io_started", None)
+    if started is not None:
+        _add("s3", model.name, time.perf_counter() - started)
+
+
+def _s3_failed(context, **kwargs):
+    # Transport errors; error responses (NoSuchKey, ...) still go through after-call
+    started = context.pop("io_started", None)
+    if started is not None:
+        _add("s3", "error", time.perf_counter() - started)
+
+
+def instrument_s3_client(client) -> None:
+    """Account every call this boto3 S3 client makes (one logical call, retries included)."""
+    events = client.meta.events
+    events.register("before-call.s3", _s3_started)
+    events.register("after-call.s3", _s3_finished)
+    events.register("after-call-error.s3", _s3_failed)
+
+
+# --- SQL (SQLAlchemy cursor events) ---------------------------------------------
+
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    if _usage.get() is not None:
+        conn.info.setdefault("io_started", []).append(time.perf_counter())
+
+
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("io_started")
+    if stack:
+        # First keyword is enough to tell reads from writes (SELECT, INSERT, PRAGMA, ...)
+        _add("sql", statement.lstrip().split(None, 1)[0].upper(), time.perf_counter() - stack.pop())
+
+
+def _sql_failed(exception_context):
+    stack = exception_context.connection.info.get("io_started") if exception_context.connection else None
+    if stack:
+        _add("sql", "error", time.perf_counter() - stack.pop())
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Account every statement executed on `engine`."""
+    event.listen(engine, "before_cursor_execute", _sql_started)
+    event.listen(engine, "after_cursor_execute", _sql_finished)
+    event.listen(engine, "handle_error", _sql_failed)
+
+
+# --- Metrics, middleware and the test helper ------------------------------------------
+
+IO_CALLS = metrics.Histogram(
+    "request_io_calls", "S3 operations and SQL statements per request", ["route", "kind"],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64),
+)
+BUDGET_EXCEEDED = metrics.Counter(
+    "io_budget_exceeded", "Requests that made more S3 or SQL calls than their route's budget", ["route", "kind"]
+)
+
+
+class CallBudgetMiddleware:
+    """Accounts each HTTP request's S3 and SQL calls and checks them against `ROUTE_BUDGETS`."""
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.log_all = settings.log_io_calls
+        self.header_for_all = settings.io_calls_header
+
+    def _send_header(self, scope) -> bool:
+        if self.header_for_all:
+            return True
+        password = dict(scope["headers"]).get(b"x-admin-password")
+        # Decoded the way FastAPI decodes the header for admin.verify_admin
+        return password is not None and is_admin_password(password.decode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        send_header = self._send_header(scope)
+
+        async def send_with_usage(message):
+            if send_header and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-io-calls", usage.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with track() as usage:
+            try:
+                await self.app(scope, receive, send_with_usage)
+            finally:
+                self._report(scope, usage)
+
+    def _report(self, scope, usage: IOUsage) -> None:
+        route = f"{scope['method']} {getattr(scope.get('route'), 'path', 'unmatched')}"
+        for kind in KINDS:
+            IO_CALLS.observe(usage.count(kind), route=route, kind=kind)
+        if self.log_all:
+            print(f"IO: {route} {usage.describe()}")
+        budget = ROUTE_BUDGETS.get(route)
+        if budget is None:
+            return
+        problems = usage.over_budget(budget)
+        for problem in problems:
+            BUDGET_EXCEEDED.inc(route=route, kind=problem.split(":", 1)[0])
+        if problems:
+            print(f"IO budget exceeded: {route} {'; '.join(problems)}")
+
+
+def parse_io_header(value: str) -> dict[str, int]:
+    """`"s3=2, sql=7"` -> `{"s3": 2, "sql": 7}`."""
+    counts = {}
+    for part in value.split(","):
+        kind, _, n = part.strip().partition("=")
+        if kind:
+            counts[kind] = int(n)
+    return counts
+
+
+def assert_call_budget(response, route: Optional[str] = None, s3: Optional[int] = None, sql: Optional[int] = None):
+    """Fail if `response` (from TestClient/httpx) made more calls than allowed.
+
+    Limits come from `s3`/`sql`, or from `ROUTE_BUDGETS[route]`
+    (e.g. route="POST /api/puzzle/{puzzle_id}/guess"). Returns the counts.
+    """
+    value = response.headers.get("x-io-calls")
+    assert value is not None, (
+        "response has no X-IO-Calls header (is CallBudgetMiddleware installed, with IO_CALLS_HEADER on?)"
+    )
+    counts = parse_io_header(value)
+    budget = ROUTE_BUDGETS[route] if route is not None else Budget()
+    limits = {"s3": s3 if s3 is not None else budget.s3, "sql": sql if sql is not None else budget.sql}
+    for kind, limit in limits.items():
+        if limit is not None:
+            assert counts.get(kind, 0) <= limit, (
+                f"{route or 'request'} made {counts.get(kind, 0)} {kind} calls, budget is {limit}"
+            )
+    return counts
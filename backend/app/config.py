@@ -6,6 +6,23 @@ class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str = ""
     embedding_model: str = "text-embedding-3-small"
+    # Embedding profile (services/profiles.py): request this many dimensions
+    # (0 = model default) and optionally score against int8 answer vectors.
+    # Puzzles without an entry for the profile are scored by truncating their
+    # full answer vectors if those came from the same model; otherwise the
+    # guess is judged by the LLM (fuzzy match if that fails too).
+    embedding_dimensions: int = 0
+    embedding_quantize: bool = False
+    # Model of the full answer vectors of puzzles saved before they recorded it
+    legacy_embedding_model: str = "text-embedding-3-small"
+    openai_base_url: str = "https://api.openai.com/v1"
+
+    # Outbound HTTP pool shared by all OpenAI calls
+    outbound_http2: bool = True
+    outbound_max_connections: int = 100
+    outbound_max_keepalive: int = 20
+    outbound_keepalive_expiry: float = 120.0  # seconds an idle connection is kept
+    outbound_connect_timeout: float = 5.0
 
     # AWS S3
     aws_access_key_id: str = ""
@@ -13,6 +30,7 @@ class Settings(BaseSettings):
     aws_region: str = "us-east-1"
     s3_bucket_name: str = ""
     s3_puzzle_prefix: str = "puzzles/"
+    s3_endpoint_url: str = ""  # S3-compatible endpoint instead of AWS (e.g. the load-test stand-in)
 
     # Game settings
     default_similarity_threshold: float = 0.85
@@ -20,6 +38,9 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = "sqlite:///./map_guessing.db"
+    database_read_url: str = ""  # Connection for admin exports; defaults to database_url
+    intern_guess_texts: bool = True  # Store guess/hint texts once in guess_texts
+    migrate_on_startup: bool = False  # Dev convenience; production runs `python -m app.db.migrate`
 
     # Admin
     admin_password: str = "change-me-in-production"
@@ -28,6 +49,104 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
 
+    # Multi-worker mode (gunicorn -c gunicorn.conf.py app.main:app)
+    web_workers: int = 0  # 0: one per CPU the container may use (affinity and cgroup quota)
+    web_preload: bool = True  # Import the app and load the current puzzle once, before forking
+    web_max_requests: int = 10000  # Recycle a worker after this many requests (0: never)
+    web_max_requests_jitter: int = 1000  # So workers don't all restart at once
+    web_timeout: int = 60  # Seconds a silent worker lives before it's killed and replaced
+    web_graceful_timeout: int = 30  # Seconds to finish in-flight requests on restart/shutdown
+    web_keepalive: int = 5
+    # Addresses allowed to set X-Forwarded-Proto/-For for the app (comma-separated, or *).
+    # Only the proxy in front of the app: anyone else could claim another scheme or address
+    forwarded_allow_ips: str = "127.0.0.1"
+
+    # Attempt archival (python -m app.jobs.archive_attempts)
+    archive_horizon_days: int = 90  # Archive attempts for puzzle dates older than this
+    archive_location: str = "local"  # "local" or "s3"
+    archive_dir: str = "./archive"
+    archive_s3_prefix: str = "archive/attempts/"
+    archive_cache_size: int = 8  # Archived puzzle files kept (compressed) in memory
+    archive_cache_ttl: float = 30.0  # Seconds before a cached archive file is checked for appends
+
+    # Puzzle statistics
+    stats_flush_interval: float = 30.0  # Seconds between flushes of per-worker aggregates
+    stats_cache_ttl: float = 30.0  # Seconds a stats summary is served from memory
+    stats_top_k: int = 10  # Wrong guesses listed in puzzle stats
+    stats_wrong_guess_min_count: int = 3  # Times a wrong guess must be made before it is listed
+
+    # Guess latency: hedge slow embedding calls, degrade when over budget
+    guess_latency_budget: float = 3.0  # Seconds a guess may spend waiting on embeddings
+    embedding_hedge_percentile: float = 0.95  # Hedge once the first call is slower than this
+    embedding_hedge_min_delay: float = 0.2  # Never hedge sooner than this many seconds
+    embedding_latency_window: int = 200  # Recent call latencies the percentile is taken over
+    llm_similarity_floor: float = 0.2  # LLM-mode guesses below this similarity are wrong without asking the LLM
+
+    # Reuse of earlier verdicts (services/verdicts.py)
+    verdict_reuse_epsilon: float = 0.02  # Max cosine distance to a judged guess whose LLM verdict is reused
+    verdict_store_capacity: int = 1000  # Judged guesses kept per puzzle (~6 MB at 1536 dims)
+    verdict_store_puzzles: int = 4  # Puzzles with a store; least recently used dropped
+    verdict_speculate_below: float = 0.5  # Start the LLM call early only while the reuse hit rate is below this
+
+    # Admission control and circuit breaking per upstream (services/resilience.py)
+    embeddings_max_concurrency: int = 32
+    chat_max_concurrency: int = 8
+    upstream_max_queue: int = 64  # Callers allowed to wait for a slot before shedding
+    upstream_queue_timeout: float = 2.0  # Seconds a caller waits for a slot
+    breaker_window: int = 50  # Recent calls the error and slow rates are taken over
+    breaker_min_calls: int = 10
+    breaker_error_rate: float = 0.5
+    breaker_slow_call_seconds: float = 2.0  # Keep below GUESS_LATENCY_BUDGET: guesses cancel calls at the budget
+    breaker_slow_call_rate: float = 0.5
+    breaker_open_seconds: float = 30.0  # Before half-opening
+    breaker_half_open_probes: int = 2
+
+    # Publish-time scoring of likely guesses (services/precompute.py)
+    precompute_guesses_on_publish: bool = False
+    precompute_guess_count: int = 200
+
+    # Publish-time variant de-duplication (services/variants.py): cosine distance a
+    # dropped variant may be from its kept stand-in. Guesses near the threshold can
+    # lose several times this much; 0 keeps all
+    variant_dedup_tolerance: float = 0.0
+
+    # Request profiling of guesses and hints (app/profiling.py)
+    profile_sample_rate: float = 0.0  # Fraction profiled at random; X-Profile: 1 with the admin password forces one
+    profile_keep: int = 20  # Slowest profiles kept per worker
+
+    # Event-loop blocking detector (app/loop_monitor.py); staging only
+    loop_monitor_enabled: bool = False
+    loop_block_threshold: float = 0.1  # Seconds the loop may be held before the stack is captured
+    loop_monitor_interval: float = 0.02  # Heartbeat period
+
+    # Print every request's S3/SQL call counts (app/call_budget.py); over-budget requests are always logged
+    log_io_calls: bool = False
+    # Send X-IO-Calls on every response (tests, staging); otherwise only requests with the admin password get it
+    io_calls_header: bool = False
+
+    # Per-player token buckets on /guess and /hint (app/limiter.py); off only for load tests
+    rate_limit_enabled: bool = True
+    rate_limit_storage: str = "memory"  # "memory" (per worker), "sqlite" (per host) or "redis" (all replicas)
+    rate_limit_sqlite_path: str = "./rate_limits.db"
+    # Trusted proxies appending to X-Forwarded-For. 0 trusts none, so the header can't be
+    # used to dodge limits; set RATE_LIMIT_PROXY_HOPS=1 behind one proxy (Railway's edge)
+    rate_limit_proxy_hops: int = 0
+    rate_limit_ip_multiplier: int = 10  # One address may use this many players' worth of a route's limit
+
+    # Shared Redis (app/redis_client.py); "fakeredis://" for an in-process stand-in
+    redis_url: str = ""
+
+    # Shared second-level cache (app/services/l2cache.py) behind each worker's own; needs REDIS_URL
+    l2_cache_enabled: bool = False
+    l2_cache_timeout: float = 0.05  # Seconds a lookup may take before it counts as a miss
+    l2_puzzle_ttl: int = 3600
+    l2_puzzle_fill_ttl: int = 300  # Copies shared on a read rather than a save: bounds how long a stale one can live
+    l2_embedding_ttl: int = 7 * 86400  # Guess embeddings only change with the model
+    l2_verdict_ttl: int = 3 * 86400
+
+    # Responses at least this large are brotli/gzip compressed when the client accepts it
+    compression_min_size: int = 1024
+
     # Feature flags
     allow_game_reset: bool = False  # Set to true in dev to allow game state resets
 
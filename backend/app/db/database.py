@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
 
+from app import call_budget, metrics
 from app.config import get_settings
 
 settings = get_settings()
@@ -13,6 +16,31 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Separate pool for long-running reads (exports). With SQLite in WAL mode these
+# connections read a snapshot and never hold up writers on the guess path.
+read_engine = create_engine(
+    settings.database_read_url or settings.database_url,
+    connect_args={"check_same_thread": False},
+)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+call_budget.instrument_engine(engine)
+call_budget.instrument_engine(read_engine)
+
+
+# Commit latency (flush included) for every session, as the `db_commit` stage
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        metrics.record("db_commit", time.perf_counter() - started)
+
 
 def get_db():
     """Dependency for FastAPI routes."""
@@ -31,3 +59,13 @@ def get_db_session() -> Session:
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def get_read_db_session() -> Session:
+    """Context manager for sessions on the read-only export pool."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,156 @@
+"""Integer surrogate keys for players, puzzles and guess texts.
+
+Mappings never change once a row exists, so every lookup is cached in-process.
+New rows are inserted in the caller's transaction, and their keys are only
+cached once that transaction commits: a rolled back request can never leave
+a key in the cache that is later reused for a different value.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.db.models import NAMED_PUZZLE_KEY_BASE, Player, PuzzleKey, GuessText
+
+_DATE_ID = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+
+
+class _LRU:
+    # Shared by the event loop and sync routes in the threadpool
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+_player_keys = _LRU(100_000)
+_puzzle_keys = _LRU(10_000)
+_puzzle_ids = _LRU(10_000)
+_guess_keys = _LRU(50_000)
+
+
+def encode_puzzle_date(puzzle_id: str) -> Optional[int]:
+    """YYYYMMDD for date-shaped puzzle IDs, None for anything else."""
+    m = _DATE_ID.match(puzzle_id)
+    if not m:
+        return None
+    year, month, day = (int(g) for g in m.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return year * 10000 + month * 100 + day
+
+
+def decode_date_key(key: int) -> Optional[str]:
+    """Inverse of encode_puzzle_date; None for named puzzle keys."""
+    if key >= NAMED_PUZZLE_KEY_BASE:
+        return None
+    return f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+
+
+def _intern(db: Session, model, column, value: str) -> int:
+    """ID of `value`, inserting it in the caller's transaction (not committed here)."""
+    db.execute(insert(model).values({column.key: value}).on_conflict_do_nothing())
+    key = db.execute(select(model.id).where(column == value)).scalar_one()
+    db.info.setdefault("interned_keys", set()).add(value)
+    return key
+
+
+def _remember(db: Session, value: str, *entries) -> None:
+    """Cache `(cache, key, value)` entries for `value`: now, or at commit if this transaction interned it."""
+    if value in db.info.get("interned_keys", ()):
+        db.info.setdefault("pending_keys", []).extend(entries)
+    else:
+        for cache, k, v in entries:
+            cache.put(k, v)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_keys(session):
+    session.info.pop("interned_keys", None)
+    for cache, key, value in session.info.pop("pending_keys", ()):
+        cache.put(key, value)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted_keys(session):
+    session.info.pop("interned_keys", None)
+    session.info.pop("pending_keys", None)
+
+
+def player_key(db: Session, public_id: str, create: bool = False) -> Optional[int]:
+    """Integer key for a public player ID. None if unknown and not creating."""
+    key = _player_keys.get(public_id)
+    if key is not None:
+        return key
+    key = db.execute(select(Player.id).where(Player.public_id == public_id)).scalar_one_or_none()
+    if key is None and create:
+        key = _intern(db, Player, Player.public_id, public_id)
+    if key is not None:
+        _remember(db, public_id, (_player_keys, public_id, key))
+    return key
+
+
+def puzzle_key(db: Session, puzzle_id: str, create: bool = False) -> Optional[int]:
+    """Integer key for a puzzle ID. None if unknown and not creating."""
+    date_key = encode_puzzle_date(puzzle_id)
+    if date_key is not None:
+        return date_key
+
+    key = _puzzle_keys.get(puzzle_id)
+    if key is not None:
+        return key
+    row_id = db.execute(
+        select(PuzzleKey.id).where(PuzzleKey.puzzle_id == puzzle_id)
+    ).scalar_one_or_none()
+    if row_id is None and create:
+        row_id = _intern(db, PuzzleKey, PuzzleKey.puzzle_id, puzzle_id)
+    if row_id is None:
+        return None
+    key = NAMED_PUZZLE_KEY_BASE + row_id
+    _remember(db, puzzle_id, (_puzzle_keys, puzzle_id, key), (_puzzle_ids, key, puzzle_id))
+    return key
+
+
+def puzzle_id_for_key(db: Session, key: int) -> str:
+    """Puzzle ID for an integer puzzle key."""
+    puzzle_id = decode_date_key(key)
+    if puzzle_id is not None:
+        return puzzle_id
+
+    puzzle_id = _puzzle_ids.get(key)
+    if puzzle_id is None:
+        puzzle_id = db.execute(
+            select(PuzzleKey.puzzle_id).where(PuzzleKey.id == key - NAMED_PUZZLE_KEY_BASE)
+        ).scalar_one()
+        _remember(db, puzzle_id, (_puzzle_ids, key, puzzle_id))
+    return puzzle_id
+
+
+def guess_key(db: Session, text: str) -> int:
+    """Dictionary ID for a guess or hint text, creating it if needed."""
+    key = _guess_keys.get(text)
+    if key is not None:
+        return key
+    key = db.execute(select(GuessText.id).where(GuessText.text == text)).scalar_one_or_none()
+    if key is None:
+        key = _intern(db, GuessText, GuessText.text, text)
+    _remember(db, text, (_guess_keys, text, key))
+    return key
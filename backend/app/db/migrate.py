@@ -0,0 +1,34 @@
+"""Schema migration CLI.
+
+Usage:
+    python -m app.db.migrate            # apply all pending migrations
+    python -m app.db.migrate --to 2     # migrate up to a specific version
+    python -m app.db.migrate --status   # show current and latest version
+"""
+import argparse
+import sys
+
+from app.db.database import engine
+from app.db.migrations import current_version, latest_version, upgrade
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--to", type=int, default=None, help="Target version (default: latest)")
+    parser.add_argument("--status", action="store_true", help="Print versions and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        print(f"current: {current_version(engine)}  latest: {latest_version()}")
+        return 0
+
+    applied = upgrade(engine, args.to)
+    for name in applied:
+        print(f"Migration: applied {name}")
+    if not applied:
+        print(f"Schema already at version {current_version(engine)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
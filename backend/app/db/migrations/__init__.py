@@ -0,0 +1,109 @@
+"""Versioned schema migrations.
+
+Each migration module defines NAME, `upgrade(conn)` (run inside the same
+transaction that records its version) and optionally `after_commit(engine)`
+for statements SQLite refuses inside a transaction (VACUUM, journal_mode).
+
+Migrations run once per deploy via `python -m app.db.migrate`; workers only
+compare the stored version with `latest_version()` at boot.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.migrations import (
+    v0001_baseline,
+    v0002_puzzle_stats,
+    v0003_compact_schema,
+    v0004_wal,
+    v0005_archived_flag,
+)
+
+# Ordered; the version of a migration is its position, starting at 1
+MIGRATIONS = [
+    v0001_baseline,
+    v0002_puzzle_stats,
+    v0003_compact_schema,
+    v0004_wal,
+    v0005_archived_flag,
+]
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """Raised at boot when the database is behind the code's schema version."""
+
+
+def latest_version() -> int:
+    return len(MIGRATIONS)
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER NOT NULL PRIMARY KEY,
+            name VARCHAR(64) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """))
+
+
+def _read_version(conn: Connection) -> int:
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar_one()
+
+
+def current_version(engine: Engine) -> int:
+    """Version recorded in the database; 0 if it has never been migrated."""
+    with engine.connect() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        )).first()
+        return _read_version(conn) if exists else 0
+
+
+def upgrade(engine: Engine, target: int | None = None) -> list[str]:
+    """Apply pending migrations up to `target` (default: latest).
+
+    Each migration takes the SQLite write lock first and re-reads the version,
+    so concurrent runners apply every migration exactly once.
+    Returns the names of the migrations applied.
+    """
+    target = latest_version() if target is None else target
+    applied = []
+
+    while True:
+        with engine.begin() as conn:
+            # pysqlite only opens transactions before DML; take the write lock
+            # explicitly so DDL is part of the transaction too
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            _ensure_version_table(conn)
+            version = _read_version(conn)
+            if version >= target:
+                break
+            migration = MIGRATIONS[version]
+            migration.upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version + 1, "n": migration.NAME, "t": datetime.now(timezone.utc)},
+            )
+
+        after_commit = getattr(migration, "after_commit", None)
+        if after_commit is not None:
+            after_commit(engine)
+        applied.append(f"{version + 1:04d}_{migration.NAME}")
+
+    return applied
+
+
+def check_schema_version(engine: Engine) -> None:
+    """Cheap boot-time check that migrations have been run."""
+    version = current_version(engine)
+    if version < latest_version():
+        raise SchemaOutOfDateError(
+            f"Database schema is at version {version}, code expects {latest_version()}. "
+            "Run `python -m app.db.migrate` before starting workers."
+        )
+    if version > latest_version():
+        raise SchemaOutOfDateError(
+            f"Database schema version {version} is newer than this code ({latest_version()})."
+        )
@@ -0,0 +1,46 @@
+"""Original string-keyed attempt tables, including the later is_hint column."""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+NAME = "baseline"
+
+
+def upgrade(conn: Connection) -> None:
+    tables = set(inspect(conn).get_table_names())
+
+    if "user_attempts" not in tables:
+        conn.execute(text("""
+            CREATE TABLE user_attempts (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id VARCHAR(64) NOT NULL,
+                puzzle_date VARCHAR(10) NOT NULL,
+                guess_text VARCHAR(512) NOT NULL,
+                similarity_score FLOAT NOT NULL,
+                is_correct BOOLEAN,
+                is_hint BOOLEAN DEFAULT FALSE,
+                created_at DATETIME
+            )
+        """))
+        conn.execute(text("CREATE INDEX ix_user_attempts_user_id ON user_attempts (user_id)"))
+        conn.execute(text("CREATE INDEX ix_user_attempts_puzzle_date ON user_attempts (puzzle_date)"))
+        conn.execute(text("CREATE INDEX ix_user_puzzle_date ON user_attempts (user_id, puzzle_date)"))
+    else:
+        # Databases created before hints were recorded as attempts
+        columns = {c["name"] for c in inspect(conn).get_columns("user_attempts")}
+        if "is_hint" not in columns:
+            conn.execute(text("ALTER TABLE user_attempts ADD COLUMN is_hint BOOLEAN DEFAULT FALSE"))
+
+    if "daily_game_state" not in tables:
+        conn.execute(text("""
+            CREATE TABLE daily_game_state (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id VARCHAR(64) NOT NULL,
+                puzzle_date VARCHAR(10) NOT NULL,
+                solved BOOLEAN,
+                total_guesses INTEGER,
+                hints_revealed INTEGER
+            )
+        """))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX ix_user_date_unique ON daily_game_state (user_id, puzzle_date)"
+        ))
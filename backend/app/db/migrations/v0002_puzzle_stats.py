@@ -0,0 +1,16 @@
+"""Per-puzzle aggregate statistics (services/stats.py)."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+NAME = "puzzle_stats"
+
+
+def upgrade(conn: Connection) -> None:
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS puzzle_stats (
+            puzzle_date VARCHAR(64) NOT NULL PRIMARY KEY,
+            payload TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            updated_at DATETIME
+        )
+    """))
@@ -0,0 +1,144 @@
+"""Integer-keyed attempt tables.
+
+The old layout repeated the `p_<uuid hex>` player ID, the puzzle ID and the raw
+guess text in every `user_attempts` row (and in its indexes). The compact
+layout stores integer keys for all three; see app/db/models.py and
+app/db/keys.py for how keys are assigned.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import get_settings
+from app.db.keys import encode_puzzle_date
+from app.db.models import NAMED_PUZZLE_KEY_BASE
+
+NAME = "compact_schema"
+
+# created_at was stored as "YYYY-MM-DD HH:MM:SS.ffffff" text
+_MILLIS_FROM_TEXT = "CAST(ROUND((julianday(a.created_at) - 2440587.5) * 86400000) AS INTEGER)"
+
+_DICTIONARY_TABLES = [
+    """CREATE TABLE IF NOT EXISTS players (
+        id INTEGER NOT NULL PRIMARY KEY,
+        public_id VARCHAR(64) NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS puzzle_keys (
+        id INTEGER NOT NULL PRIMARY KEY,
+        puzzle_id VARCHAR(64) NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS guess_texts (
+        id INTEGER NOT NULL PRIMARY KEY,
+        text VARCHAR(512) NOT NULL UNIQUE
+    )""",
+]
+
+_COMPACT_TABLES = [
+    """CREATE TABLE user_attempts (
+        id INTEGER NOT NULL PRIMARY KEY,
+        player_key INTEGER NOT NULL REFERENCES players (id),
+        puzzle_key INTEGER NOT NULL,
+        guess_id INTEGER REFERENCES guess_texts (id),
+        guess_text VARCHAR(512),
+        similarity_score FLOAT NOT NULL,
+        is_correct BOOLEAN,
+        is_hint BOOLEAN,
+        created_at INTEGER
+    )""",
+    "CREATE INDEX ix_user_attempts_puzzle_key ON user_attempts (puzzle_key)",
+    "CREATE INDEX ix_attempts_player_puzzle ON user_attempts (player_key, puzzle_key)",
+    """CREATE TABLE daily_game_state (
+        player_key INTEGER NOT NULL REFERENCES players (id),
+        puzzle_key INTEGER NOT NULL,
+        solved BOOLEAN,
+        total_guesses INTEGER,
+        hints_revealed INTEGER,
+        PRIMARY KEY (player_key, puzzle_key)
+    ) WITHOUT ROWID""",
+]
+
+
+def _build_puzzle_key_map(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TEMP TABLE _puzzle_key_map (puzzle_date TEXT PRIMARY KEY, puzzle_key INTEGER NOT NULL)"
+    ))
+    puzzle_ids = conn.execute(text(
+        "SELECT puzzle_date FROM user_attempts_legacy "
+        "UNION SELECT puzzle_date FROM daily_game_state_legacy"
+    )).scalars().all()
+
+    rows = []
+    for puzzle_id in puzzle_ids:
+        key = encode_puzzle_date(puzzle_id)
+        if key is None:
+            conn.execute(
+                text("INSERT OR IGNORE INTO puzzle_keys (puzzle_id) VALUES (:p)"), {"p": puzzle_id}
+            )
+            row_id = conn.execute(
+                text("SELECT id FROM puzzle_keys WHERE puzzle_id = :p"), {"p": puzzle_id}
+            ).scalar_one()
+            key = NAMED_PUZZLE_KEY_BASE + row_id
+        rows.append({"p": puzzle_id, "k": key})
+    if rows:
+        conn.execute(text("INSERT INTO _puzzle_key_map VALUES (:p, :k)"), rows)
+
+
+def _copy_rows(conn: Connection, intern_guess_texts: bool) -> None:
+    conn.execute(text(
+        "INSERT OR IGNORE INTO players (public_id) "
+        "SELECT user_id FROM user_attempts_legacy "
+        "UNION SELECT user_id FROM daily_game_state_legacy"
+    ))
+    _build_puzzle_key_map(conn)
+
+    if intern_guess_texts:
+        conn.execute(text(
+            "INSERT OR IGNORE INTO guess_texts (text) SELECT DISTINCT guess_text FROM user_attempts_legacy"
+        ))
+        guess_columns = "g.id, NULL"
+        guess_join = "JOIN guess_texts g ON g.text = a.guess_text"
+    else:
+        guess_columns = "NULL, a.guess_text"
+        guess_join = ""
+
+    conn.execute(text(f"""
+        INSERT INTO user_attempts
+            (id, player_key, puzzle_key, guess_id, guess_text,
+             similarity_score, is_correct, is_hint, created_at)
+        SELECT a.id, p.id, m.puzzle_key, {guess_columns},
+               a.similarity_score, a.is_correct, COALESCE(a.is_hint, 0), {_MILLIS_FROM_TEXT}
+        FROM user_attempts_legacy a
+        JOIN players p ON p.public_id = a.user_id
+        JOIN _puzzle_key_map m ON m.puzzle_date = a.puzzle_date
+        {guess_join}
+    """))
+    conn.execute(text("""
+        INSERT INTO daily_game_state (player_key, puzzle_key, solved, total_guesses, hints_revealed)
+        SELECT p.id, m.puzzle_key, s.solved, s.total_guesses, s.hints_revealed
+        FROM daily_game_state_legacy s
+        JOIN players p ON p.public_id = s.user_id
+        JOIN _puzzle_key_map m ON m.puzzle_date = s.puzzle_date
+    """))
+    conn.execute(text("DROP TABLE _puzzle_key_map"))
+
+
+def upgrade(conn: Connection) -> None:
+    for ddl in _DICTIONARY_TABLES:
+        conn.execute(text(ddl))
+
+    columns = {c["name"] for c in inspect(conn).get_columns("user_attempts")}
+    if "user_id" not in columns:
+        return  # Already compact (created by an older create_all at boot)
+
+    conn.execute(text("ALTER TABLE user_attempts RENAME TO user_attempts_legacy"))
+    conn.execute(text("ALTER TABLE daily_game_state RENAME TO daily_game_state_legacy"))
+    for ddl in _COMPACT_TABLES:
+        conn.execute(text(ddl))
+    _copy_rows(conn, get_settings().intern_guess_texts)
+    conn.execute(text("DROP TABLE user_attempts_legacy"))
+    conn.execute(text("DROP TABLE daily_game_state_legacy"))
+
+
+def after_commit(engine: Engine) -> None:
+    # Give the pages freed by the rewrite back to the filesystem
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
@@ -0,0 +1,21 @@
+"""Switch SQLite to write-ahead logging.
+
+WAL lets readers (stats, exports, player history) run alongside the guess
+path's writes instead of queueing behind them. The mode is stored in the
+database file, so it only needs setting once.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+NAME = "wal_journal"
+
+
+def upgrade(conn: Connection) -> None:
+    pass  # journal_mode can't change inside a transaction; see after_commit
+
+
+def after_commit(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("PRAGMA journal_mode=WAL"))
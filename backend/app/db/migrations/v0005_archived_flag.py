@@ -0,0 +1,11 @@
+"""Flag game states whose attempts were moved to cold storage."""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+NAME = "archived_flag"
+
+
+def upgrade(conn: Connection) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns("daily_game_state")}
+    if "archived" not in columns:
+        conn.execute(text("ALTER TABLE daily_game_state ADD COLUMN archived BOOLEAN DEFAULT FALSE"))
@@ -1,10 +1,63 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index, Text, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 
 Base = declarative_base()
 
+# Puzzle keys: "YYYY-MM-DD" IDs are stored as the integer YYYYMMDD. Any other
+# puzzle ID is interned in `puzzle_keys` and stored as this base + its row id,
+# which keeps named keys clear of every possible date key.
+NAMED_PUZZLE_KEY_BASE = 100_000_000
+
+
+class EpochMillis(TypeDecorator):
+    """Naive UTC datetime stored as integer milliseconds since the epoch."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+class Player(Base):
+    """Maps the public `p_<uuid hex>` player ID to a small integer key."""
+
+    __tablename__ = "players"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    public_id = Column(String(64), nullable=False, unique=True)
+
+
+class PuzzleKey(Base):
+    """Integer keys for puzzle IDs that are not dates (see NAMED_PUZZLE_KEY_BASE)."""
+
+    __tablename__ = "puzzle_keys"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    puzzle_id = Column(String(64), nullable=False, unique=True)
+
+
+class GuessText(Base):
+    """Dictionary of distinct guess and hint texts."""
+
+    __tablename__ = "guess_texts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    text = Column(String(512), nullable=False, unique=True)
+
 
 class UserAttempt(Base):
     """Records individual guess attempts and hints."""
@@ -12,31 +65,53 @@ class UserAttempt(Base):
     __tablename__ = "user_attempts"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(String(64), nullable=False, index=True)
-    puzzle_date = Column(String(10), nullable=False, index=True)
-    guess_text = Column(String(512), nullable=False)  # For hints, stores hint text
+    player_key = Column(Integer, ForeignKey("players.id"), nullable=False)
+    puzzle_key = Column(Integer, nullable=False, index=True)
+    # Text lives in guess_texts when interning is on, inline otherwise
+    guess_id = Column(Integer, ForeignKey("guess_texts.id"), nullable=True)
+    raw_guess_text = Column("guess_text", String(512), nullable=True)  # For hints, stores hint text
     similarity_score = Column(Float, nullable=False)  # 0 for hints
     is_correct = Column(Boolean, default=False)
     is_hint = Column(Boolean, default=False)  # True if this is a hint, not a guess
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(EpochMillis, default=lambda: datetime.now(timezone.utc))
+
+    guess = relationship(GuessText, lazy="joined")
 
     __table_args__ = (
-        Index("ix_user_puzzle_date", "user_id", "puzzle_date"),
+        Index("ix_attempts_player_puzzle", "player_key", "puzzle_key"),
     )
 
+    @property
+    def guess_text(self) -> str:
+        return self.guess.text if self.guess is not None else self.raw_guess_text
+
 
 class DailyGameState(Base):
     """Tracks overall game state per user per day."""
 
     __tablename__ = "daily_game_state"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(String(64), nullable=False)
-    puzzle_date = Column(String(10), nullable=False)
+    player_key = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    puzzle_key = Column(Integer, primary_key=True)
     solved = Column(Boolean, default=False)
     total_guesses = Column(Integer, default=0)
     hints_revealed = Column(Integer, default=0)
+    archived = Column(Boolean, default=False)  # Attempts moved to cold storage (services/archive.py)
 
-    __table_args__ = (
-        Index("ix_user_date_unique", "user_id", "puzzle_date", unique=True),
-    )
+    # Clustered on (player_key, puzzle_key): the key *is* the row, no separate index
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class PuzzleStats(Base):
+    """Aggregate statistics across all players for one puzzle.
+
+    `payload` is the JSON form of `services.stats.PuzzleAggregate`; `version`
+    guards concurrent read-merge-write flushes from several workers.
+    """
+
+    __tablename__ = "puzzle_stats"
+
+    puzzle_date = Column(String(64), primary_key=True)
+    payload = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1 @@
+# Offline jobs (run with python -m app.jobs.<name>)
@@ -0,0 +1,55 @@
+"""Move attempts for old puzzle dates out of the hot SQLite tables.
+
+Usage:
+    python -m app.jobs.archive_attempts                   # use ARCHIVE_HORIZON_DAYS
+    python -m app.jobs.archive_attempts --horizon-days 30
+    python -m app.jobs.archive_attempts --dry-run
+    python -m app.jobs.archive_attempts --vacuum          # also shrink the file
+
+Safe to re-run: each puzzle is exported before its rows are deleted, and
+attempts recorded after an earlier run are appended to the same archive.
+"""
+import argparse
+import sys
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.db import keys
+from app.db.database import engine, get_db_session
+from app.services.archive import get_attempt_archive
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Archive attempts for old puzzle dates")
+    parser.add_argument("--horizon-days", type=int, default=settings.archive_horizon_days)
+    parser.add_argument("--dry-run", action="store_true", help="List puzzles without archiving")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database afterwards")
+    args = parser.parse_args()
+
+    archive = get_attempt_archive()
+    total = 0
+    with get_db_session() as db:
+        puzzle_keys = archive.archivable_puzzle_keys(db, args.horizon_days)
+        print(f"{len(puzzle_keys)} puzzle(s) older than {args.horizon_days} days to archive "
+              f"({settings.archive_location})")
+        for puzzle_key in puzzle_keys:
+            puzzle_id = keys.puzzle_id_for_key(db, puzzle_key)
+            if args.dry_run:
+                print(f"  would archive {puzzle_id}")
+                continue
+            count = archive.archive_puzzle(db, puzzle_key)
+            total += count
+            print(f"  {puzzle_id}: {count} attempts archived")
+
+    if args.vacuum and not args.dry_run and total:
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+    print(f"Done: {total} attempts archived")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Compare scores under the active embedding profile with full precision.
+
+Usage:
+    python -m app.jobs.calibrate_profile                    # 20 most recent puzzles
+    python -m app.jobs.calibrate_profile --puzzles 50 --guesses 200
+    python -m app.jobs.calibrate_profile --json report.json
+
+For each puzzle, real guesses (most frequent first, topped up with its
+precomputed guesses) are scored twice: against the puzzle's full-size float
+vectors, with guesses embedded by the model those vectors came from, and
+against the profile's vectors (stored entry, or built in memory if the
+puzzle has none). The report gives the score drift, verdicts that flip at
+the puzzle's threshold, a threshold shift that would compensate, and the
+memory each answer matrix holds once scored (int8 rows are widened to
+float32 for scoring, so they hold more than they store).
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.db import keys
+from app.db.database import get_read_db_session
+from app.db.models import GuessText, UserAttempt
+from app.models.puzzle import PuzzleMetadata
+from app.services.embedding import get_embedding_service
+from app.services.profiles import (
+    EmbeddingProfile, active_profile, build_entry, decode_entry, legacy_model, profile_matrix, puzzle_texts,
+)
+from app.services.s3 import get_s3_service
+from app.services.similarity import answer_matrix, best_similarity
+
+
+def _sample_guesses(puzzle: PuzzleMetadata, limit: int) -> list[str]:
+    texts: list[str] = []
+    with get_read_db_session() as db:
+        puzzle_key = keys.puzzle_key(db, puzzle.id)
+        if puzzle_key is not None:
+            rows = db.execute(
+                select(GuessText.text)
+                .join(UserAttempt, UserAttempt.guess_id == GuessText.id)
+                .where(UserAttempt.puzzle_key == puzzle_key, UserAttempt.is_hint.is_(False))
+                .group_by(GuessText.text)
+                .order_by(func.count().desc())
+                .limit(limit)
+            )
+            texts = [row.text for row in rows]
+    for guess in puzzle.precomputedGuesses or []:
+        if len(texts) >= limit:
+            break
+        if guess.text not in texts:
+            texts.append(guess.text)
+    return texts
+
+
+async def calibrate_puzzle(puzzle: PuzzleMetadata, profile: EmbeddingProfile, limit: int) -> dict | None:
+    service = get_embedding_service()
+    guesses = _sample_guesses(puzzle, limit)
+    if not guesses:
+        return None
+
+    # Scores as they were before the cutover: a profile may also change the model
+    full_guesses = await service.embed_batch(guesses, dimensions=0, model=legacy_model(puzzle))
+    full_matrix = answer_matrix(puzzle, full_guesses.shape[1])
+
+    matrix = profile_matrix(puzzle, profile.key)
+    if matrix is None:
+        entry = await build_entry(profile, puzzle_texts(puzzle), service)
+        matrix = decode_entry(entry["dimensions"], entry["quantized"], entry["vectors"], entry["scales"])
+    profile_guesses = await service.embed_batch(guesses, dimensions=profile.dimensions)
+
+    full = np.array([best_similarity(full_matrix, g) for g in full_guesses])
+    reduced = np.array([best_similarity(matrix, g) for g in profile_guesses])
+    drift = reduced - full
+    threshold = puzzle.similarityThreshold
+    flips = int(np.sum((full >= threshold) != (reduced >= threshold)))
+
+    return {
+        "puzzleId": puzzle.id,
+        "guesses": len(guesses),
+        "threshold": threshold,
+        "meanDrift": round(float(drift.mean()), 4),
+        "p95AbsDrift": round(float(np.percentile(np.abs(drift), 95)), 4),
+        "maxAbsDrift": round(float(np.abs(drift).max()), 4),
+        "verdictFlips": flips,
+        # Shifting the threshold by the median drift keeps verdicts closest to full precision
+        "suggestedThreshold": round(threshold + float(np.median(drift)), 4),
+        "fullMatrixBytes": int(full_matrix.nbytes),
+        "profileStoredBytes": int(matrix.nbytes),
+        "profileMatrixBytes": int(getattr(matrix, "resident_nbytes", matrix.nbytes)),
+    }
+
+
+async def run(puzzle_count: int, guesses: int) -> dict:
+    profile = active_profile()
+    if profile is None:
+        raise SystemExit("No embedding profile configured (EMBEDDING_DIMENSIONS / EMBEDDING_QUANTIZE)")
+
+    s3_service = get_s3_service()
+    index = s3_service.get_puzzle_index()
+    entries = sorted(index.puzzles, key=lambda p: p.createdAt or "", reverse=True)[:puzzle_count]
+
+    results = []
+    for entry in entries:
+        try:
+            puzzle = s3_service.get_puzzle(entry.id)
+        except ValueError:
+            continue
+        result = await calibrate_puzzle(puzzle, profile, guesses)
+        if result is not None:
+            results.append(result)
+            print(f"  {result['puzzleId']}: drift {result['meanDrift']:+.4f} "
+                  f"(p95 {result['p95AbsDrift']:.4f}), {result['verdictFlips']} flips "
+                  f"of {result['guesses']}, {result['fullMatrixBytes']} -> {result['profileMatrixBytes']} bytes "
+                  f"in memory ({result['profileStoredBytes']} stored)")
+
+    total = sum(r["guesses"] for r in results)
+    return {
+        "profile": profile.key,
+        "puzzles": results,
+        "summary": {
+            "puzzles": len(results),
+            "guesses": total,
+            "verdictFlips": sum(r["verdictFlips"] for r in results),
+            "meanDrift": round(sum(r["meanDrift"] * r["guesses"] for r in results) / total, 4) if total else 0.0,
+            "maxAbsDrift": max((r["maxAbsDrift"] for r in results), default=0.0),
+            "memoryRatio": round(
+                sum(r["fullMatrixBytes"] for r in results) / max(sum(r["profileMatrixBytes"] for r in results), 1), 1
+            ),
+            "storageRatio": round(
+                sum(r["fullMatrixBytes"] for r in results) / max(sum(r["profileStoredBytes"] for r in results), 1), 1
+            ),
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Calibrate the active embedding profile")
+    parser.add_argument("--puzzles", type=int, default=20, help="Most recent puzzles to sample")
+    parser.add_argument("--guesses", type=int, default=100, help="Guesses scored per puzzle")
+    parser.add_argument("--json", metavar="PATH", help="Also write the full report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.puzzles, args.guesses))
+    summary = report["summary"]
+    print(f"Profile {report['profile']}: {summary['guesses']} guesses over {summary['puzzles']} puzzles, "
+          f"{summary['verdictFlips']} verdict flips, mean drift {summary['meanDrift']:+.4f}, "
+          f"max {summary['maxAbsDrift']:.4f}, answer matrices {summary['memoryRatio']}x smaller in memory, "
+          f"{summary['storageRatio']}x smaller stored")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
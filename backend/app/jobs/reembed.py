@@ -0,0 +1,188 @@
+"""Store vectors for an embedding profile on every puzzle in the catalog.
+
+Usage:
+    python -m app.jobs.reembed                         # active profile (EMBEDDING_* settings)
+    python -m app.jobs.reembed --model text-embedding-3-large --dimensions 512 --quantize
+    python -m app.jobs.reembed --concurrency 8 --batch-size 2000
+    python -m app.jobs.reembed --force                 # rebuild entries that already exist
+
+Texts from many puzzles are pooled into large `embed_batch` calls, a few in
+flight at once, and each puzzle is written back as soon as its vectors are
+in. Entries are added to `embeddingProfiles` next to the existing vectors,
+so running workers are unaffected: once the run reports full coverage,
+switch EMBEDDING_MODEL / EMBEDDING_DIMENSIONS / EMBEDDING_QUANTIZE to cut
+over, and back to roll back.
+
+Finished puzzles are appended to a checkpoint file; an interrupted run picks
+up where it stopped when started again with the same profile.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from typing import List
+
+from app.config import get_settings
+from app.models.puzzle import PuzzleMetadata
+from app.services.embedding import get_embedding_service
+from app.services.profiles import EmbeddingProfile, encode_entry, has_entry, puzzle_texts
+from app.services.s3 import get_s3_service
+
+
+class CatalogReembedder:
+    """Pools puzzle texts into batches and writes each puzzle's entry back."""
+
+    def __init__(
+        self,
+        profile: EmbeddingProfile,
+        checkpoint_path: str,
+        concurrency: int = 4,
+        io_concurrency: int = 16,
+        batch_size: int = 1000,
+        force: bool = False,
+    ):
+        self.profile = profile
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.force = force
+        self.s3_service = get_s3_service()
+        self.embedding_service = get_embedding_service()
+        self._embed_slots = asyncio.Semaphore(concurrency)
+        self._io_slots = asyncio.Semaphore(io_concurrency)
+        self._checkpoint = None
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.texts_embedded = 0
+
+    def _load_checkpoint(self) -> set[str]:
+        if not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path) as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _mark_done(self, puzzle_id: str) -> None:
+        # One line per puzzle, flushed at once: a crash loses at most the puzzle in flight
+        self._checkpoint.write(puzzle_id + "\n")
+        self._checkpoint.flush()
+
+    async def _load(self, puzzle_id: str) -> PuzzleMetadata | None:
+        async with self._io_slots:
+            try:
+                return await asyncio.to_thread(self.s3_service.get_puzzle, puzzle_id, False)
+            except ValueError:
+                return None
+
+    async def _save(self, puzzle_id: str, texts: List[str], vectors) -> None:
+        async with self._io_slots:
+            # Re-read right before writing so an admin edit made meanwhile isn't lost
+            current = await asyncio.to_thread(self.s3_service.get_puzzle, puzzle_id, False)
+            if puzzle_texts(current) != texts:
+                print(f"  {puzzle_id}: answer changed during the run, left for the next run")
+                self.failed += 1
+                return
+            entries = {key: e.model_dump() for key, e in (current.embeddingProfiles or {}).items()}
+            entries[self.profile.key] = encode_entry(self.profile, texts, vectors)
+            updated = PuzzleMetadata(**{**current.model_dump(), "embeddingProfiles": entries})
+            await asyncio.to_thread(self.s3_service.save_puzzle, updated)
+        self._mark_done(puzzle_id)
+        self.done += 1
+
+    async def _embed_group(self, group: List[tuple[str, List[str]]]) -> None:
+        # Texts shared between puzzles ("population", ...) are embedded once
+        unique = list(dict.fromkeys(text for _, texts in group for text in texts))
+        try:
+            async with self._embed_slots:
+                vectors = await self.embedding_service.embed_batch(
+                    unique, dimensions=self.profile.dimensions, model=self.profile.model
+                )
+        except Exception as e:
+            print(f"  batch of {len(group)} puzzles failed: {e}")
+            self.failed += len(group)
+            return
+        self.texts_embedded += len(unique)
+        row = {text: i for i, text in enumerate(unique)}
+
+        results = await asyncio.gather(
+            *(self._save(puzzle_id, texts, vectors[[row[t] for t in texts]]) for puzzle_id, texts in group),
+            return_exceptions=True,
+        )
+        for (puzzle_id, _), result in zip(group, results):
+            if isinstance(result, Exception):
+                print(f"  {puzzle_id}: write failed: {result}")
+                self.failed += 1
+
+    async def run(self) -> int:
+        finished = self._load_checkpoint()
+        index = self.s3_service.get_puzzle_index()
+        pending_ids = [p.id for p in index.puzzles if p.id not in finished]
+        print(f"Profile {self.profile.key}: {len(index.puzzles)} puzzles, "
+              f"{len(finished)} already done, {len(pending_ids)} to go")
+
+        started = time.monotonic()
+        tasks: list[asyncio.Task] = []
+        group: List[tuple[str, List[str]]] = []
+        group_size = 0
+
+        with open(self.checkpoint_path, "a") as self._checkpoint:
+            loads = [asyncio.create_task(self._load(puzzle_id)) for puzzle_id in pending_ids]
+            for load in asyncio.as_completed(loads):
+                puzzle = await load
+                if puzzle is None:
+                    continue
+                texts = puzzle_texts(puzzle)
+                if not self.force and has_entry(puzzle, self.profile, texts):
+                    self._mark_done(puzzle.id)
+                    self.skipped += 1
+                    continue
+                group.append((puzzle.id, texts))
+                group_size += len(texts)
+                if group_size >= self.batch_size:
+                    tasks.append(asyncio.create_task(self._embed_group(group)))
+                    group, group_size = [], 0
+            if group:
+                tasks.append(asyncio.create_task(self._embed_group(group)))
+            await asyncio.gather(*tasks)
+
+        elapsed = time.monotonic() - started
+        print(f"Done in {elapsed:.1f}s: {self.done} written, {self.skipped} already current, "
+              f"{self.failed} failed, {self.texts_embedded} texts embedded")
+        if self.failed:
+            print("Re-run the same command to retry the failed puzzles.")
+        return 1 if self.failed else 0
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Re-embed every puzzle for an embedding profile")
+    parser.add_argument("--model", default=settings.embedding_model)
+    parser.add_argument("--dimensions", type=int, default=settings.embedding_dimensions,
+                        help="0 = the model's full size")
+    parser.add_argument("--quantize", action="store_true", default=settings.embedding_quantize)
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding requests in flight")
+    parser.add_argument("--io-concurrency", type=int, default=16, help="S3 reads and writes in flight")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Texts per embedding request")
+    parser.add_argument("--checkpoint", help="Progress file (default: per profile, in the working directory)")
+    parser.add_argument("--force", action="store_true", help="Rebuild entries that are already current")
+    args = parser.parse_args()
+
+    profile = EmbeddingProfile(model=args.model, dimensions=args.dimensions, quantized=args.quantize)
+    checkpoint = args.checkpoint or f"reembed-{re.sub(r'[^A-Za-z0-9]+', '-', profile.key)}.checkpoint"
+    if args.force and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    job = CatalogReembedder(
+        profile,
+        checkpoint,
+        concurrency=args.concurrency,
+        io_concurrency=args.io_concurrency,
+        batch_size=args.batch_size,
+        force=args.force,
+    )
+    return asyncio.run(job.run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
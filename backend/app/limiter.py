@@ -1,4 +1,268 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""Token-bucket rate limiting shared across workers and replicas.
 
-limiter = Limiter(key_func=get_remote_address)
+Routes opt in with a dependency:
+
+    @router.post("/...", dependencies=[Depends(limiter.limit("60/minute"))])
+
+Each request takes one token from two buckets: one for the player on their
+address (player ID + forwarded client IP) holding the route's rate, and one
+for the address alone holding `rate_limit_ip_multiplier` times that, so
+minting new player IDs from one machine doesn't escape the limit while
+players sharing a NAT don't starve each other. Buckets refill continuously,
+so "60/minute" allows a burst of 60 and then one per second.
+
+`RATE_LIMIT_STORAGE` picks where buckets live:
+  memory  per worker; fine for a single process
+  sqlite  a small file shared by every worker on the host (RATE_LIMIT_SQLITE_PATH)
+  redis   shared by every replica (REDIS_URL; `fakeredis://` for tests)
+
+If the store is unavailable the request is let through and the error logged;
+a limiter outage shouldn't take the game down with it. Contention isn't an
+outage: the SQLite store waits for the lock rather than failing.
+"""
+import asyncio
+import math
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+
+from app.config import get_settings
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    period: float  # Seconds to refill the bucket from empty
+
+    @classmethod
+    def parse(cls, text: str) -> "Rate":
+        """`"60/minute"` -> 60 tokens refilled over 60 seconds."""
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour|day)\s*", text)
+        if not match:
+            raise ValueError(f"Invalid rate: {text!r}")
+        return cls(int(match.group(1)), _PERIODS[match.group(2)])
+
+    @property
+    def per_second(self) -> float:
+        return self.capacity / self.period
+
+    def __str__(self) -> str:
+        return f"{self.capacity} per {self.period:g}s"
+
+
+@dataclass(frozen=True)
+class Bucket:
+    key: str
+    capacity: float
+    per_second: float
+
+
+def _retry_after(levels: list[float], buckets: list[Bucket]) -> float:
+    """Seconds until every empty bucket holds a whole token again."""
+    return max((1 - level) / bucket.per_second for level, bucket in zip(levels, buckets) if level < 1)
+
+
+class MemoryStore:
+    """Buckets in this process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated)
+        self._next_sweep = 0.0
+
+    async def take(self, buckets: list[Bucket], now: float) -> tuple[bool, float]:
+        with self._lock:
+            levels = []
+            for b in buckets:
+                tokens, updated = self._buckets.get(b.key, (b.capacity, now))
+                levels.append(min(b.capacity, tokens + max(0.0, now - updated) * b.per_second))
+            allowed = all(level >= 1 for level in levels)
+            for b, level in zip(buckets, levels):
+                self._buckets[b.key] = (level - 1 if allowed else level, now)
+            if now >= self._next_sweep:
+                self._sweep(now)
+        return allowed, 0.0 if allowed else _retry_after(levels, buckets)
+
+    def _sweep(self, now: float) -> None:
+        # Drop buckets idle for an hour; longer than any route's refill period, so they'd be full anyway
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 3600}
+        self._next_sweep = now + 60
+
+
+class SQLiteStore:
+    """Buckets in a SQLite file, shared by every worker process on the host.
+
+    Kept apart from the game database so limiter writes never queue behind
+    attempt commits. Durability isn't needed, so syncs are off. Each check
+    runs in a worker thread, where waiting for another process's write lock
+    (up to `BUSY_TIMEOUT`) doesn't hold up the event loop.
+    """
+
+    BUSY_TIMEOUT = 2.0  # Seconds SQLite retries a locked database before giving up
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_sweep = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                   timeout=self.BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    async def take(self, buckets: list[Bucket], now: float) -> tuple[bool, float]:
+        return await asyncio.to_thread(self._take, buckets, now)
+
+    def _take(self, buckets: list[Bucket], now: float) -> tuple[bool, float]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            for b in buckets:
+                row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (b.key,)).fetchone()
+                tokens, updated = row if row else (b.capacity, now)
+                levels.append(min(b.capacity, tokens + max(0.0, now - updated) * b.per_second))
+            allowed = all(level >= 1 for level in levels)
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                [(b.key, level - 1 if allowed else level, now) for b, level in zip(buckets, levels)],
+            )
+            if now >= self._next_sweep:
+                conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - 3600,))
+                self._next_sweep = now + 60
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0.0 if allowed else _retry_after(levels, buckets)
+
+
+# All buckets refilled and charged in one atomic step. ARGV: now, then
+# capacity and refill rate per key. Returns {allowed, retry_after} as strings
+# because Redis truncates Lua numbers to integers.
+_TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local allowed = true
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 't', 'u')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    local level = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    levels[i] = level
+    if level < 1 then allowed = false end
+end
+local retry = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local level = levels[i]
+    if allowed then level = level - 1 elseif level < 1 then retry = math.max(retry, (1 - level) / rate) end
+    redis.call('HSET', key, 't', tostring(level), 'u', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return {allowed and 1 or 0, tostring(retry)}
+"""
+
+
+class RedisStore:
+    """Buckets in Redis, shared by every replica. One round trip per check."""
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, buckets: list[Bucket], now: float) -> tuple[bool, float]:
+        args = [repr(now)]
+        for b in buckets:
+            args += [repr(b.capacity), repr(b.per_second)]
+        allowed, retry = await self._script(keys=[b.key for b in buckets], args=args)
+        return bool(int(allowed)), float(retry)
+
+
+def client_ip(request: Request, proxy_hops: int) -> str:
+    """The caller's address, read from X-Forwarded-For behind `proxy_hops` trusted proxies.
+
+    Each proxy appends the address it received the request from, so the client
+    is `proxy_hops` entries from the end; anything before that is client-supplied.
+    """
+    if proxy_hops > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if forwarded:
+            return forwarded[max(len(forwarded) - proxy_hops, 0)]
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    def __init__(self, store, enabled: bool = True, proxy_hops: int = 0, ip_multiplier: int = 10):
+        self.store = store
+        self.enabled = enabled
+        self.proxy_hops = proxy_hops
+        self.ip_multiplier = ip_multiplier
+
+    def limit(self, rate: str):
+        """A route dependency allowing each player `rate` requests (e.g. "60/minute")."""
+        parsed = Rate.parse(rate)
+
+        async def check_rate_limit(request: Request) -> None:
+            if not self.enabled:
+                return
+            route = getattr(request.scope.get("route"), "path", request.url.path)
+            ip = client_ip(request, self.proxy_hops)
+            player = request.headers.get("x-player-id") or request.cookies.get("player_id") or "-"
+            # Hash tag keeps both keys in one slot on Redis Cluster
+            buckets = [
+                Bucket(f"rl:{{{ip}}}:{route}:{player}", parsed.capacity, parsed.per_second),
+                Bucket(f"rl:{{{ip}}}:{route}", parsed.capacity * self.ip_multiplier,
+                       parsed.per_second * self.ip_multiplier),
+            ]
+            try:
+                allowed, retry_after = await self.store.take(buckets, time.time())
+            except Exception as e:
+                print(f"Rate limiter store failed, allowing request: {e}")
+                return
+            if not allowed:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Rate limit exceeded: {parsed}",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+
+        return check_rate_limit
+
+
+def _make_store(storage: str):
+    if storage == "memory":
+        return MemoryStore()
+    if storage == "sqlite":
+        return SQLiteStore(get_settings().rate_limit_sqlite_path)
+    if storage == "redis":
+        from app.redis_client import get_redis
+        return RedisStore(get_redis())
+    raise ValueError(f"Unknown RATE_LIMIT_STORAGE: {storage!r} (expected memory, sqlite or redis)")
+
+
+_settings = get_settings()
+limiter = RateLimiter(
+    _make_store(_settings.rate_limit_storage),
+    enabled=_settings.rate_limit_enabled,
+    proxy_hops=_settings.rate_limit_proxy_hops,
+    ip_multiplier=_settings.rate_limit_ip_multiplier,
+)
@@ -0,0 +1,163 @@
+"""Event-loop blocking detector (LOOP_MONITOR_ENABLED, for staging).
+
+A heartbeat task wakes every LOOP_MONITOR_INTERVAL seconds. A watchdog
+thread checks on it; once the heartbeat is more than LOOP_BLOCK_THRESHOLD
+late, it snapshots the event loop thread's stack with
+`sys._current_frames()`. That is the code holding the loop, such as boto3
+or SQLAlchemy called from an `async def` route. Stalls are grouped by the
+innermost frame in app code and reported as `event_loop_blocks` /
+`event_loop_blocked_seconds` on /metrics. Each new call site is logged with
+its full stack, repeat stalls with one line, and
+`/api/admin/loop-blocks` lists them all.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import suppress
+from dataclasses import dataclass, field
+
+from app import metrics
+from app.config import get_settings
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Middleware frames sit above every handler: never the call site to blame
+_PLUMBING = {os.path.join(_APP_DIR, name) for name in ("loop_monitor.py", "metrics.py", "profiling.py")}
+
+LOOP_LAG = metrics.Histogram(
+    "event_loop_lag_seconds", "How late the loop monitor's heartbeat woke up",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+BLOCKS = metrics.Counter("event_loop_blocks", "Loop stalls over the threshold, by call site", ["site"])
+BLOCKED_SECONDS = metrics.Counter("event_loop_blocked_seconds", "Time the loop was stalled, by call site", ["site"])
+
+
+@dataclass
+class BlockSite:
+    site: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    stack: list[str] = field(default_factory=list)  # From the longest stall
+
+    def summary(self) -> dict:
+        return {
+            "site": self.site,
+            "count": self.count,
+            "totalSeconds": round(self.total_seconds, 3),
+            "maxSeconds": round(self.max_seconds, 3),
+            "stack": self.stack,
+        }
+
+
+def _call_site(stack: traceback.StackSummary) -> str:
+    # The innermost frame in our own code says which handler to fix;
+    # fall back to the innermost frame when the loop is stuck elsewhere
+    for frame in reversed(stack):
+        if frame.filename.startswith(_APP_DIR) and frame.filename not in _PLUMBING:
+            return f"{os.path.relpath(frame.filename, os.path.dirname(_APP_DIR))}:{frame.lineno} {frame.name}"
+    frame = stack[-1]
+    return f"{frame.filename}:{frame.lineno} {frame.name}"
+
+
+class LoopMonitor:
+    def __init__(self, threshold: float, interval: float):
+        self.threshold = threshold
+        self.interval = interval
+        self.sites: dict[str, BlockSite] = {}
+        self._lock = threading.Lock()
+        self._last_beat = time.perf_counter()
+        self._loop_thread_id: int | None = None
+        self._heartbeat: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopping = threading.Event()
+        # The stall in progress, as seen by the watchdog
+        self._stalled_site: str | None = None
+        self._stalled_stack: list[str] = []
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._heartbeat
+
+    async def _beat(self) -> None:
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(now - before - self.interval, 0.0)
+            LOOP_LAG.observe(lag)
+            with self._lock:
+                self._last_beat = now
+                site, stack = self._stalled_site, self._stalled_stack
+                self._stalled_site, self._stalled_stack = None, []
+            if site is not None:
+                self._record(site, stack, lag)
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.interval / 2):
+            with self._lock:
+                late = time.perf_counter() - self._last_beat - self.interval
+                if late < self.threshold or self._stalled_site is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            with self._lock:
+                self._stalled_site = _call_site(stack)
+                self._stalled_stack = [line.rstrip() for line in stack.format()]
+
+    def _record(self, site: str, stack: list[str], seconds: float) -> None:
+        BLOCKS.inc(site=site)
+        BLOCKED_SECONDS.inc(seconds, site=site)
+        with self._lock:
+            entry = self.sites.get(site)
+            first = entry is None
+            if first:
+                entry = self.sites[site] = BlockSite(site=site)
+            entry.count += 1
+            entry.total_seconds += seconds
+            if seconds >= entry.max_seconds:
+                entry.max_seconds = seconds
+                entry.stack = stack
+        if first:
+            print(f"Event loop blocked {seconds:.3f}s at {site}:\n" + "\n".join(stack))
+        else:
+            print(f"Event loop blocked {seconds:.3f}s at {site} ({entry.count} times)")
+
+    def report(self) -> list[dict]:
+        with self._lock:
+            sites = sorted(self.sites.values(), key=lambda s: s.total_seconds, reverse=True)
+            return [s.summary() for s in sites]
+
+
+_monitor: LoopMonitor | None = None
+
+
+def get_loop_monitor() -> LoopMonitor | None:
+    """The running monitor, or None when LOOP_MONITOR_ENABLED is off."""
+    return _monitor
+
+
+def start_loop_monitor() -> LoopMonitor | None:
+    """Start watching the running loop if enabled; call from the lifespan."""
+    global _monitor
+    settings = get_settings()
+    if not settings.loop_monitor_enabled:
+        return None
+    _monitor = LoopMonitor(settings.loop_block_threshold, settings.loop_monitor_interval)
+    _monitor.start()
+    return _monitor
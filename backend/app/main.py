@@ -1,41 +1,54 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
 
+from app import call_budget, metrics
+from app.profiling import ProfilingMiddleware
 from app.routes import puzzle, guess, hints, admin
+from app.config import get_settings
 from app.db.database import engine
-from app.db.models import Base
-from app.limiter import limiter
-
-
-def run_migrations(engine):
-    """Run database migrations for new columns."""
-    from sqlalchemy import text
-    from sqlalchemy.exc import OperationalError
-    with engine.connect() as conn:
-        # Add is_hint column if it doesn't exist
-        try:
-            conn.execute(text("ALTER TABLE user_attempts ADD COLUMN is_hint BOOLEAN DEFAULT FALSE"))
-            conn.commit()
-            print("Migration: Added is_hint column to user_attempts")
-        except OperationalError as e:
-            if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-                pass  # Column already exists — expected
-            else:
-                raise  # Unexpected migration error; surface it
+from app.db.migrations import check_schema_version, upgrade
+from app.loop_monitor import start_loop_monitor
+from app.preload import preload_until_ready
+from app.redis_client import close_redis
+from app.responses import CompressionMiddleware, FastJSONResponse
+from app.services.http import get_outbound_http
+from app.services.resilience import UpstreamUnavailable
+from app.services.stats import get_stats_service
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
-    # Run migrations for new columns
-    run_migrations(engine)
+    # Startup: migrations run once per deploy (python -m app.db.migrate);
+    # workers only confirm the schema is current
+    if get_settings().migrate_on_startup:
+        for name in upgrade(engine):
+            print(f"Migration: applied {name}")
+    check_schema_version(engine)
+    loop_monitor = start_loop_monitor()
+    # Open the shared outbound pool and pre-connect to OpenAI
+    outbound = get_outbound_http()
+    await outbound.warm_up()
+    # /ready turns true once the current puzzle is in memory (instant when the master preloaded it)
+    app.state.ready = False
+    preloader = asyncio.create_task(preload_until_ready(app.state))
+    # Periodically merge this worker's puzzle stats into the database
+    stats_service = get_stats_service()
+    stats_flusher = asyncio.create_task(stats_service.run_periodic_flush())
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop the flusher and write out whatever is still pending
+    preloader.cancel()
+    stats_flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await stats_flusher
+    stats_service.flush()
+    await outbound.aclose()
+    await close_redis()
+    if loop_monitor is not None:
+        await loop_monitor.stop()
 
 
 app = FastAPI(
@@ -43,11 +56,18 @@ app = FastAPI(
     description="Wordle-like game for guessing what maps represent",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
-# Rate limiter
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """Shed load or an open circuit with nowhere to fall back: ask the client to retry later."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service is busy. Please try again shortly."},
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
 
 # CORS for frontend
 app.add_middleware(
@@ -63,10 +83,20 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["Content-Type", "X-Player-ID", "X-Admin-Password"],
-    expose_headers=["X-Player-ID"],
+    allow_headers=["Content-Type", "X-Player-ID", "X-Admin-Password", "X-Profile"],
+    expose_headers=["X-Player-ID", "Retry-After", "Server-Timing", "X-Profile-Id", "X-Next-Page-Token",
+                    *(["X-IO-Calls"] if get_settings().io_calls_header else [])],
 )
 
+# Compresses what CORS and the routes produce; timed by the metrics middleware
+app.add_middleware(CompressionMiddleware, minimum_size=get_settings().compression_min_size)
+# Inside the metrics middleware, so profiled requests are timed as usual
+app.add_middleware(ProfilingMiddleware)
+# Inside the metrics middleware, so S3/SQL time shows up in Server-Timing
+app.add_middleware(call_budget.CallBudgetMiddleware)
+# Outermost, so request timings include CORS and error handling
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(puzzle.router)
 app.include_router(guess.router)
@@ -79,6 +109,20 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """503 until this worker has the current puzzle loaded; /health only says the process is up."""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "puzzleId": request.app.state.ready_puzzle_id}
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(admin.verify_admin)])
+async def prometheus_metrics():
+    """This worker's metrics in the Prometheus text format; scrapers send X-Admin-Password."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,243 @@
+"""In-process metrics in the Prometheus text format, plus Server-Timing.
+
+Each worker keeps its own counters; `GET /metrics` (admin password
+required) reports this worker's.
+Request stages are timed with `timed("stage")` (or `record()` for durations
+measured elsewhere): each observation goes into the `stage_seconds`
+histogram and, while a request is being served, into that response's
+`Server-Timing` header.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+# Seconds; fine-grained at the low end where the cache and fuzzy paths sit
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: tuple, values: tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        names = self.labelnames + ("le",)
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(names, key + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+_registry: list[_Metric] = []
+# Called at scrape time for values owned by other services (pool, breakers, ...)
+_collectors: list[Callable[[], Iterable[str]]] = []
+
+
+def collector(fn: Callable[[], Iterable[str]]) -> Callable[[], Iterable[str]]:
+    """Register a function yielding complete exposition lines at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+def family(name: str, kind: str, documentation: str, samples: Iterable[tuple[dict, float]]) -> Iterable[str]:
+    """Exposition lines for a collector: `samples` are (labels, value) pairs."""
+    yield f"# HELP {name} {documentation}"
+    yield f"# TYPE {name} {kind}"
+    for labels, value in samples:
+        yield f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}"
+
+
+def render() -> str:
+    parts = [metric.render() for metric in _registry]
+    for fn in _collectors:
+        try:
+            parts.append("".join(line + "\n" for line in fn()))
+        except Exception as e:
+            print(f"Metrics collector {fn.__name__} failed: {e}")
+    return "".join(parts)
+
+
+# --- Metrics -----------------------------------------------------------------
+
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Request latency by route", ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served")
+STAGE_SECONDS = Histogram(
+    "stage_seconds", "Time spent per request stage (puzzle load, embedding, llm, db commit, ...)", ["stage"]
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_seconds", "Outbound API call latency", ["upstream", "outcome"]
+)
+PUZZLE_CACHE = Counter("puzzle_cache_lookups", "S3 puzzle cache lookups", ["result"])
+L2_CACHE = Counter("l2_cache_lookups", "Shared Redis cache lookups (services/l2cache.py)", ["kind", "result"])
+VERDICTS = Counter(
+    "guess_verdicts", "How guesses were decided (fuzzy, stored, shared, precomputed, embedding, reused, llm, degraded)",
+    ["path"],
+)
+
+
+# --- Stage timing and Server-Timing --------------------------------------------
+
+_request_timings: ContextVar[Optional[list]] = ContextVar("request_timings", default=None)
+
+
+def record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def _server_timing(timings: list, total: float) -> bytes:
+    # Repeated stages (e.g. two commits) are summed
+    merged: dict[str, float] = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    merged["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in merged.items()).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and adds its stage timings as `Server-Timing`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: list = []
+        token = _request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(timings, time.perf_counter() - start)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _request_timings.reset(token)
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=scope["method"], route=route, status=str(status)
+            )
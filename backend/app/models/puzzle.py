@@ -1,5 +1,5 @@
-from pydantic import BaseModel, model_validator
-from typing import List, Optional, Literal, Tuple
+from pydantic import BaseModel, PrivateAttr, model_validator
+from typing import Dict, List, Optional, Literal, Tuple
 
 
 class AnswerVariant(BaseModel):
@@ -8,6 +8,21 @@ class AnswerVariant(BaseModel):
     embedding: List[float]
 
 
+class PrecomputedGuess(BaseModel):
+    """A likely guess scored when the puzzle was published"""
+    text: str
+    similarity: float  # Best embedding similarity to the answer and its variants
+
+
+class ProfileEmbeddings(BaseModel):
+    """Answer and variant vectors for one embedding profile (services/profiles.py)"""
+    dimensions: int
+    quantized: bool = False
+    texts: List[str]
+    vectors: str  # base64 rows: little-endian float32, or int8 when quantized
+    scales: Optional[List[float]] = None  # Per-row scale of int8 rows
+
+
 class GuidedHint(BaseModel):
     """A hint that triggers based on guess content and similarity score"""
     triggerWords: List[str]
@@ -26,8 +41,25 @@ class PuzzleMetadata(BaseModel):
     answerEmbedding: List[float]  # Keep for backwards compatibility
     answerEmbeddings: Optional[List[dict]] = None  # Raw from S3: [{text, embedding}, ...]
     answerVariants: Optional[List[AnswerVariant]] = None  # Parsed variants
+    variantAliases: Optional[List[str]] = None  # Near-duplicate variants stored without vectors (services/variants.py)
+    embeddingModel: Optional[str] = None  # Model of the vectors above; None = LEGACY_EMBEDDING_MODEL
     hints: Optional[List[str]] = None
     guidedHints: Optional[List[GuidedHint]] = None
+    precomputedGuesses: Optional[List[PrecomputedGuess]] = None  # See services/precompute.py
+    precomputedProfile: Optional[str] = None  # Profile key the table was scored under; None = legacy vectors
+    embeddingProfiles: Optional[Dict[str, ProfileEmbeddings]] = None  # Keyed by profile key
+    # Similarity checking mode: "embedding" uses vector similarity, "llm" uses GPT-4o-mini
+    similarityMode: Literal["embedding", "llm"] = "embedding"
+    # Source attribution
+    sourceText: Optional[str] = None  # e.g. "US Census Bureau"
+    sourceUrl: Optional[str] = None  # Link to original data (shown after game ends)
+    # New fields for dual game modes
+    createdAt: Optional[str] = None  # ISO timestamp
+    inEndlessPool: bool = False  # Whether puzzle is in endless mode pool
+    scheduledDate: Optional[str] = None  # YYYY-MM-DD for daily mode
+
+    # Scoring data built from the fields above on first use (services/similarity.py)
+    _derived: dict = PrivateAttr(default_factory=dict)
 
     @model_validator(mode="after")
     def _populate_variants_from_embeddings(self) -> "PuzzleMetadata":
@@ -39,15 +71,6 @@ class PuzzleMetadata(BaseModel):
                 if "text" in e and "embedding" in e
             ]
         return self
-    # Similarity checking mode: "embedding" uses vector similarity, "llm" uses GPT-4o-mini
-    similarityMode: Literal["embedding", "llm"] = "embedding"
-    # Source attribution
-    sourceText: Optional[str] = None  # e.g. "US Census Bureau"
-    sourceUrl: Optional[str] = None  # Link to original data (shown after game ends)
-    # New fields for dual game modes
-    createdAt: Optional[str] = None  # ISO timestamp
-    inEndlessPool: bool = False  # Whether puzzle is in endless mode pool
-    scheduledDate: Optional[str] = None  # YYYY-MM-DD for daily mode
 
 
 class PuzzleIndexEntry(BaseModel):
@@ -92,6 +115,7 @@ class GuessResponse(BaseModel):
     attemptsUsed: int
     sourceUrl: Optional[str] = None  # Only shown when game is over
     guidedHint: Optional[str] = None  # Free hint nudge, null if none triggered
+    degraded: bool = False  # Scored by string match only; the guess was not counted
 
 
 class HintResponse(BaseModel):
@@ -114,6 +138,27 @@ class PlayerStatsResponse(BaseModel):
     hintsUsed: int
 
 
+class WrongGuessCount(BaseModel):
+    guess: str
+    count: int
+
+
+class PuzzleStatsResponse(BaseModel):
+    """Aggregate statistics across all players for one puzzle."""
+    puzzleId: str
+    playersFinished: int
+    solved: int
+    failed: int
+    solveRate: float  # 0.0 - 1.0
+    totalGuesses: int
+    hintsUsed: int
+    guessDistribution: dict[int, int]  # {attempts used: solved games}
+    averageGuesses: float  # average guesses on solved games
+    similarityQuantiles: dict[str, float]  # {"p25": ..., "p50": ..., ...} over all guesses
+    topWrongGuesses: List[WrongGuessCount]
+    beatPercent: Optional[float] = None  # Only when the caller passes their own result
+
+
 class AttemptInfo(BaseModel):
     guess: str  # For hints, this is the hint text
     similarity: float  # 0 for hints
@@ -0,0 +1,51 @@
+"""Shared-state preloading for multi-worker serving (see gunicorn.conf.py).
+
+With `preload_app`, the gunicorn master imports the app and fetches the
+current puzzle before forking, so workers start with modules and puzzle
+data already in memory, shared copy-on-write. Anything holding sockets or
+locks is recreated in each worker by `reset_after_fork()`.
+"""
+import asyncio
+import random
+from typing import Optional
+
+from app.services.s3 import get_s3_service
+
+
+def preload_puzzles() -> Optional[str]:
+    """Load the current puzzle into the S3 service cache; returns its ID.
+
+    None when no puzzle is published for today: nothing to preload, but not a
+    reason to keep the worker out of rotation. S3 errors propagate.
+    """
+    try:
+        return get_s3_service().get_puzzle().id
+    except ValueError as e:
+        print(f"Puzzle preload: {e}")
+        return None
+
+
+async def preload_until_ready(state) -> None:
+    """Retry `preload_puzzles` until it works, then mark `state.ready` (what /ready reports)."""
+    delay = 1.0
+    while True:
+        try:
+            state.ready_puzzle_id = await asyncio.to_thread(preload_puzzles)
+            state.ready = True
+            return
+        except Exception as e:
+            print(f"Puzzle preload failed, retrying in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+def reset_after_fork() -> None:
+    """Give a freshly forked worker its own connections and random state."""
+    from app.db.database import engine, read_engine
+
+    # close=False: the pooled connections belong to the parent; just forget them
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+    get_s3_service().reset_client()
+    # Otherwise every worker draws the same sequence (profile sampling, jitter)
+    random.seed()
@@ -0,0 +1,184 @@
+"""On-demand profiling of guess and hint requests.
+
+A request is profiled when it carries `X-Profile: 1` with a valid
+`X-Admin-Password`, or is picked at random at PROFILE_SAMPLE_RATE. The
+PROFILE_KEEP slowest profiles are kept in memory and downloaded through
+`/api/admin/profiles`.
+
+pyinstrument is used when installed (`pip install pyinstrument`): its async
+mode follows the request's own task across awaits. Otherwise cProfile is
+used, which records everything the event loop thread runs while the request
+is in flight, so other requests can show up in the trace. Only one request
+is profiled at a time per worker; work handed to threads isn't captured.
+"""
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from app.auth import is_admin_password
+from app.config import get_settings
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:  # Optional dependency
+    _Pyinstrument = None
+
+# submit_guess and get_hint
+PROFILED_PATHS = re.compile(r"^/api/puzzle/[^/]+/(guess|hint)$")
+
+
+@dataclass
+class CapturedProfile:
+    id: str
+    method: str
+    path: str
+    status: int
+    seconds: float
+    trigger: str  # "requested" or "sampled"
+    captured_at: str
+    media_type: str
+    body: bytes = field(repr=False)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "seconds": round(self.seconds, 4),
+            "trigger": self.trigger,
+            "capturedAt": self.captured_at,
+            "format": "html" if self.media_type == "text/html" else "pstats",
+        }
+
+
+class ProfileStore:
+    """The N slowest profiles seen; a faster one never displaces a slower one."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._heap: list[tuple[float, int, CapturedProfile]] = []  # min-heap on duration
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, profile: CapturedProfile) -> None:
+        item = (profile.seconds, next(self._order), profile)
+        with self._lock:
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, item)
+            elif profile.seconds > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def list(self) -> list[CapturedProfile]:
+        with self._lock:
+            return [p for _, _, p in sorted(self._heap, reverse=True)]
+
+    def get(self, profile_id: str) -> CapturedProfile | None:
+        return next((p for p in self.list() if p.id == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+
+
+class _Session:
+    """One running profiler; `finish()` returns (media type, report)."""
+
+    def __init__(self):
+        if _Pyinstrument is not None:
+            self._profiler = _Pyinstrument(async_mode="enabled")
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def finish(self) -> tuple[str, bytes]:
+        if _Pyinstrument is not None:
+            self._profiler.stop()
+            return "text/html", self._profiler.output_html().encode("utf-8")
+        self._profiler.disable()
+        out = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(80)
+        return "text/plain", out.getvalue().encode("utf-8")
+
+
+_store: ProfileStore | None = None
+_busy = threading.Lock()  # One profiler at a time per worker
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        _store = ProfileStore(get_settings().profile_keep)
+    return _store
+
+
+def _trigger(scope) -> str | None:
+    settings = get_settings()
+    headers = dict(scope["headers"])
+    if headers.get(b"x-profile") == b"1":
+        # Decoded the way FastAPI decodes the header for admin.verify_admin
+        if is_admin_password(headers.get(b"x-admin-password", b"").decode("latin-1")):
+            return "requested"
+    if settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """Profiles selected guess and hint requests; a no-op for everything else."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILED_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        trigger = _trigger(scope)
+        if trigger is None or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            session = _Session()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                seconds = time.perf_counter() - start
+                media_type, body = session.finish()
+        finally:
+            _busy.release()
+
+        get_profile_store().add(CapturedProfile(
+            id=profile_id,
+            method=scope["method"],
+            path=scope["path"],
+            status=status,
+            seconds=seconds,
+            trigger=trigger,
+            captured_at=datetime.now(timezone.utc).isoformat(),
+            media_type=media_type,
+            body=body,
+        ))
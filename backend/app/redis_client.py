@@ -0,0 +1,70 @@
+"""Shared async Redis connection for state that must be the same in every worker.
+
+`REDIS_URL` picks the server (`redis://host:6379/0`, `rediss://...`);
+`fakeredis://` gives an in-process stand-in for tests and local runs, which
+needs the `fakeredis[lua]` package installed (requirements-dev.txt).
+`get_sync_redis()` is the same server for synchronous code (the S3
+service's L2 puzzle cache); it blocks, so never call it on the event loop.
+"""
+from app.config import get_settings
+
+_redis = None
+_sync_redis = None
+_fake_server = None
+
+
+def _url() -> str:
+    url = get_settings().redis_url
+    if not url:
+        raise RuntimeError("REDIS_URL is not set")
+    return url
+
+
+def _fake():
+    # One server behind both clients, as a real Redis would be
+    global _fake_server
+    import fakeredis
+    if _fake_server is None:
+        _fake_server = fakeredis.FakeServer()
+    return fakeredis, _fake_server
+
+
+def get_redis():
+    """The shared client. Raises RuntimeError when REDIS_URL is not set."""
+    global _redis
+    if _redis is None:
+        url = _url()
+        if url.startswith("fakeredis://"):
+            fakeredis, server = _fake()
+            _redis = fakeredis.FakeAsyncRedis(server=server)
+        else:
+            import redis.asyncio as redis
+            # Short timeouts: callers fail open rather than hold up a request
+            _redis = redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=1.0, health_check_interval=30)
+    return _redis
+
+
+def get_sync_redis():
+    """A blocking client for the same server, timing out after L2_CACHE_TIMEOUT. Raises like get_redis."""
+    global _sync_redis
+    if _sync_redis is None:
+        url = _url()
+        if url.startswith("fakeredis://"):
+            fakeredis, server = _fake()
+            _sync_redis = fakeredis.FakeRedis(server=server)
+        else:
+            import redis
+            timeout = get_settings().l2_cache_timeout
+            _sync_redis = redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout,
+                                         health_check_interval=30)
+    return _sync_redis
+
+
+async def close_redis() -> None:
+    global _redis, _sync_redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+    if _sync_redis is not None:
+        _sync_redis.close()
+        _sync_redis = None
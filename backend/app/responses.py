@@ -0,0 +1,156 @@
+"""Fast JSON responses and negotiated compression.
+
+`FastJSONResponse` is the app's default response class, so anything FastAPI
+serialises is written by orjson rather than `json.dumps`. Routes that already
+hold their result as a Pydantic model or plain JSON data return
+`json_response(...)`, which also skips FastAPI's second pass: re-validating
+the model against `response_model` and walking it with `jsonable_encoder`.
+`response_model` stays on those routes for the OpenAPI schema.
+
+`CompressionMiddleware` brotli- or gzip-encodes responses above a size
+threshold, whichever the client prefers (brotli only if the `brotli`
+package is installed).
+"""
+import gzip
+import zlib
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        # Int keys (e.g. guess distributions) become strings, as json.dumps does
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """Serialise `content` directly, bypassing `response_model` validation.
+
+    Returning a Response makes FastAPI drop the headers set on an injected
+    `response: Response` parameter, so pass it here to keep them (the
+    player-ID cookie, for one).
+    """
+    result = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        result.raw_headers.extend(
+            (name, value) for name, value in response.raw_headers if name != b"content-length"
+        )
+    return result
+
+
+# --- Compression -------------------------------------------------------------
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # Dynamic content: much faster than the default 11, still smaller than gzip
+_SKIP_TYPES = (b"image/", b"video/", b"audio/", b"application/zip", b"application/gzip", b"text/event-stream")
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """The best encoding we support from an Accept-Encoding header (q=0 excluded)."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda name: offered.get(name, offered.get("*", 0.0)))
+    return best if offered.get(best, offered.get("*", 0.0)) > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.flush = self._obj.process, self._obj.finish
+        else:
+            # wbits=31: gzip container
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self.flush = self._obj.compress, self._obj.flush
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Compresses responses of at least `minimum_size` bytes; streamed bodies chunk by chunk."""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = _accepted_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                start_message = message  # Held until we know the body size
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = dict(start_message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if (
+                    b"content-encoding" in headers
+                    or content_type.startswith(_SKIP_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                raw = [(k, v) for k, v in start_message.get("headers", []) if k != b"content-length"]
+                raw.append((b"content-encoding", encoding.encode("latin-1")))
+                raw.append((b"vary", b"Accept-Encoding"))
+                if not more_body:
+                    # Whole body at once: one-shot compression, exact Content-Length
+                    compressed = compress(body, encoding)
+                    raw.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send({**start_message, "headers": raw})
+                    start_message = None
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start_message, "headers": raw})
+                compressor = _Compressor(encoding)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.flush()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import re
 from datetime import datetime, timezone
@@ -5,27 +6,34 @@ from typing import Optional
 from urllib.parse import urlparse
 
 import boto3
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
+from app.auth import is_admin_password
 from app.config import get_settings
+from app.loop_monitor import get_loop_monitor
+from app.profiling import get_profile_store
+from app.responses import json_response
 from app.services.embedding import get_embedding_service, EmbeddingService
 from app.services.llm import get_llm_service, LLMService
 from app.services.s3 import get_s3_service, S3PuzzleService
-from app.models.puzzle import PuzzleIndexEntry
+from app.services.export import AttemptExporter, InvalidExportRequest
+from app.services.precompute import precompute_guesses
+from app.services.profiles import active_profile, build_entry, guess_profile, puzzle_texts
+from app.services.http import get_outbound_http
+from app.services.resilience import upstream_status
+from app.services.variants import reduce_variants
+from app.models.puzzle import PuzzleIndexEntry, PuzzleMetadata
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 _SAFE_PUZZLE_ID = re.compile(r"^[\w-]{1,64}$")
 
 
-def _get_admin_password() -> str:
-    return get_settings().admin_password
-
-
 def verify_admin(x_admin_password: Optional[str] = Header(None)):
     """Verify admin password from header."""
-    if x_admin_password != _get_admin_password():
+    if not is_admin_password(x_admin_password):
         raise HTTPException(status_code=401, detail="Invalid admin password")
     return True
 
@@ -57,12 +65,38 @@ class PuzzleCreateResponse(BaseModel):
     puzzleId: str
     imageUrl: str
     message: str
+    variantReduction: Optional[dict] = None  # VariantReduction.report()
+
+
+async def _profile_entries(
+    texts: list[str],
+    embedding_service: EmbeddingService,
+    existing: Optional[dict] = None,
+) -> Optional[dict]:
+    """Embedding profile entries to store for a puzzle's answer and variants.
+
+    Entries for other profiles are kept (dual-write during a cutover) unless
+    the texts changed; the active profile's entry is (re)built when missing
+    or stale. A failure never blocks the save: such puzzles are scored from
+    their full vectors until re-embedded.
+    """
+    entries = {
+        key: entry for key, entry in (existing or {}).items()
+        if entry["texts"] == texts
+    }
+    profile = active_profile()
+    if profile is not None and profile.key not in entries:
+        try:
+            entries[profile.key] = await build_entry(profile, texts, embedding_service)
+        except Exception as e:
+            print(f"Profile embedding failed for {profile.key}: {e}")
+    return entries or None
 
 
 @router.post("/verify")
 async def verify_password(x_admin_password: Optional[str] = Header(None)):
     """Verify admin password."""
-    if x_admin_password == _get_admin_password():
+    if is_admin_password(x_admin_password):
         return {"valid": True}
     raise HTTPException(status_code=401, detail="Invalid admin password")
 
@@ -145,8 +179,11 @@ async def create_puzzle(
     scheduledDate: str = Form(None),  # Schedule for daily mode (YYYY-MM-DD)
     sourceText: str = Form(None),  # Source attribution text
     sourceUrl: str = Form(None),  # Source link (shown after game ends)
+    precomputeGuesses: Optional[bool] = Form(None),  # Score likely guesses now (default: PRECOMPUTE_GUESSES_ON_PUBLISH)
+    dedupTolerance: Optional[float] = Form(None),  # Near-duplicate variant tolerance (default: VARIANT_DEDUP_TOLERANCE)
     _: bool = Depends(verify_admin),
     embedding_service: EmbeddingService = Depends(get_embedding_service),
+    llm_service: LLMService = Depends(get_llm_service),
     s3_service: S3PuzzleService = Depends(get_s3_service),
 ):
     """Create a puzzle with the given image and answer."""
@@ -186,28 +223,51 @@ async def create_puzzle(
     all_texts.extend(clean_synonyms)
 
     # Batch embed all texts in a single API call
+    embedding_model = settings.embedding_model  # Recorded so other models' workers don't compare against them
     try:
-        all_embeddings = await embedding_service.embed_batch(all_texts)
+        all_embeddings = await embedding_service.embed_batch(all_texts, dimensions=0)
 
-        # First embedding is for the answer
-        answer_embedding = all_embeddings[0]
+        # First embedding is for the answer; stored in the puzzle JSON as plain floats
+        answer_embedding = all_embeddings[0].tolist()
 
         # Build answer variants from results (store original text but use lowercased embedding)
         answer_variants = [{"text": answer.lower(), "embedding": answer_embedding}]
         for i, synonym in enumerate(clean_synonyms):
             answer_variants.append({
                 "text": synonym,
-                "embedding": all_embeddings[i + 1]
+                "embedding": all_embeddings[i + 1].tolist()
             })
     except Exception as e:
         # If batch fails, try just the answer
         print(f"Batch embedding failed: {e}, trying answer only")
         try:
-            answer_embedding = await embedding_service.embed(answer.lower())
+            answer_embedding = (await embedding_service.embed_batch([answer.lower()], dimensions=0))[0].tolist()
             answer_variants = [{"text": answer.lower(), "embedding": answer_embedding}]
         except Exception as e2:
             raise HTTPException(status_code=500, detail=f"Failed to embed answer: {e2}")
 
+    # Drop near-duplicate synonyms: every stored variant is compared with every guess.
+    # Their texts stay on the puzzle for string and LLM matching
+    reduction = reduce_variants(
+        answer_variants,
+        dedupTolerance if dedupTolerance is not None else settings.variant_dedup_tolerance,
+    )
+    answer_variants = reduction.variants
+
+    # Optionally score likely guesses now, so launch traffic skips the embedding call
+    precomputed = None
+    if precomputeGuesses if precomputeGuesses is not None else settings.precompute_guesses_on_publish:
+        try:
+            precomputed = await precompute_guesses(
+                answer.lower(), answer_variants, embedding_service, llm_service,
+                count=settings.precompute_guess_count,
+            ) or None
+        except Exception as e:
+            # Never block publishing on this
+            print(f"Guess precomputation failed: {e}")
+
+    profile_entries = await _profile_entries([v["text"] for v in answer_variants], embedding_service)
+
     # Parse mode options
     scheduled = scheduledDate if scheduledDate and scheduledDate.strip() else None
     created_at = datetime.now(timezone.utc).isoformat()
@@ -229,7 +289,12 @@ async def create_puzzle(
         "similarityMode": sim_mode,
         "answerEmbedding": answer_embedding,  # Keep for backwards compatibility
         "answerVariants": answer_variants,  # New: all variants with embeddings
+        "variantAliases": reduction.aliases or None,
+        "embeddingModel": embedding_model,
         "hints": hints_list if hints_list else None,
+        "precomputedGuesses": precomputed,
+        "precomputedProfile": guess_profile().key if precomputed else None,
+        "embeddingProfiles": profile_entries,
         # Source attribution
         "sourceText": source_text,
         "sourceUrl": source_url,
@@ -260,6 +325,7 @@ async def create_puzzle(
         puzzleId=puzzle_date,
         imageUrl=imageUrl,
         message=f"Puzzle created successfully for {puzzle_date}",
+        variantReduction=reduction.report(similarityThreshold),
     )
 
 
@@ -274,9 +340,9 @@ async def list_all_puzzles(
     s3_service = get_s3_service()
     puzzles = s3_service.get_all_puzzles()
 
-    return {
+    return json_response({
         "puzzles": [p.model_dump() for p in puzzles],
-    }
+    })
 
 
 @router.get("/puzzles/endless-pool")
@@ -287,10 +353,10 @@ async def get_endless_pool(
     s3_service = get_s3_service()
     puzzles = s3_service.get_endless_pool_puzzles()
 
-    return {
+    return json_response({
         "puzzles": [p.model_dump() for p in puzzles],
         "count": len(puzzles),
-    }
+    })
 
 
 @router.post("/puzzles/{puzzle_id}/endless-pool")
@@ -361,6 +427,8 @@ async def get_puzzle_details(
             "inEndlessPool": puzzle.inEndlessPool,
             "scheduledDate": puzzle.scheduledDate,
             "answerVariants": [v.text for v in puzzle.answerVariants] if puzzle.answerVariants else [],
+            "variantAliases": puzzle.variantAliases or [],  # Also synonyms, stored without vectors
+            "precomputedGuessCount": len(puzzle.precomputedGuesses or []),
         }
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -379,8 +447,10 @@ async def update_puzzle(
     sourceUrl: str = Form(None),
     inEndlessPool: bool = Form(False),
     scheduledDate: str = Form(None),
+    dedupTolerance: Optional[float] = Form(None),
     _: bool = Depends(verify_admin),
     embedding_service: EmbeddingService = Depends(get_embedding_service),
+    llm_service: LLMService = Depends(get_llm_service),
     s3_service: S3PuzzleService = Depends(get_s3_service),
 ):
     """Update an existing puzzle's metadata."""
@@ -411,9 +481,10 @@ async def update_puzzle(
     # Check if answer changed - need to re-embed
     answer_changed = answer.lower() != existing.answer.lower()
     synonyms_changed = set([s.strip().lower() for s in synonyms_list]) != set(
-        [v.text.lower() for v in existing.answerVariants] if existing.answerVariants else []
+        [v.text.lower() for v in existing.answerVariants or []] + [a.lower() for a in existing.variantAliases or []]
     )
 
+    reduction = None
     if answer_changed or synonyms_changed:
         # Re-embed answer and synonyms
         all_texts = [answer.lower()]
@@ -421,20 +492,54 @@ async def update_puzzle(
         all_texts.extend(clean_synonyms)
 
         try:
-            all_embeddings = await embedding_service.embed_batch(all_texts)
-            answer_embedding = all_embeddings[0]
+            all_embeddings = await embedding_service.embed_batch(all_texts, dimensions=0)
+            embedding_model = settings.embedding_model
+            answer_embedding = all_embeddings[0].tolist()
             answer_variants = [{"text": answer.lower(), "embedding": answer_embedding}]
             for i, synonym in enumerate(clean_synonyms):
                 answer_variants.append({
                     "text": synonym,
-                    "embedding": all_embeddings[i + 1]
+                    "embedding": all_embeddings[i + 1].tolist()
                 })
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to embed: {e}")
+
+        reduction = reduce_variants(
+            answer_variants,
+            dedupTolerance if dedupTolerance is not None else settings.variant_dedup_tolerance,
+        )
+        answer_variants = reduction.variants
+        variant_aliases = reduction.aliases or None
+
+        # Precomputed scores were against the old answer: re-score the same guesses
+        precomputed = None
+        precomputed_profile = None
+        if existing.precomputedGuesses:
+            try:
+                precomputed = await precompute_guesses(
+                    answer.lower(), answer_variants, embedding_service, llm_service,
+                    count=settings.precompute_guess_count,
+                    guesses=[g.text for g in existing.precomputedGuesses],
+                ) or None
+                precomputed_profile = guess_profile().key if precomputed else None
+            except Exception as e:
+                print(f"Guess precomputation failed: {e}")
     else:
         # Keep existing embeddings
+        embedding_model = existing.embeddingModel
         answer_embedding = existing.answerEmbedding
         answer_variants = [v.model_dump() for v in existing.answerVariants] if existing.answerVariants else []
+        variant_aliases = existing.variantAliases
+        precomputed = [g.model_dump() for g in existing.precomputedGuesses] if existing.precomputedGuesses else None
+        precomputed_profile = existing.precomputedProfile
+
+    existing_entries = (
+        {key: entry.model_dump() for key, entry in existing.embeddingProfiles.items()}
+        if existing.embeddingProfiles else None
+    )
+    profile_entries = await _profile_entries(
+        [v["text"] for v in answer_variants], embedding_service, existing_entries
+    )
 
     # Parse and validate optional fields
     source_text = sourceText.strip() if sourceText and sourceText.strip() else None
@@ -452,7 +557,12 @@ async def update_puzzle(
         "similarityMode": sim_mode,
         "answerEmbedding": answer_embedding,
         "answerVariants": answer_variants,
+        "variantAliases": variant_aliases,
+        "embeddingModel": embedding_model,
         "hints": hints_list if hints_list else None,
+        "precomputedGuesses": precomputed,
+        "precomputedProfile": precomputed_profile,
+        "embeddingProfiles": profile_entries,
         "sourceText": source_text,
         "sourceUrl": source_url,
         "createdAt": existing.createdAt,
@@ -480,6 +590,44 @@ async def update_puzzle(
         "success": True,
         "puzzleId": puzzle_id,
         "message": "Puzzle updated successfully",
+        "variantReduction": reduction.report(similarityThreshold) if reduction else None,
+    }
+
+
+@router.post("/puzzles/{puzzle_id}/reembed")
+async def reembed_puzzle(
+    puzzle_id: str,
+    _: bool = Depends(verify_admin),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    s3_service: S3PuzzleService = Depends(get_s3_service),
+):
+    """Store vectors for the active embedding profile on an existing puzzle."""
+    profile = active_profile()
+    if profile is None:
+        raise HTTPException(status_code=400, detail="No embedding profile configured (EMBEDDING_DIMENSIONS / EMBEDDING_QUANTIZE)")
+
+    try:
+        puzzle = s3_service.get_puzzle(puzzle_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    texts = puzzle_texts(puzzle)
+    try:
+        entry = await build_entry(profile, texts, embedding_service)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to embed: {e}")
+
+    entries = {key: e.model_dump() for key, e in (puzzle.embeddingProfiles or {}).items()}
+    entries[profile.key] = entry
+    updated = PuzzleMetadata(**{**puzzle.model_dump(), "embeddingProfiles": entries})
+    s3_service.save_puzzle(updated)
+
+    return {
+        "success": True,
+        "puzzleId": puzzle_id,
+        "profile": profile.key,
+        "vectors": len(texts),
+        "dimensions": entry["dimensions"],
     }
 
 
@@ -504,8 +652,103 @@ async def get_calendar(
         if puzzle_info:
             scheduled_puzzles[date] = puzzle_info.model_dump()
 
-    return {
+    return json_response({
         "year": year,
         "month": month,
         "schedule": scheduled_puzzles,
-    }
+    })
+
+
+@router.get("/export/{kind}")
+async def export_data(
+    kind: str,
+    format: str = Query("ndjson"),
+    puzzleId: Optional[str] = Query(None),
+    startDate: Optional[str] = Query(None),  # YYYY-MM-DD, inclusive
+    endDate: Optional[str] = Query(None),  # YYYY-MM-DD, inclusive
+    pageToken: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    _: bool = Depends(verify_admin),
+):
+    """Stream `attempts` or `game-states` as NDJSON or CSV.
+
+    Reads run on a separate connection pool in batches, so exports of any
+    size use constant memory and don't hold up guesses. With `limit`, the
+    `X-Next-Page-Token` response header carries the token to pass back as
+    `pageToken`; it is absent on the last page.
+    """
+    if puzzleId and not _SAFE_PUZZLE_ID.match(puzzleId):
+        raise HTTPException(status_code=400, detail="Invalid puzzle ID format")
+
+    try:
+        exporter = AttemptExporter(
+            kind,
+            fmt=format,
+            puzzle_id=puzzleId,
+            start_date=startDate,
+            end_date=endDate,
+            page_token=pageToken,
+            limit=limit,
+        )
+    except InvalidExportRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    extension = "ndjson" if format == "ndjson" else "csv"
+    headers = {"Content-Disposition": f'attachment; filename="{kind}.{extension}"'}
+    # Headers go out before the body, so the page's end is found first
+    next_page_token = await asyncio.to_thread(exporter.plan_page)
+    if next_page_token:
+        headers["X-Next-Page-Token"] = next_page_token
+    return StreamingResponse(exporter.stream(), media_type=exporter.media_type, headers=headers)
+
+
+@router.get("/outbound-pool")
+async def get_outbound_pool(
+    _: bool = Depends(verify_admin),
+):
+    """Per-host pool metrics and per-upstream breaker and admission state."""
+    return {"hosts": get_outbound_http().pool_metrics(), "upstreams": upstream_status()}
+
+
+@router.get("/profiles")
+async def list_profiles(
+    _: bool = Depends(verify_admin),
+):
+    """Slowest profiled requests captured by this worker, slowest first."""
+    return {"profiles": [p.summary() for p in get_profile_store().list()]}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    _: bool = Depends(verify_admin),
+):
+    """One captured profile: pyinstrument HTML, or cProfile stats as text."""
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (evicted or captured by another worker)")
+    extension = "html" if profile.media_type == "text/html" else "txt"
+    return Response(
+        content=profile.body,
+        media_type=profile.media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.{extension}"'},
+    )
+
+
+@router.delete("/profiles")
+async def clear_profiles(
+    _: bool = Depends(verify_admin),
+):
+    get_profile_store().clear()
+    return {"success": True}
+
+
+@router.get("/loop-blocks")
+async def get_loop_blocks(
+    _: bool = Depends(verify_admin),
+):
+    """Event-loop stalls seen by this worker, grouped by call site (LOOP_MONITOR_ENABLED)."""
+    monitor = get_loop_monitor()
+    if monitor is None:
+        return {"enabled": False, "sites": []}
+    return {"enabled": True, "thresholdSeconds": monitor.threshold, "sites": monitor.report()}
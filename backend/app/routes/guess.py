@@ -1,10 +1,11 @@
 import re
+import time
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Cookie, Header, HTTPException, Request
+from fastapi import APIRouter, Depends, Cookie, Header, HTTPException
 from sqlalchemy.orm import Session
-from rapidfuzz import fuzz
 
+from app import metrics
 from app.config import get_settings
 from app.db.database import get_db
 from app.limiter import limiter
@@ -12,8 +13,9 @@ from app.models.puzzle import GuessRequest, GuessResponse
 from app.services.s3 import get_s3_service, S3PuzzleService
 from app.services.embedding import get_embedding_service, EmbeddingService
 from app.services.llm import get_llm_service, LLMService, LLMUnavailableError
-from app.services.similarity import cosine_similarity
+from app.services.evaluation import GuessEvaluator, select_guided_hint
 from app.services.attempts import AttemptService
+from app.services.stats import get_stats_service, PuzzleStatsService
 
 router = APIRouter(prefix="/api", tags=["guess"])
 
@@ -25,10 +27,31 @@ def _validate_puzzle_id(puzzle_id: str) -> None:
         raise HTTPException(status_code=400, detail="Invalid puzzle ID format")
 
 
-@router.post("/puzzle/{puzzle_id}/guess", response_model=GuessResponse)
-@limiter.limit("60/minute")
+def _degraded_response(puzzle, game_state, fuzzy_score: float) -> GuessResponse:
+    """Answer for a guess that could only be scored by string match.
+
+    Used when the embedding call ran past the latency budget or an upstream
+    circuit is open. Not recorded and doesn't cost a guess: a near-miss is
+    never marked wrong just because OpenAI was slow or down.
+    """
+    used = game_state.total_guesses if game_state else 0
+    return GuessResponse(
+        correct=False,
+        gameOver=False,
+        similarity=fuzzy_score,
+        remainingGuesses=puzzle.maxGuesses - used,
+        message="Scoring is slow right now, so this guess wasn't counted. Please try again.",
+        attemptsUsed=used,
+        degraded=True,
+    )
+
+
+@router.post(
+    "/puzzle/{puzzle_id}/guess",
+    response_model=GuessResponse,
+    dependencies=[Depends(limiter.limit("60/minute"))],
+)
 async def submit_guess(
-    request: Request,
     puzzle_id: str,
     body: GuessRequest,
     player_id: Optional[str] = Cookie(None),
@@ -36,9 +59,11 @@ async def submit_guess(
     s3_service: S3PuzzleService = Depends(get_s3_service),
     embedding_service: EmbeddingService = Depends(get_embedding_service),
     llm_service: LLMService = Depends(get_llm_service),
+    stats_service: PuzzleStatsService = Depends(get_stats_service),
     db: Session = Depends(get_db),
 ):
     """Submit a guess and get similarity score."""
+    started = time.monotonic()
     _validate_puzzle_id(puzzle_id)
 
     # Accept player ID from header (mobile) or cookie (desktop)
@@ -51,7 +76,8 @@ async def submit_guess(
 
     # Get puzzle data
     try:
-        puzzle = s3_service.get_puzzle(puzzle_id)
+        with metrics.timed("puzzle_load"):
+            puzzle = await s3_service.get_puzzle_async(puzzle_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -86,98 +112,33 @@ async def submit_guess(
             sourceUrl=puzzle.sourceUrl,
         )
 
-    # Calculate similarity against all answer variants
     guess_text = body.guess.strip().lower()
 
-    # First, check fuzzy string match (catches typos like "untied states" -> "united states")
-    best_fuzzy = 0.0
-    answer_texts = [puzzle.answer.lower()]
-    variant_texts = []
-    if puzzle.answerVariants:
-        variant_texts = [v.text.lower() for v in puzzle.answerVariants if v.text]
-        answer_texts.extend(variant_texts)
-
-    for answer_text in answer_texts:
-        # Use token_sort_ratio to handle word order differences too
-        fuzzy_score = fuzz.token_sort_ratio(guess_text, answer_text) / 100.0
-        if fuzzy_score > best_fuzzy:
-            best_fuzzy = fuzzy_score
-
-    # Gate the embedding API call: skip if fuzzy already gives a definitive correct answer
-    if best_fuzzy >= 0.90:
-        best_similarity = best_fuzzy
-    else:
-        # Calculate embedding similarity for UI display
-        guess_embedding = await embedding_service.embed(guess_text)
-        best_similarity = cosine_similarity(puzzle.answerEmbedding, guess_embedding)
-
-        if puzzle.answerVariants:
-            for variant in puzzle.answerVariants:
-                variant_similarity = cosine_similarity(variant.embedding, guess_embedding)
-                if variant_similarity > best_similarity:
-                    best_similarity = variant_similarity
-
-    # Take the best of fuzzy and embedding similarity for display
-    similarity = max(best_similarity, best_fuzzy)
-
-    # Determine correctness - greedy approach:
-    # 1. If fuzzy or embedding is good enough, count as correct immediately
-    # 2. Only fall back to LLM if in LLM mode and neither was good enough
-    if best_fuzzy >= 0.90 or similarity >= puzzle.similarityThreshold:
-        # Fast path: embedding or fuzzy match is good enough
-        is_correct = True
-        similarity = max(similarity, puzzle.similarityThreshold)
-    elif puzzle.similarityMode == "llm":
-        # Slow path: call LLM only if embedding wasn't good enough
-        try:
-            is_correct, llm_confidence = await llm_service.check_guess_match(
-                answer=puzzle.answer,
-                guess=guess_text,
-                variants=variant_texts if variant_texts else None,
-            )
-        except LLMUnavailableError:
-            raise HTTPException(
-                status_code=503,
-                detail="Guess evaluation service temporarily unavailable. Please try again.",
-            )
-        # If LLM says correct, ensure similarity shows as high
-        if is_correct:
-            similarity = max(similarity, puzzle.similarityThreshold)
-    else:
-        # Embedding mode but didn't meet threshold
-        is_correct = False
+    # Score the guess within what is left of the latency budget
+    evaluator = GuessEvaluator(embedding_service, llm_service)
+    budget = get_settings().guess_latency_budget - (time.monotonic() - started)
+    try:
+        verdict = await evaluator.evaluate(puzzle, guess_text, budget)
+    except LLMUnavailableError:
+        raise HTTPException(
+            status_code=503,
+            detail="Guess evaluation service temporarily unavailable. Please try again.",
+        )
+    if verdict.degraded:
+        print(f"Guess degraded to fuzzy match for puzzle {puzzle_id}")
+        return _degraded_response(puzzle, game_state, verdict.similarity)
+    similarity = verdict.similarity
+    is_correct = verdict.is_correct
 
     # Check for guided hints (free nudges, don't cost a guess)
     guided_hint_text = None
     if not is_correct and puzzle.guidedHints:
-        # Determine which hints have already been shown by checking prior attempts
-        prior_attempts = attempt_service.get_user_attempts(effective_player_id, puzzle_id)
-        shown_hints: set[str] = set()
-        for prior in prior_attempts:
-            if prior.is_hint:
-                continue
-            prior_guess = prior.guess_text.lower()
-            prior_sim = prior.similarity_score
-            for gh in puzzle.guidedHints:
-                min_sim, max_sim = gh.similarityRange
-                if min_sim <= prior_sim <= max_sim and any(
-                    word.lower() in prior_guess for word in gh.triggerWords
-                ):
-                    shown_hints.add(gh.hint)
-
-        # Find best (lowest priority) matching hint not yet shown
-        best_guided: tuple[int, str] | None = None
-        for gh in puzzle.guidedHints:
-            if gh.hint in shown_hints:
-                continue
-            min_sim, max_sim = gh.similarityRange
-            if min_sim <= similarity <= max_sim and any(
-                word.lower() in guess_text for word in gh.triggerWords
-            ):
-                if best_guided is None or gh.priority < best_guided[0]:
-                    best_guided = (gh.priority, gh.hint)
-        if best_guided is not None:
-            guided_hint_text = best_guided[1]
+        with metrics.timed("guided_hints"):
+            # Hints shown before are replayed from earlier guesses; a first guess has none
+            prior_attempts = []
+            if game_state and game_state.total_guesses:
+                prior_attempts = await attempt_service.get_user_attempts(effective_player_id, puzzle_id)
+            guided_hint_text = select_guided_hint(puzzle.guidedHints, prior_attempts, guess_text, similarity)
 
     # Record attempt
     updated_state = attempt_service.record_attempt(
@@ -191,6 +152,15 @@ async def submit_guess(
     remaining = max(puzzle.maxGuesses - updated_state.total_guesses, 0)
     game_over = is_correct or remaining == 0
 
+    stats_service.record_guess(
+        puzzle_id,
+        guess_text=guess_text,
+        similarity=similarity,
+        is_correct=is_correct,
+        attempts_used=updated_state.total_guesses,
+        game_over=game_over,
+    )
+
     if is_correct:
         message = "Correct! You got it!"
     elif remaining > 0:
@@ -1,7 +1,7 @@
 import re
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Cookie, Header, HTTPException, Request
+from fastapi import APIRouter, Depends, Cookie, Header, HTTPException
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
@@ -9,6 +9,7 @@ from app.limiter import limiter
 from app.models.puzzle import HintResponse
 from app.services.s3 import get_s3_service, S3PuzzleService
 from app.services.attempts import AttemptService
+from app.services.stats import get_stats_service, PuzzleStatsService
 
 router = APIRouter(prefix="/api", tags=["hints"])
 
@@ -20,14 +21,17 @@ def _validate_puzzle_id(puzzle_id: str) -> None:
         raise HTTPException(status_code=400, detail="Invalid puzzle ID format")
 
 
-@router.get("/puzzle/{puzzle_id}/hint", response_model=HintResponse)
-@limiter.limit("60/minute")
+@router.get(
+    "/puzzle/{puzzle_id}/hint",
+    response_model=HintResponse,
+    dependencies=[Depends(limiter.limit("60/minute"))],
+)
 async def get_hint(
-    request: Request,
     puzzle_id: str,
     player_id: Optional[str] = Cookie(None),
     x_player_id: Optional[str] = Header(None),
     s3_service: S3PuzzleService = Depends(get_s3_service),
+    stats_service: PuzzleStatsService = Depends(get_stats_service),
     db: Session = Depends(get_db),
 ):
     """Get next hint for the puzzle. Costs one guess."""
@@ -38,7 +42,7 @@ async def get_hint(
         raise HTTPException(status_code=400, detail="Player ID required")
 
     try:
-        puzzle = s3_service.get_puzzle(puzzle_id)
+        puzzle = await s3_service.get_puzzle_async(puzzle_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -70,6 +74,12 @@ async def get_hint(
     # Calculate remaining guesses after this hint
     remaining_guesses = puzzle.maxGuesses - (total_guesses + 1)
 
+    stats_service.record_hint(
+        puzzle_id,
+        attempts_used=total_guesses + 1,
+        game_over=remaining_guesses <= 0,
+    )
+
     return HintResponse(
         hintIndex=hint_index,
         hintText=hint_text,
@@ -95,7 +105,7 @@ async def get_revealed_hints(
         return {"hints": [], "hintsRemaining": 0}
 
     try:
-        puzzle = s3_service.get_puzzle(puzzle_id)
+        puzzle = await s3_service.get_puzzle_async(puzzle_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
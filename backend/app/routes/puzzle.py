@@ -2,14 +2,21 @@ import re
 from typing import Optional
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, Response, Cookie, Header, HTTPException
+from fastapi import APIRouter, Depends, Response, Cookie, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
-from app.db.models import DailyGameState
-from app.models.puzzle import PuzzleResponse, AttemptsResponse, AttemptInfo, PlayerStatsResponse
+from app.responses import json_response
+from app.models.puzzle import (
+    PuzzleResponse,
+    AttemptsResponse,
+    AttemptInfo,
+    PlayerStatsResponse,
+    PuzzleStatsResponse,
+)
 from app.services.s3 import get_s3_service, S3PuzzleService
 from app.services.attempts import AttemptService
+from app.services.stats import get_stats_service, PuzzleStatsService, beat_percent
 
 router = APIRouter(prefix="/api", tags=["puzzle"])
 
@@ -63,13 +70,13 @@ async def get_daily_puzzle(
     player_id = get_or_set_player_id(response, player_id, x_player_id)
 
     try:
-        puzzle = s3_service.get_puzzle()
+        puzzle = await s3_service.get_puzzle_async()
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
     hints_count = len(puzzle.hints) if puzzle.hints else 0
 
-    return PuzzleResponse(
+    return json_response(PuzzleResponse(
         id=puzzle.id,
         imageUrl=puzzle.imageUrl,
         maxGuesses=puzzle.maxGuesses,
@@ -77,7 +84,7 @@ async def get_daily_puzzle(
         prompt="Guess what this map represents",
         hintsAvailable=hints_count,
         sourceText=puzzle.sourceText,
-    )
+    ), response)
 
 
 @router.get("/puzzle/{puzzle_id}", response_model=PuzzleResponse)
@@ -93,13 +100,13 @@ async def get_puzzle_by_id(
     player_id = get_or_set_player_id(response, player_id, x_player_id)
 
     try:
-        puzzle = s3_service.get_puzzle(puzzle_id)
+        puzzle = await s3_service.get_puzzle_async(puzzle_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
     hints_count = len(puzzle.hints) if puzzle.hints else 0
 
-    return PuzzleResponse(
+    return json_response(PuzzleResponse(
         id=puzzle.id,
         imageUrl=puzzle.imageUrl,
         maxGuesses=puzzle.maxGuesses,
@@ -107,7 +114,7 @@ async def get_puzzle_by_id(
         prompt="Guess what this map represents",
         hintsAvailable=hints_count,
         sourceText=puzzle.sourceText,
-    )
+    ), response)
 
 
 @router.get("/player/stats", response_model=PlayerStatsResponse)
@@ -122,12 +129,8 @@ async def get_player_stats(
         raise HTTPException(status_code=400, detail="Player ID required")
 
     # Get all game states for this player
-    games = (
-        db.query(DailyGameState)
-        .filter(DailyGameState.user_id == effective_player_id)
-        .order_by(DailyGameState.puzzle_date.asc())
-        .all()
-    )
+    attempt_service = AttemptService(db)
+    games = attempt_service.get_player_games(effective_player_id)
 
     total_played = len(games)
     solved_games = [g for g in games if g.solved]
@@ -150,8 +153,8 @@ async def get_player_stats(
     current_streak = 0
     max_streak = 0
     streak = 0
-    sorted_dates = sorted(set(g.puzzle_date for g in games))
-    solved_dates = set(g.puzzle_date for g in solved_games)
+    sorted_dates = sorted(set(attempt_service.puzzle_id_for(g) for g in games))
+    solved_dates = set(attempt_service.puzzle_id_for(g) for g in solved_games)
 
     from datetime import date, timedelta
     for i, d in enumerate(sorted_dates):
@@ -170,7 +173,7 @@ async def get_player_stats(
         max_streak = max(max_streak, streak)
     current_streak = streak
 
-    return PlayerStatsResponse(
+    return json_response(PlayerStatsResponse(
         totalPlayed=total_played,
         totalSolved=total_solved,
         successRate=round(success_rate, 3),
@@ -179,7 +182,30 @@ async def get_player_stats(
         averageGuesses=round(avg_guesses, 1),
         guessDistribution=dist,
         hintsUsed=hints_used,
-    )
+    ))
+
+
+@router.get("/puzzle/{puzzle_id}/stats", response_model=PuzzleStatsResponse)
+async def get_puzzle_stats(
+    puzzle_id: str,
+    attempts: Optional[int] = Query(None, ge=1, le=20),
+    solved: bool = True,
+    stats_service: PuzzleStatsService = Depends(get_stats_service),
+):
+    """Get aggregate stats for a puzzle across all players.
+
+    Pass `attempts` (and `solved=false` for a loss) to also get the share of
+    players the caller beat. Served from a cached aggregate, never from a scan
+    of the attempts tables.
+    """
+    _validate_puzzle_id(puzzle_id)
+    summary = await stats_service.get_summary_async(puzzle_id)
+
+    return json_response(PuzzleStatsResponse(
+        puzzleId=puzzle_id,
+        beatPercent=beat_percent(summary, attempts, solved) if attempts is not None else None,
+        **summary,
+    ))
 
 
 @router.get("/puzzle/{puzzle_id}/attempts", response_model=AttemptsResponse)
@@ -194,10 +220,10 @@ async def get_user_attempts(
     _validate_puzzle_id(puzzle_id)
     effective_player_id = x_player_id or player_id
     if not effective_player_id:
-        return AttemptsResponse(attempts=[], gameState=None)
+        return json_response(AttemptsResponse(attempts=[], gameState=None))
 
     attempt_service = AttemptService(db)
-    attempts = attempt_service.get_user_attempts(effective_player_id, puzzle_id)
+    attempts = await attempt_service.get_user_attempts(effective_player_id, puzzle_id)
     game_state = attempt_service.get_game_state(effective_player_id, puzzle_id)
 
     # Check if game is over to reveal answer
@@ -205,7 +231,7 @@ async def get_user_attempts(
     source_url = None
     if game_state:
         try:
-            puzzle = s3_service.get_puzzle(puzzle_id)
+            puzzle = await s3_service.get_puzzle_async(puzzle_id)
             is_game_over = game_state.solved or game_state.total_guesses >= puzzle.maxGuesses
             if is_game_over:
                 answer = puzzle.answer
@@ -213,7 +239,7 @@ async def get_user_attempts(
         except ValueError:
             pass  # Puzzle not found, just don't include answer
 
-    return AttemptsResponse(
+    return json_response(AttemptsResponse(
         attempts=[
             AttemptInfo(
                 guess=a.guess_text,
@@ -233,4 +259,4 @@ async def get_user_attempts(
         else None,
         answer=answer,
         sourceUrl=source_url,
-    )
+    ))
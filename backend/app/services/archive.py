@@ -0,0 +1,306 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db import keys
+from app.db.models import NAMED_PUZZLE_KEY_BASE, UserAttempt, DailyGameState, Player, GuessText
+from app.services.s3 import get_s3_service
+
+
+@dataclass
+class ArchivedAttempt:
+    """An attempt read back from cold storage; same attributes routes use on UserAttempt."""
+    guess_text: str
+    similarity_score: float
+    is_correct: bool
+    is_hint: bool
+    created_at: datetime
+
+
+@dataclass
+class _CachedArchive:
+    version: Optional[str]  # S3 ETag, or mtime and size of a local file; None if there is no archive
+    raw: bytes
+    checked_at: float  # time.monotonic() of the last comparison with storage
+
+
+class AttemptArchive:
+    """Moves attempts for old puzzle dates out of SQLite into gzipped NDJSON.
+
+    One file per puzzle, one line per attempt, ordered by player. Files live in
+    a local directory or under an S3 prefix. `daily_game_state` rows stay
+    behind as the per-player summary and are flagged `archived`.
+
+    Reads answer one player at a time: the (compressed) file is kept in a
+    small LRU and only that player's lines are decoded, off the event loop.
+    The archive job runs in another process and appends to these files, so
+    cached copies are revalidated once they are `archive_cache_ttl` old.
+    """
+
+    READ_CHUNK = 64 * 1024
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._cache: OrderedDict[str, _CachedArchive] = OrderedDict()
+        self._lock = threading.Lock()  # Reads run in worker threads
+
+    # --- Storage ---
+
+    def _object_name(self, puzzle_id: str) -> str:
+        return f"{puzzle_id}.ndjson.gz"
+
+    @staticmethod
+    def _file_version(stat: os.stat_result) -> str:
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _read_raw(self, puzzle_id: str) -> tuple[Optional[str], bytes]:
+        """Version and contents of the puzzle's archive; (None, b"") if it has none."""
+        name = self._object_name(puzzle_id)
+        if self.settings.archive_location == "s3":
+            s3 = get_s3_service()
+            try:
+                response = s3.s3_client.get_object(
+                    Bucket=self.settings.s3_bucket_name,
+                    Key=f"{self.settings.archive_s3_prefix}{name}",
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] == "NoSuchKey":
+                    return None, b""
+                raise
+            return response["ETag"], response["Body"].read()
+
+        path = os.path.join(self.settings.archive_dir, name)
+        if not os.path.exists(path):
+            return None, b""
+        with open(path, "rb") as f:
+            return self._file_version(os.fstat(f.fileno())), f.read()
+
+    def _version(self, puzzle_id: str) -> Optional[str]:
+        """Current version of the puzzle's archive, without downloading it."""
+        name = self._object_name(puzzle_id)
+        if self.settings.archive_location == "s3":
+            s3 = get_s3_service()
+            try:
+                response = s3.s3_client.head_object(
+                    Bucket=self.settings.s3_bucket_name,
+                    Key=f"{self.settings.archive_s3_prefix}{name}",
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                    return None
+                raise
+            return response["ETag"]
+
+        try:
+            return self._file_version(os.stat(os.path.join(self.settings.archive_dir, name)))
+        except FileNotFoundError:
+            return None
+
+    def _write(self, puzzle_id: str, fileobj) -> None:
+        """Append a gzip member to the puzzle's archive.
+
+        Concatenated gzip members decompress as one stream, so attempts that
+        arrive after a puzzle was archived are simply appended on the next run.
+        """
+        name = self._object_name(puzzle_id)
+        if self.settings.archive_location == "s3":
+            _, existing = self._read_raw(puzzle_id)
+            fileobj.seek(0)
+            s3 = get_s3_service()
+            s3.s3_client.put_object(
+                Bucket=self.settings.s3_bucket_name,
+                Key=f"{self.settings.archive_s3_prefix}{name}",
+                Body=existing + fileobj.read(),
+                ContentType="application/x-ndjson",
+                ContentEncoding="gzip",
+            )
+            return
+
+        os.makedirs(self.settings.archive_dir, exist_ok=True)
+        fileobj.seek(0)
+        with open(os.path.join(self.settings.archive_dir, name), "ab") as f:
+            shutil.copyfileobj(fileobj, f)
+
+    # --- Archiving ---
+
+    def archivable_puzzle_keys(self, db: Session, horizon_days: int) -> List[int]:
+        """Date-keyed puzzles older than the horizon that still have hot attempts.
+
+        Named (non-date) puzzles have no age and are never archived.
+        """
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=horizon_days)
+        cutoff_key = keys.encode_puzzle_date(cutoff.isoformat())
+        return list(db.execute(
+            select(UserAttempt.puzzle_key)
+            .where(UserAttempt.puzzle_key < cutoff_key)
+            .where(UserAttempt.puzzle_key < NAMED_PUZZLE_KEY_BASE)
+            .distinct()
+            .order_by(UserAttempt.puzzle_key)
+        ).scalars())
+
+    def archive_puzzle(self, db: Session, puzzle_key: int) -> int:
+        """Export one puzzle's attempts, then delete them. Returns rows archived."""
+        puzzle_id = keys.puzzle_id_for_key(db, puzzle_key)
+        rows = db.execute(
+            select(
+                UserAttempt.id,
+                Player.public_id,
+                GuessText.text,
+                UserAttempt.raw_guess_text,
+                UserAttempt.similarity_score,
+                UserAttempt.is_correct,
+                UserAttempt.is_hint,
+                UserAttempt.created_at,
+            )
+            .join(Player, Player.id == UserAttempt.player_key)
+            .outerjoin(GuessText, GuessText.id == UserAttempt.guess_id)
+            .where(UserAttempt.puzzle_key == puzzle_key)
+            .order_by(UserAttempt.player_key, UserAttempt.id)
+            .execution_options(yield_per=1000)
+        )
+
+        count = 0
+        max_id = 0
+        # Spill to disk past a few MB so popular puzzles don't sit in memory
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            with gzip.GzipFile(fileobj=spool, mode="wb") as gz:
+                for row in rows:
+                    line = {
+                        "id": row.id,
+                        "player": row.public_id,
+                        "guess": row.text if row.text is not None else row.raw_guess_text,
+                        "similarity": row.similarity_score,
+                        "correct": bool(row.is_correct),
+                        "hint": bool(row.is_hint),
+                        "ts": int(row.created_at.replace(tzinfo=timezone.utc).timestamp() * 1000),
+                    }
+                    gz.write(json.dumps(line, separators=(",", ":")).encode("utf-8") + b"\n")
+                    count += 1
+                    max_id = max(max_id, row.id)
+            if count == 0:
+                return 0
+            self._write(puzzle_id, spool)
+
+        # Only delete what we exported; attempts recorded meanwhile stay hot
+        db.query(UserAttempt).filter(
+            UserAttempt.puzzle_key == puzzle_key,
+            UserAttempt.id <= max_id,
+        ).delete(synchronize_session=False)
+        db.query(DailyGameState).filter(
+            DailyGameState.puzzle_key == puzzle_key,
+        ).update({DailyGameState.archived: True}, synchronize_session=False)
+        db.commit()
+        with self._lock:
+            self._cache.pop(puzzle_id, None)
+        return count
+
+    # --- Reading ---
+
+    def _raw(self, puzzle_id: str) -> bytes:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(puzzle_id)
+            if cached is not None:
+                self._cache.move_to_end(puzzle_id)
+        if cached is not None:
+            if now - cached.checked_at < self.settings.archive_cache_ttl:
+                return cached.raw
+            # Only download again if the job has appended since
+            if self._version(puzzle_id) == cached.version:
+                cached.checked_at = now
+                return cached.raw
+
+        version, raw = self._read_raw(puzzle_id)
+        with self._lock:
+            self._cache[puzzle_id] = _CachedArchive(version, raw, now)
+            self._cache.move_to_end(puzzle_id)
+            while len(self._cache) > self.settings.archive_cache_size:
+                self._cache.popitem(last=False)
+        return raw
+
+    def _lines(self, puzzle_id: str, raw: bytes) -> Iterator[bytes]:
+        """Decompressed lines of every gzip member, streamed.
+
+        A damaged member (a torn append, a flipped byte) is reported and
+        skipped up to the next member header; the rest of the file still reads.
+        """
+        view = memoryview(raw)
+        start = 0
+        while start < len(raw):
+            decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            pos, tail = start, b""
+            try:
+                while not decoder.eof and pos < len(raw):
+                    chunk = view[pos:pos + self.READ_CHUNK]
+                    pos += len(chunk)
+                    *lines, tail = (tail + decoder.decompress(chunk)).split(b"\n")
+                    yield from lines
+            except zlib.error as e:
+                print(f"Archive for {puzzle_id}: damaged gzip member at byte {start}: {e}")
+                start = raw.find(b"\x1f\x8b\x08", start + 1)
+                if start < 0:
+                    return
+                continue
+            if not decoder.eof:
+                print(f"Archive for {puzzle_id}: truncated gzip member at byte {start}")
+                return
+            yield tail
+            start = pos - len(decoder.unused_data)
+
+    def get_attempts(self, user_id: str, puzzle_id: str) -> List[ArchivedAttempt]:
+        """A player's archived attempts for a puzzle, oldest first. Blocking: see get_attempts_async."""
+        # Matched on the serialised form before parsing, so other players' lines are never decoded
+        needle = b'"player":' + json.dumps(user_id).encode("utf-8") + b","
+        attempts: List[ArchivedAttempt] = []
+        seen: set[tuple[int, int]] = set()
+        for line in self._lines(puzzle_id, self._raw(puzzle_id)):
+            if needle not in line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue  # Cut short by a damaged member
+            # A run that died between upload and delete re-exports its rows.
+            # SQLite reuses row ids once the highest rows are deleted, so
+            # the id alone isn't unique across runs; with the timestamp it is.
+            if data["player"] != user_id or (data["id"], data["ts"]) in seen:
+                continue
+            seen.add((data["id"], data["ts"]))
+            attempts.append(ArchivedAttempt(
+                guess_text=data["guess"],
+                similarity_score=data["similarity"],
+                is_correct=data["correct"],
+                is_hint=data["hint"],
+                created_at=datetime.fromtimestamp(data["ts"] / 1000, tz=timezone.utc).replace(tzinfo=None),
+            ))
+        return attempts
+
+    async def get_attempts_async(self, user_id: str, puzzle_id: str) -> List[ArchivedAttempt]:
+        """get_attempts in a worker thread: the download and decompression stay off the event loop."""
+        return await asyncio.to_thread(self.get_attempts, user_id, puzzle_id)
+
+
+# Singleton instance
+_attempt_archive: AttemptArchive | None = None
+
+
+def get_attempt_archive() -> AttemptArchive:
+    global _attempt_archive
+    if _attempt_archive is None:
+        _attempt_archive = AttemptArchive()
+    return _attempt_archive
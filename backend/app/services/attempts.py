@@ -1,39 +1,101 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
+from app.db import keys
 from app.db.models import UserAttempt, DailyGameState
+from app.services.archive import ArchivedAttempt, get_attempt_archive
 
 
 class AttemptService:
-    """Service for tracking user attempts."""
+    """Service for tracking user attempts.
+
+    Callers pass public player and puzzle IDs; they are translated to the
+    integer keys stored in the attempt tables here.
+    """
 
     def __init__(self, db: Session):
         self.db = db
 
-    def get_user_attempts(self, user_id: str, puzzle_date: str) -> List[UserAttempt]:
-        """Get all attempts for a user for a specific puzzle."""
-        return (
+    async def get_user_attempts(
+        self, user_id: str, puzzle_date: str
+    ) -> List[Union[UserAttempt, ArchivedAttempt]]:
+        """Get all attempts for a user for a specific puzzle.
+
+        Attempts for archived puzzles are read back from cold storage (in a
+        worker thread) and come before any recorded since the puzzle was archived.
+        """
+        player_key = keys.player_key(self.db, user_id)
+        puzzle_key = keys.puzzle_key(self.db, puzzle_date)
+        if player_key is None or puzzle_key is None:
+            return []
+        hot = (
             self.db.query(UserAttempt)
             .filter(
-                UserAttempt.user_id == user_id,
-                UserAttempt.puzzle_date == puzzle_date,
+                UserAttempt.player_key == player_key,
+                UserAttempt.puzzle_key == puzzle_key,
             )
-            .order_by(UserAttempt.created_at.asc())
+            .order_by(UserAttempt.id.asc())
             .all()
         )
+        game_state = self.db.get(DailyGameState, (player_key, puzzle_key))
+        if game_state is not None and game_state.archived:
+            return await get_attempt_archive().get_attempts_async(user_id, puzzle_date) + hot
+        return hot
 
     def get_game_state(self, user_id: str, puzzle_date: str) -> Optional[DailyGameState]:
         """Get current game state for user."""
+        player_key = keys.player_key(self.db, user_id)
+        puzzle_key = keys.puzzle_key(self.db, puzzle_date)
+        if player_key is None or puzzle_key is None:
+            return None
+        return self.db.get(DailyGameState, (player_key, puzzle_key))
+
+    def get_player_games(self, user_id: str) -> List[DailyGameState]:
+        """Get all game states for a user, oldest puzzle first."""
+        player_key = keys.player_key(self.db, user_id)
+        if player_key is None:
+            return []
         return (
             self.db.query(DailyGameState)
-            .filter(
-                DailyGameState.user_id == user_id,
-                DailyGameState.puzzle_date == puzzle_date,
+            .filter(DailyGameState.player_key == player_key)
+            .order_by(DailyGameState.puzzle_key.asc())
+            .all()
+        )
+
+    def puzzle_id_for(self, game_state: DailyGameState) -> str:
+        """Public puzzle ID of a game state row."""
+        return keys.puzzle_id_for_key(self.db, game_state.puzzle_key)
+
+    def _new_attempt(self, player_key: int, puzzle_key: int, text: str, **fields) -> UserAttempt:
+        if get_settings().intern_guess_texts:
+            return UserAttempt(
+                player_key=player_key,
+                puzzle_key=puzzle_key,
+                guess_id=keys.guess_key(self.db, text),
+                **fields,
             )
-            .first()
+        return UserAttempt(
+            player_key=player_key,
+            puzzle_key=puzzle_key,
+            raw_guess_text=text,
+            **fields,
         )
 
+    def _get_or_create_state(self, player_key: int, puzzle_key: int) -> DailyGameState:
+        game_state = self.db.get(DailyGameState, (player_key, puzzle_key))
+        if not game_state:
+            game_state = DailyGameState(
+                player_key=player_key,
+                puzzle_key=puzzle_key,
+                total_guesses=0,
+                solved=False,
+                hints_revealed=0,
+            )
+            self.db.add(game_state)
+        return game_state
+
     def record_attempt(
         self,
         user_id: str,
@@ -43,28 +105,21 @@ class AttemptService:
         is_correct: bool,
     ) -> DailyGameState:
         """Record a new attempt and update game state."""
+        player_key = keys.player_key(self.db, user_id, create=True)
+        puzzle_key = keys.puzzle_key(self.db, puzzle_date, create=True)
+
         # Create attempt record
-        attempt = UserAttempt(
-            user_id=user_id,
-            puzzle_date=puzzle_date,
-            guess_text=guess_text,
+        attempt = self._new_attempt(
+            player_key,
+            puzzle_key,
+            guess_text,
             similarity_score=similarity_score,
             is_correct=is_correct,
         )
         self.db.add(attempt)
 
         # Update or create game state
-        game_state = self.get_game_state(user_id, puzzle_date)
-        if not game_state:
-            game_state = DailyGameState(
-                user_id=user_id,
-                puzzle_date=puzzle_date,
-                total_guesses=0,
-                solved=False,
-                hints_revealed=0,
-            )
-            self.db.add(game_state)
-
+        game_state = self._get_or_create_state(player_key, puzzle_key)
         game_state.total_guesses += 1
         if is_correct:
             game_state.solved = True
@@ -75,11 +130,14 @@ class AttemptService:
 
     def record_hint_used(self, user_id: str, puzzle_date: str, hint_text: str) -> int:
         """Record that a hint was revealed. Costs one guess. Returns new hint count."""
+        player_key = keys.player_key(self.db, user_id, create=True)
+        puzzle_key = keys.puzzle_key(self.db, puzzle_date, create=True)
+
         # Create attempt record for the hint
-        attempt = UserAttempt(
-            user_id=user_id,
-            puzzle_date=puzzle_date,
-            guess_text=hint_text,
+        attempt = self._new_attempt(
+            player_key,
+            puzzle_key,
+            hint_text,
             similarity_score=0.0,
             is_correct=False,
             is_hint=True,
@@ -87,17 +145,7 @@ class AttemptService:
         self.db.add(attempt)
 
         # Update or create game state
-        game_state = self.get_game_state(user_id, puzzle_date)
-        if not game_state:
-            game_state = DailyGameState(
-                user_id=user_id,
-                puzzle_date=puzzle_date,
-                total_guesses=0,
-                solved=False,
-                hints_revealed=0,
-            )
-            self.db.add(game_state)
-
+        game_state = self._get_or_create_state(player_key, puzzle_key)
         game_state.hints_revealed += 1
         game_state.total_guesses += 1  # Hints cost a guess!
         self.db.commit()
@@ -105,16 +153,21 @@ class AttemptService:
 
     def reset_game(self, user_id: str, puzzle_date: str) -> None:
         """Reset game state and delete attempts for debugging."""
+        player_key = keys.player_key(self.db, user_id)
+        puzzle_key = keys.puzzle_key(self.db, puzzle_date)
+        if player_key is None or puzzle_key is None:
+            return
+
         # Delete all attempts
         self.db.query(UserAttempt).filter(
-            UserAttempt.user_id == user_id,
-            UserAttempt.puzzle_date == puzzle_date,
+            UserAttempt.player_key == player_key,
+            UserAttempt.puzzle_key == puzzle_key,
         ).delete()
 
         # Delete game state
         self.db.query(DailyGameState).filter(
-            DailyGameState.user_id == user_id,
-            DailyGameState.puzzle_date == puzzle_date,
+            DailyGameState.player_key == player_key,
+            DailyGameState.puzzle_key == puzzle_key,
         ).delete()
 
         self.db.commit()
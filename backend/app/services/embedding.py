@@ -1,60 +1,190 @@
-import httpx
+import asyncio
+import base64
+import time
+from collections import deque
 from typing import List
 
+import numpy as np
+
+from app import metrics
 from app.config import get_settings
+from app.services.http import get_outbound_http
+from app.services.l2cache import get_l2_cache
+from app.services.resilience import get_upstream, UpstreamUnavailable
+
+
+class EmbeddingBudgetExceeded(Exception):
+    """Raised when no embedding arrived within the caller's latency budget."""
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    MIN_SAMPLES = 20  # Below this the percentile is too noisy to act on
+
+    def __init__(self, window: int):
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self.samples) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
 
 
 class EmbeddingService:
     """OpenAI embedding client."""
 
-    EMBEDDING_URL = "https://api.openai.com/v1/embeddings"
+    TIMEOUT = 10.0  # seconds
 
     def __init__(self):
         self.settings = get_settings()
-        self.client = httpx.AsyncClient(timeout=10.0)
-
-    async def embed(self, text: str) -> List[float]:
-        """Get embedding vector for text using OpenAI API."""
-        response = await self.client.post(
-            self.EMBEDDING_URL,
-            headers={
-                "Authorization": f"Bearer {self.settings.openai_api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": self.settings.embedding_model,
-                "input": text,
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["data"][0]["embedding"]
-
-    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Get embedding vectors for multiple texts in a single API call."""
+        self.http = get_outbound_http()
+        self.upstream = get_upstream("embeddings")
+        self.embedding_url = f"{self.settings.openai_base_url}/embeddings"
+        self.latency = LatencyTracker(self.settings.embedding_latency_window)
+        self.l2 = get_l2_cache()
+        self.hedged_calls = 0
+        self.budget_exceeded = 0
+
+    def hedge_delay(self, budget: float) -> float:
+        """How long to wait on the first call before sending a second one.
+
+        Follows the observed tail latency; until enough calls have been seen,
+        waits half the budget so a cold worker doesn't double every request.
+        """
+        p = self.latency.percentile(self.settings.embedding_hedge_percentile)
+        if p is None:
+            p = budget / 2
+        return max(p, self.settings.embedding_hedge_min_delay)
+
+    async def _timed_embed(self, text: str) -> np.ndarray:
+        start = time.perf_counter()
+        try:
+            embedding = await self.embed(text)
+        except asyncio.CancelledError:
+            # A hedge loser or a call cut off at the budget: it would have
+            # taken at least this long. Leaving it out would bias the tail
+            # (and so the hedge delay) towards the calls that were fast.
+            self.latency.observe(time.perf_counter() - start)
+            raise
+        self.latency.observe(time.perf_counter() - start)
+        return embedding
+
+    async def embed_within(self, text: str, budget: float) -> np.ndarray:
+        """Embed `text`, hedging a slow call, within `budget` seconds.
+
+        A guess any worker embedded recently comes from the shared L2 cache
+        with no API call; the lookup's time counts against the budget.
+        If the first request is still running after `hedge_delay`, or fails
+        early, a second identical request is sent and whichever answers first
+        wins; the other is cancelled. Raises EmbeddingBudgetExceeded when the
+        budget runs out, UpstreamUnavailable when the call is refused, or the
+        last upstream error if both requests fail.
+        """
+        start = asyncio.get_running_loop().time()
+        cached = await self.l2.get_embedding(text)
+        if cached is not None:
+            return cached
+        embedding = await self._embed_hedged(text, budget - (asyncio.get_running_loop().time() - start))
+        self.l2.put_embedding(text, embedding)
+        return embedding
+
+    async def _embed_hedged(self, text: str, budget: float) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget
+        hedge_at = loop.time() + self.hedge_delay(budget)
+        pending = {asyncio.create_task(self._timed_embed(text))}
+        hedged = False
+        last_error: BaseException | None = None
+        try:
+            while True:
+                now = loop.time()
+                if now >= deadline:
+                    self.budget_exceeded += 1
+                    raise EmbeddingBudgetExceeded(f"No embedding within {budget:.2f}s")
+                wake = deadline if hedged else min(deadline, hedge_at)
+                done, pending = await asyncio.wait(
+                    pending, timeout=wake - now, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    if isinstance(last_error, UpstreamUnavailable):
+                        # Refused locally: a hedge would be refused too
+                        raise last_error
+                if not hedged and (not pending or loop.time() >= hedge_at):
+                    pending.add(asyncio.create_task(self._timed_embed(text)))
+                    hedged = True
+                    self.hedged_calls += 1
+                elif not pending:
+                    raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+                # Retrieve the result of a loser that already finished so
+                # asyncio doesn't log its exception as never retrieved
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _decode(self, item: dict) -> np.ndarray:
+        embedding = item["embedding"]
+        if isinstance(embedding, str):
+            # Little-endian float32, straight from the base64 payload
+            return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+        # Servers that ignore encoding_format send plain floats
+        return np.asarray(embedding, dtype=np.float32)
+
+    async def _request(
+        self, payload: str | List[str], dimensions: int | None, model: str | None = None
+    ) -> List[dict]:
+        body = {
+            "model": model or self.settings.embedding_model,
+            "input": payload,
+            "encoding_format": "base64",
+        }
+        if dimensions is None:
+            dimensions = self.settings.embedding_dimensions
+        if dimensions:
+            body["dimensions"] = dimensions
+
+        async with self.upstream.guard():
+            response = await self.http.client.post(
+                self.embedding_url,
+                headers={
+                    "Authorization": f"Bearer {self.settings.openai_api_key}",
+                    "Content-Type": "application/json",
+                },
+                json=body,
+                timeout=self.TIMEOUT,
+            )
+            response.raise_for_status()
+        return response.json()["data"]
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Get the float32 embedding vector for text using OpenAI API."""
+        data = await self._request(text, None)
+        return self._decode(data[0])
+
+    async def embed_batch(
+        self, texts: List[str], dimensions: int | None = None, model: str | None = None
+    ) -> np.ndarray:
+        """Get embeddings for multiple texts in a single API call, one row per text.
+
+        `dimensions` overrides EMBEDDING_DIMENSIONS (0 asks for the model's full
+        size) and `model` overrides EMBEDDING_MODEL.
+        """
         if not texts:
-            return []
-
-        response = await self.client.post(
-            self.EMBEDDING_URL,
-            headers={
-                "Authorization": f"Bearer {self.settings.openai_api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": self.settings.embedding_model,
-                "input": texts,
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
+            return np.empty((0, 0), dtype=np.float32)
 
-        # Sort by index to maintain order
-        sorted_data = sorted(data["data"], key=lambda x: x["index"])
-        return [item["embedding"] for item in sorted_data]
+        data = await self._request(texts, dimensions, model)
 
-    async def close(self):
-        await self.client.aclose()
+        # Sort by index to maintain order
+        sorted_data = sorted(data, key=lambda x: x["index"])
+        return np.stack([self._decode(item) for item in sorted_data])
 
 
 # Singleton instance
@@ -66,3 +196,14 @@ def get_embedding_service() -> EmbeddingService:
     if _embedding_service is None:
         _embedding_service = EmbeddingService()
     return _embedding_service
+
+
+@metrics.collector
+def _embedding_samples():
+    if _embedding_service is None:
+        return
+    yield from metrics.family("embedding_hedged_calls_total", "counter", "Guess embeddings sent a second time",
+                              [({}, _embedding_service.hedged_calls)])
+    yield from metrics.family("embedding_budget_exceeded_total", "counter",
+                              "Guess embeddings abandoned at the latency budget",
+                              [({}, _embedding_service.budget_exceeded)])
@@ -0,0 +1,225 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from rapidfuzz import fuzz
+
+from app import metrics
+from app.config import get_settings
+from app.models.puzzle import GuidedHint, PuzzleMetadata
+from app.services.embedding import EmbeddingService, EmbeddingBudgetExceeded
+from app.services.l2cache import get_l2_cache
+from app.services.llm import LLMService, LLMUnavailableError
+from app.services.precompute import precomputed_similarity
+from app.services.profiles import scoring_matrix
+from app.services.resilience import CircuitOpenError
+from app.services.similarity import best_similarity
+from app.services.verdicts import StoredVerdict, get_verdict_store
+
+# Fuzzy score at which a guess is correct without calling any API
+FUZZY_GATE = 0.90
+
+
+def _triggers(hint: GuidedHint, text: str, similarity: float) -> bool:
+    min_sim, max_sim = hint.similarityRange
+    return min_sim <= similarity <= max_sim and any(word.lower() in text for word in hint.triggerWords)
+
+
+def select_guided_hint(
+    guided_hints: list[GuidedHint], prior_attempts: list, guess_text: str, similarity: float
+) -> Optional[str]:
+    """The guided hint to show for a wrong guess, if any.
+
+    Hints a prior guess would already have triggered are skipped; among the
+    rest that this guess triggers, the lowest `priority` wins.
+    """
+    # Determine which hints have already been shown by replaying prior attempts
+    shown_hints: set[str] = set()
+    for prior in prior_attempts:
+        if prior.is_hint:
+            continue
+        prior_guess = prior.guess_text.lower()
+        for gh in guided_hints:
+            if _triggers(gh, prior_guess, prior.similarity_score):
+                shown_hints.add(gh.hint)
+
+    best: tuple[int, str] | None = None
+    for gh in guided_hints:
+        if gh.hint not in shown_hints and _triggers(gh, guess_text, similarity):
+            if best is None or gh.priority < best[0]:
+                best = (gh.priority, gh.hint)
+    return best[1] if best is not None else None
+
+
+@dataclass
+class Verdict:
+    similarity: float
+    is_correct: bool
+    degraded: bool = False  # Only string matching was possible
+
+
+class GuessEvaluator:
+    """Scores a guess against a puzzle's answer and its variants.
+
+    In LLM mode the LLM check is started alongside the embedding call rather
+    than after it, and cancelled as soon as the embedding alone decides the
+    verdict, so a guess that needs both waits for the slower of the two
+    instead of their sum. Verdicts are kept in the verdict store, so repeated
+    and near-identical guesses skip the API calls, and in the shared L2
+    cache, so a guess judged by any worker is answered by all of them.
+    """
+
+    def __init__(self, embedding_service: EmbeddingService, llm_service: LLMService):
+        self.embedding_service = embedding_service
+        self.llm_service = llm_service
+        self.verdicts = get_verdict_store()
+        self.l2 = get_l2_cache()
+        self.settings = get_settings()
+
+    @staticmethod
+    def _variant_texts(puzzle: PuzzleMetadata) -> list[str]:
+        texts = [v.text for v in puzzle.answerVariants or []] + list(puzzle.variantAliases or [])
+        return [text.lower() for text in texts if text]
+
+    def fuzzy_score(self, puzzle: PuzzleMetadata, guess_text: str) -> float:
+        """Best string match against the answer and variants (catches typos like "untied states")."""
+        best = 0.0
+        for answer_text in [puzzle.answer.lower()] + self._variant_texts(puzzle):
+            # token_sort_ratio handles word order differences too
+            best = max(best, fuzz.token_sort_ratio(guess_text, answer_text) / 100.0)
+        return best
+
+    def _check_with_llm(self, puzzle: PuzzleMetadata, guess_text: str):
+        variants = self._variant_texts(puzzle)
+        return self.llm_service.check_guess_match(
+            answer=puzzle.answer,
+            guess=guess_text,
+            variants=variants if variants else None,
+        )
+
+    def _speculate(self, puzzle: PuzzleMetadata) -> bool:
+        """Start the LLM call before the embedding is back?
+
+        Not when most LLM-mode guesses end up answered from the verdict
+        store: the speculative call would usually be wasted.
+        """
+        hit_rate = self.verdicts.hit_rate(puzzle)
+        return hit_rate is None or hit_rate < self.settings.verdict_speculate_below
+
+    async def _judge_with_llm(self, puzzle: PuzzleMetadata, guess_text: str, fuzzy: float) -> Verdict:
+        """Verdict for a puzzle with no answer vectors from the active model.
+
+        Comparing the guess against another model's vectors would give a
+        meaningless score, so the LLM decides, whatever the puzzle's mode;
+        if it can't, only the fuzzy match is left.
+        """
+        try:
+            with metrics.timed("llm"):
+                is_correct, _confidence = await self._check_with_llm(puzzle, guess_text)
+        except (LLMUnavailableError, CircuitOpenError):
+            metrics.VERDICTS.inc(path="degraded")
+            return Verdict(similarity=fuzzy, is_correct=False, degraded=True)
+        metrics.VERDICTS.inc(path="llm")
+        similarity = max(fuzzy, puzzle.similarityThreshold) if is_correct else fuzzy
+        return Verdict(similarity=similarity, is_correct=is_correct)
+
+    async def evaluate(self, puzzle: PuzzleMetadata, guess_text: str, budget: float) -> Verdict:
+        """Score `guess_text`, spending at most `budget` seconds on embeddings.
+
+        If no embedding can be had (budget spent, breaker open, upstream
+        errors) the verdict is the fuzzy match alone, marked `degraded`.
+        Raises LLMUnavailableError if an LLM-mode verdict can't be obtained.
+        """
+        with metrics.timed("fuzzy"):
+            fuzzy = self.fuzzy_score(puzzle, guess_text)
+        threshold = puzzle.similarityThreshold
+
+        # A definitive string match needs no API call
+        if fuzzy >= FUZZY_GATE:
+            metrics.VERDICTS.inc(path="fuzzy")
+            return Verdict(similarity=max(fuzzy, threshold), is_correct=True)
+
+        # Same text judged before: no API call either
+        known = self.verdicts.exact(puzzle, guess_text)
+        if known is not None:
+            metrics.VERDICTS.inc(path="stored")
+            return Verdict(similarity=known.similarity, is_correct=known.is_correct)
+        if self.l2.enabled:
+            with metrics.timed("l2"):
+                known = await self.l2.get_verdict(puzzle, guess_text)
+            if known is not None:
+                metrics.VERDICTS.inc(path="shared")
+                return Verdict(similarity=known.similarity, is_correct=known.is_correct)
+
+        matrix = scoring_matrix(puzzle)
+        if matrix is None:
+            return await self._judge_with_llm(puzzle, guess_text, fuzzy)
+
+        llm_mode = puzzle.similarityMode == "llm"
+
+        # Scored when the puzzle was published: no embedding call needed, and
+        # none at all unless an LLM-mode guess falls between floor and threshold
+        precomputed = precomputed_similarity(puzzle, guess_text)
+        if precomputed is not None:
+            similarity = max(precomputed, fuzzy)
+            if similarity >= threshold:
+                metrics.VERDICTS.inc(path="precomputed")
+                return Verdict(similarity=max(similarity, threshold), is_correct=True)
+            if not llm_mode or similarity < self.settings.llm_similarity_floor:
+                metrics.VERDICTS.inc(path="precomputed")
+                return Verdict(similarity=similarity, is_correct=False)
+
+        llm_task: Optional[asyncio.Task] = None
+        if llm_mode and self._speculate(puzzle):
+            llm_task = asyncio.create_task(self._check_with_llm(puzzle, guess_text))
+
+        llm_correct = None  # Set only when the LLM itself was asked
+        path = "embedding"
+        try:
+            with metrics.timed("embedding"):
+                guess_embedding = await self.embedding_service.embed_within(guess_text, budget)
+            with metrics.timed("similarity"):
+                similarity = max(best_similarity(matrix, guess_embedding), fuzzy)
+
+            if similarity >= threshold:
+                # Embedding clears the threshold: correct without waiting on the LLM
+                is_correct = True
+                similarity = max(similarity, threshold)
+            elif not llm_mode or similarity < self.settings.llm_similarity_floor:
+                # Embedding mode, or too far off for the LLM to plausibly accept
+                is_correct = False
+            else:
+                # A near-identical guess the LLM already judged answers for this one
+                is_correct = self.verdicts.nearest_llm_verdict(puzzle, guess_embedding)
+                path = "reused"
+                if is_correct is None:
+                    if llm_task is None:
+                        llm_task = asyncio.create_task(self._check_with_llm(puzzle, guess_text))
+                    # Time still spent waiting once the embedding is in
+                    with metrics.timed("llm"):
+                        llm_correct, _confidence = await llm_task
+                    is_correct = llm_correct
+                    path = "llm"
+                # If the LLM says correct, ensure similarity shows as high
+                if is_correct:
+                    similarity = max(similarity, threshold)
+        except (EmbeddingBudgetExceeded, CircuitOpenError):
+            metrics.VERDICTS.inc(path="degraded")
+            return Verdict(similarity=fuzzy, is_correct=False, degraded=True)
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            # Both hedged calls failed; each was already counted by the
+            # embeddings breaker, so enough of these open it
+            print(f"Embedding failed for puzzle {puzzle.id}: {e!r}")
+            metrics.VERDICTS.inc(path="degraded")
+            return Verdict(similarity=fuzzy, is_correct=False, degraded=True)
+        finally:
+            if llm_task is not None and not llm_task.done():
+                llm_task.cancel()
+                llm_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        verdict = StoredVerdict(is_correct=is_correct, similarity=similarity, llm_correct=llm_correct)
+        self.verdicts.add(puzzle, guess_text, guess_embedding, verdict)
+        self.l2.put_verdict(puzzle, guess_text, verdict)
+        metrics.VERDICTS.inc(path=path)
+        return Verdict(similarity=similarity, is_correct=is_correct)
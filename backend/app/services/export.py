@@ -0,0 +1,238 @@
+import base64
+import csv
+import io
+import json
+from datetime import timezone
+from typing import Iterator, Optional
+
+from sqlalchemy import select, tuple_
+
+from app.db import keys
+from app.db.database import get_read_db_session
+from app.db.models import NAMED_PUZZLE_KEY_BASE, UserAttempt, DailyGameState, Player, GuessText
+
+BATCH_SIZE = 1000
+
+ATTEMPT_FIELDS = ["id", "player", "puzzle", "guess", "similarity", "correct", "hint", "createdAt"]
+GAME_STATE_FIELDS = ["player", "puzzle", "solved", "totalGuesses", "hintsRevealed", "archived"]
+
+
+class InvalidExportRequest(ValueError):
+    """Raised for malformed filters or page tokens."""
+
+
+def encode_page_token(kind: str, after: list) -> str:
+    raw = json.dumps({"kind": kind, "after": after}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# Keyset columns a page token resumes after: the attempt id, or (player key, puzzle key)
+_TOKEN_KEY_LENGTH = {"attempts": 1, "game-states": 2}
+
+
+def decode_page_token(kind: str, token: str) -> list:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidExportRequest("Malformed page token")
+    if not isinstance(data, dict) or data.get("kind") != kind:
+        raise InvalidExportRequest("Page token does not belong to this export")
+    after = data.get("after")
+    # Checked here, before the response starts streaming: a bad key would
+    # otherwise only fail as an SQL error halfway through the body
+    if (
+        not isinstance(after, list)
+        or len(after) != _TOKEN_KEY_LENGTH.get(kind)
+        or not all(isinstance(v, int) and not isinstance(v, bool) for v in after)
+    ):
+        raise InvalidExportRequest("Malformed page token")
+    return after
+
+
+class AttemptExporter:
+    """Streams attempts or game states in keyset order from the read pool.
+
+    Rows are fetched in batches with `yield_per`, so memory stays flat however
+    large the export is. With `limit`, `plan_page` finds the last row of the
+    page before anything is streamed, so the token that resumes after it can
+    go in the response headers rather than in the data.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        fmt: str = "ndjson",
+        puzzle_id: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        page_token: Optional[str] = None,
+        limit: Optional[int] = None,
+    ):
+        if kind not in ("attempts", "game-states"):
+            raise InvalidExportRequest(f"Unknown export: {kind}")
+        if fmt not in ("ndjson", "csv"):
+            raise InvalidExportRequest("format must be ndjson or csv")
+        self.kind = kind
+        self.fmt = fmt
+        self.puzzle_id = puzzle_id
+        self.start_key = self._date_key(start_date)
+        self.end_key = self._date_key(end_date)
+        self.after = decode_page_token(kind, page_token) if page_token else None
+        self.limit = limit
+        self.until: Optional[list] = None  # Key of the page's last row; set by plan_page
+
+    @staticmethod
+    def _date_key(value: Optional[str]) -> Optional[int]:
+        if not value:
+            return None
+        key = keys.encode_puzzle_date(value)
+        if key is None:
+            raise InvalidExportRequest(f"Invalid date: {value} (expected YYYY-MM-DD)")
+        return key
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self.fmt == "ndjson" else "text/csv"
+
+    @property
+    def fields(self) -> list[str]:
+        return ATTEMPT_FIELDS if self.kind == "attempts" else GAME_STATE_FIELDS
+
+    def _filter_puzzles(self, stmt, column, db):
+        if self.puzzle_id:
+            puzzle_key = keys.puzzle_key(db, self.puzzle_id)
+            # Unknown puzzle: nothing can match
+            stmt = stmt.where(column == (puzzle_key if puzzle_key is not None else -1))
+        if self.start_key is not None or self.end_key is not None:
+            stmt = stmt.where(column < NAMED_PUZZLE_KEY_BASE)
+        if self.start_key is not None:
+            stmt = stmt.where(column >= self.start_key)
+        if self.end_key is not None:
+            stmt = stmt.where(column <= self.end_key)
+        return stmt
+
+    def _page_bounds(self, stmt):
+        if self.kind == "attempts":
+            if self.after:
+                stmt = stmt.where(UserAttempt.id > self.after[0])
+            if self.until:
+                stmt = stmt.where(UserAttempt.id <= self.until[0])
+            return stmt
+        key = tuple_(DailyGameState.player_key, DailyGameState.puzzle_key)
+        if self.after:
+            stmt = stmt.where(key > tuple_(*self.after))
+        if self.until:
+            stmt = stmt.where(key <= tuple_(*self.until))
+        return stmt
+
+    def plan_page(self) -> Optional[str]:
+        """Fix where a limited page ends; returns the next page's token, None on the last page.
+
+        Reads only the keys of rows `limit` and `limit + 1`. The page then
+        streams every row up to the first of them, so rows inserted meanwhile
+        are neither skipped nor repeated by the next page.
+        """
+        if self.limit is None:
+            return None
+        if self.kind == "attempts":
+            columns = [UserAttempt.id]
+            puzzle_column, player_column = UserAttempt.puzzle_key, UserAttempt.player_key
+        else:
+            columns = [DailyGameState.player_key, DailyGameState.puzzle_key]
+            puzzle_column, player_column = DailyGameState.puzzle_key, DailyGameState.player_key
+        with get_read_db_session() as db:
+            # Same joins and filters as the rows themselves, keys only
+            stmt = select(*columns).join(Player, Player.id == player_column)
+            stmt = self._page_bounds(self._filter_puzzles(stmt, puzzle_column, db))
+            bounds = db.execute(stmt.order_by(*columns).offset(self.limit - 1).limit(2)).all()
+        if len(bounds) < 2:
+            return None
+        self.until = list(bounds[0])
+        return encode_page_token(self.kind, self.until)
+
+    def _attempt_rows(self, db) -> Iterator[dict]:
+        stmt = (
+            select(
+                UserAttempt.id,
+                Player.public_id,
+                UserAttempt.puzzle_key,
+                GuessText.text,
+                UserAttempt.raw_guess_text,
+                UserAttempt.similarity_score,
+                UserAttempt.is_correct,
+                UserAttempt.is_hint,
+                UserAttempt.created_at,
+            )
+            .join(Player, Player.id == UserAttempt.player_key)
+            .outerjoin(GuessText, GuessText.id == UserAttempt.guess_id)
+            .order_by(UserAttempt.id)
+        )
+        stmt = self._page_bounds(self._filter_puzzles(stmt, UserAttempt.puzzle_key, db))
+
+        for row in db.execute(stmt.execution_options(yield_per=BATCH_SIZE)):
+            yield {
+                "id": row.id,
+                "player": row.public_id,
+                "puzzle": keys.puzzle_id_for_key(db, row.puzzle_key),
+                "guess": row.text if row.text is not None else row.raw_guess_text,
+                "similarity": row.similarity_score,
+                "correct": bool(row.is_correct),
+                "hint": bool(row.is_hint),
+                "createdAt": row.created_at.replace(tzinfo=timezone.utc).isoformat(),
+            }
+
+    def _game_state_rows(self, db) -> Iterator[dict]:
+        stmt = (
+            select(
+                DailyGameState.player_key,
+                DailyGameState.puzzle_key,
+                Player.public_id,
+                DailyGameState.solved,
+                DailyGameState.total_guesses,
+                DailyGameState.hints_revealed,
+                DailyGameState.archived,
+            )
+            .join(Player, Player.id == DailyGameState.player_key)
+            .order_by(DailyGameState.player_key, DailyGameState.puzzle_key)
+        )
+        stmt = self._page_bounds(self._filter_puzzles(stmt, DailyGameState.puzzle_key, db))
+
+        for row in db.execute(stmt.execution_options(yield_per=BATCH_SIZE)):
+            yield {
+                "player": row.public_id,
+                "puzzle": keys.puzzle_id_for_key(db, row.puzzle_key),
+                "solved": bool(row.solved),
+                "totalGuesses": row.total_guesses,
+                "hintsRevealed": row.hints_revealed,
+                "archived": bool(row.archived),
+            }
+
+    def _format(self, record: dict) -> str:
+        if self.fmt == "ndjson":
+            return json.dumps(record, separators=(",", ":")) + "\n"
+        buf = io.StringIO()
+        csv.writer(buf).writerow([record[f] for f in self.fields])
+        return buf.getvalue()
+
+    def stream(self) -> Iterator[str]:
+        """Yield the export body chunk by chunk.
+
+        A sync generator: Starlette drains it in a worker thread, so the
+        database reads never run on the event loop.
+        """
+        with get_read_db_session() as db:
+            if self.fmt == "csv":
+                buf = io.StringIO()
+                csv.writer(buf).writerow(self.fields)
+                yield buf.getvalue()
+
+            rows = self._attempt_rows(db) if self.kind == "attempts" else self._game_state_rows(db)
+            chunk: list[str] = []
+            for record in rows:
+                chunk.append(self._format(record))
+                if len(chunk) >= BATCH_SIZE:
+                    yield "".join(chunk)
+                    chunk = []
+            if chunk:
+                yield "".join(chunk)
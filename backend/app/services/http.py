@@ -0,0 +1,151 @@
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import httpx
+
+from app import metrics
+from app.config import get_settings
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "in_flight", "total_seconds", "versions")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.versions: dict[str, int] = defaultdict(int)  # Responses per HTTP version
+
+
+class _MeteredTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport to count requests per upstream host.
+
+    Only public httpx API is used (the request, the response and its
+    `http_version` extension), so an httpx/httpcore upgrade can't quietly
+    break the numbers.
+    """
+
+    def __init__(self, inner: httpx.AsyncHTTPTransport, stats: dict[str, _HostStats]):
+        self.inner = inner
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = self.stats[request.url.host]
+        host.requests += 1
+        host.in_flight += 1
+        start = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+            version = response.extensions.get("http_version", b"HTTP/1.1")
+            host.versions[version.decode("ascii", "replace")] += 1
+            return response
+        except Exception:
+            host.errors += 1
+            raise
+        finally:
+            host.in_flight -= 1
+            host.total_seconds += time.perf_counter() - start
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class OutboundHTTP:
+    """One pooled HTTP/2 client shared by every outbound API call.
+
+    Opened and pre-connected in the app lifespan so the first guesses after a
+    deploy don't pay DNS, TCP and TLS setup, and closed on shutdown. Services
+    read `.client` per call rather than keeping their own.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._client: httpx.AsyncClient | None = None
+        self._stats: dict[str, _HostStats] = defaultdict(_HostStats)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily too, so scripts that never run the lifespan still work
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    def _create_client(self) -> httpx.AsyncClient:
+        s = self.settings
+        transport = httpx.AsyncHTTPTransport(
+            http2=s.outbound_http2,
+            limits=httpx.Limits(
+                max_connections=s.outbound_max_connections,
+                max_keepalive_connections=s.outbound_max_keepalive,
+                keepalive_expiry=s.outbound_keepalive_expiry,
+            ),
+        )
+        return httpx.AsyncClient(
+            transport=_MeteredTransport(transport, self._stats),
+            timeout=httpx.Timeout(30.0, connect=s.outbound_connect_timeout),
+        )
+
+    async def warm_up(self) -> None:
+        """Open a connection to each upstream before traffic arrives.
+
+        Any response (even 401) leaves a live TLS connection in the pool;
+        failures are logged and never block startup.
+        """
+        url = f"{self.settings.openai_base_url}/models"
+        try:
+            await self.client.get(
+                url,
+                headers={"Authorization": f"Bearer {self.settings.openai_api_key}"},
+                timeout=self.settings.outbound_connect_timeout,
+            )
+        except httpx.HTTPError as e:
+            print(f"Outbound warm-up to {urlsplit(url).hostname} failed: {e!r}")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def pool_metrics(self) -> dict[str, dict]:
+        """Per-host request counters, in-flight requests and responses per HTTP version."""
+        return {
+            host: {
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "inFlight": stats.in_flight,
+                "avgSeconds": round(stats.total_seconds / stats.requests, 4) if stats.requests else 0.0,
+                "httpVersions": dict(stats.versions),
+            }
+            for host, stats in self._stats.items()
+        }
+
+
+# Singleton instance
+_outbound_http: OutboundHTTP | None = None
+
+
+def get_outbound_http() -> OutboundHTTP:
+    global _outbound_http
+    if _outbound_http is None:
+        _outbound_http = OutboundHTTP()
+    return _outbound_http
+
+
+@metrics.collector
+def _pool_samples():
+    if _outbound_http is None:
+        return
+    hosts = _outbound_http.pool_metrics()
+    yield from metrics.family("outbound_requests_total", "counter", "Outbound requests per host",
+                              (({"host": h}, m["requests"]) for h, m in hosts.items()))
+    yield from metrics.family("outbound_errors_total", "counter", "Outbound transport errors per host",
+                              (({"host": h}, m["errors"]) for h, m in hosts.items()))
+    yield from metrics.family("outbound_in_flight", "gauge", "Outbound requests awaiting a response",
+                              (({"host": h}, m["inFlight"]) for h, m in hosts.items()))
+    yield from metrics.family(
+        "outbound_responses_total", "counter", "Outbound responses per host and HTTP version",
+        (({"host": h, "version": version}, count)
+         for h, m in hosts.items() for version, count in m["httpVersions"].items()),
+    )
@@ -0,0 +1,199 @@
+"""Second-level cache shared by every worker and replica, in Redis.
+
+Sits behind each worker's own caches (the S3 service's puzzle cache, the
+verdict store) so that a value fetched or computed once, anywhere, is a hit
+everywhere else: a freshly deployed or scaled-out worker warms from here
+instead of from S3 and the embedding/LLM APIs. Holds three kinds of value,
+each in a compact binary form with its own TTL:
+
+- puzzles: zlib-compressed JSON, replaced whenever the puzzle is saved
+- guess embeddings: raw little-endian float32, keyed by model and dimensions
+- verdicts: 6 packed bytes, keyed by the puzzle's verdict fingerprint
+
+Off unless L2_CACHE_ENABLED and REDIS_URL are set. Redis being slow or down
+never fails a request: a lookup that errors or exceeds `l2_cache_timeout` is
+a miss, and after an error the cache is skipped for `RETRY_AFTER` seconds.
+Writes from async code run in the background.
+"""
+import asyncio
+import hashlib
+import struct
+import time
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from app import metrics
+from app.config import get_settings
+from app.models.puzzle import PuzzleMetadata
+from app.redis_client import get_redis, get_sync_redis
+from app.services.verdicts import StoredVerdict, _fingerprint
+
+KEY_PREFIX = "l2:v1:"  # Bump the version when an encoding changes
+RETRY_AFTER = 5.0
+
+# is_correct, similarity, llm_correct (-1 when the LLM wasn't asked)
+_VERDICT = struct.Struct("<?fb")
+
+
+def _digest(value: str) -> str:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def encode_puzzle(puzzle: PuzzleMetadata) -> bytes:
+    return zlib.compress(puzzle.model_dump_json(exclude_none=True).encode("utf-8"), 6)
+
+
+def decode_puzzle(raw: bytes) -> PuzzleMetadata:
+    return PuzzleMetadata.model_validate_json(zlib.decompress(raw))
+
+
+def encode_verdict(verdict: StoredVerdict) -> bytes:
+    llm = -1 if verdict.llm_correct is None else int(verdict.llm_correct)
+    return _VERDICT.pack(verdict.is_correct, verdict.similarity, llm)
+
+
+def decode_verdict(raw: bytes) -> StoredVerdict:
+    is_correct, similarity, llm = _VERDICT.unpack(raw)
+    # Stored as float32: round off the widening noise
+    return StoredVerdict(is_correct=is_correct, similarity=round(similarity, 6),
+                         llm_correct=None if llm < 0 else bool(llm))
+
+
+class L2Cache:
+    """Puzzles, guess embeddings and verdicts shared through Redis (see module docstring)."""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.enabled = self.settings.l2_cache_enabled and bool(self.settings.redis_url)
+        self.timeout = self.settings.l2_cache_timeout
+        self._down_until = 0.0
+        self._writes: set[asyncio.Task] = set()  # Strong references until they finish
+
+    def _available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._down_until
+
+    def _failed(self, action: str, e: Exception) -> None:
+        if time.monotonic() >= self._down_until:
+            print(f"L2 cache {action} failed, skipping it for {RETRY_AFTER:.0f}s: {e!r}")
+        self._down_until = time.monotonic() + RETRY_AFTER
+
+    def _counted(self, kind: str, raw: Optional[bytes]) -> Optional[bytes]:
+        metrics.L2_CACHE.inc(kind=kind, result="hit" if raw is not None else "miss")
+        return raw
+
+    # --- Puzzles (sync: the S3 service is; async routes call it in a thread) ---
+
+    def _puzzle_key(self, puzzle_id: str) -> str:
+        return f"{KEY_PREFIX}puzzle:{puzzle_id}"
+
+    def get_puzzle(self, puzzle_id: str) -> Optional[PuzzleMetadata]:
+        if not self._available():
+            return None
+        try:
+            raw = self._counted("puzzle", get_sync_redis().get(self._puzzle_key(puzzle_id)))
+            return decode_puzzle(raw) if raw is not None else None
+        except Exception as e:
+            metrics.L2_CACHE.inc(kind="puzzle", result="error")
+            self._failed("puzzle lookup", e)
+            return None
+
+    def put_puzzle(self, puzzle: PuzzleMetadata) -> None:
+        """Share a puzzle just read from S3, unless a copy is already here.
+
+        The read may predate a save that published a newer version since,
+        so it never overwrites one (SET NX), and only lives for
+        `l2_puzzle_fill_ttl` in case it does land after the newer copy expired.
+        """
+        if not self._available():
+            return
+        try:
+            get_sync_redis().set(self._puzzle_key(puzzle.id), encode_puzzle(puzzle),
+                                 ex=self.settings.l2_puzzle_fill_ttl, nx=True)
+        except Exception as e:
+            self._failed("puzzle write", e)
+
+    def publish_puzzle(self, puzzle: PuzzleMetadata) -> None:
+        """Replace the shared copy with a version just saved to S3.
+
+        Attempted even while lookups are being skipped: a stale copy left
+        here would be served by every worker until its TTL. If the write
+        fails, the stale copy is deleted instead, if Redis lets us.
+        """
+        if not self.enabled:
+            return
+        key = self._puzzle_key(puzzle.id)
+        try:
+            get_sync_redis().set(key, encode_puzzle(puzzle), ex=self.settings.l2_puzzle_ttl)
+        except Exception as e:
+            self._failed("puzzle write", e)
+            try:
+                get_sync_redis().delete(key)
+            except Exception:
+                pass
+
+    # --- Async lookups and background writes ---
+
+    async def _get(self, kind: str, key: str) -> Optional[bytes]:
+        if not self._available():
+            return None
+        try:
+            return self._counted(kind, await asyncio.wait_for(get_redis().get(key), self.timeout))
+        except Exception as e:
+            metrics.L2_CACHE.inc(kind=kind, result="error")
+            self._failed(f"{kind} lookup", e)
+            return None
+
+    async def _set(self, kind: str, key: str, value: bytes, ttl: int) -> None:
+        try:
+            await asyncio.wait_for(get_redis().set(key, value, ex=ttl), self.timeout)
+        except Exception as e:
+            self._failed(f"{kind} write", e)
+
+    def _set_later(self, kind: str, key: str, value: bytes, ttl: int) -> None:
+        if not self._available():
+            return
+        task = asyncio.create_task(self._set(kind, key, value, ttl))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    # --- Guess embeddings ---
+
+    def _embedding_key(self, text: str) -> str:
+        model, dimensions = self.settings.embedding_model, self.settings.embedding_dimensions
+        return f"{KEY_PREFIX}emb:{model}:{dimensions}:{_digest(text)}"
+
+    async def get_embedding(self, text: str) -> Optional[np.ndarray]:
+        raw = await self._get("embedding", self._embedding_key(text))
+        return np.frombuffer(raw, dtype="<f4") if raw else None
+
+    def put_embedding(self, text: str, embedding: np.ndarray) -> None:
+        self._set_later("embedding", self._embedding_key(text),
+                        np.asarray(embedding, dtype="<f4").tobytes(), self.settings.l2_embedding_ttl)
+
+    # --- Verdicts ---
+
+    def _verdict_key(self, puzzle: PuzzleMetadata, text: str) -> str:
+        # The fingerprint covers everything the verdict depends on, so an
+        # edited puzzle simply stops matching its old verdicts
+        return f"{KEY_PREFIX}verdict:{_digest(repr((_fingerprint(puzzle), text)))}"
+
+    async def get_verdict(self, puzzle: PuzzleMetadata, text: str) -> Optional[StoredVerdict]:
+        raw = await self._get("verdict", self._verdict_key(puzzle, text))
+        return decode_verdict(raw) if raw else None
+
+    def put_verdict(self, puzzle: PuzzleMetadata, text: str, verdict: StoredVerdict) -> None:
+        self._set_later("verdict", self._verdict_key(puzzle, text), encode_verdict(verdict),
+                        self.settings.l2_verdict_ttl)
+
+
+# Singleton instance
+_l2_cache: L2Cache | None = None
+
+
+def get_l2_cache() -> L2Cache:
+    global _l2_cache
+    if _l2_cache is None:
+        _l2_cache = L2Cache()
+    return _l2_cache
@@ -3,6 +3,8 @@ import httpx
 import json
 
 from app.config import get_settings
+from app.services.http import get_outbound_http
+from app.services.resilience import get_upstream, UpstreamUnavailable
 
 
 class LLMUnavailableError(Exception):
@@ -10,15 +12,17 @@ class LLMUnavailableError(Exception):
 
 
 class LLMService:
-    """OpenAI chat completion client for generating synonyms."""
+    """OpenAI chat completion client for generating synonyms and judging guesses."""
 
-    CHAT_URL = "https://api.openai.com/v1/chat/completions"
     MAX_RETRIES = 3
     RETRY_DELAY = 2  # seconds
+    TIMEOUT = 60.0  # seconds
 
     def __init__(self):
         self.settings = get_settings()
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.http = get_outbound_http()
+        self.upstream = get_upstream("chat")
+        self.chat_url = f"{self.settings.openai_base_url}/chat/completions"
 
     async def generate_synonyms(self, answer: str, count: int = 10) -> list[str]:
         """Generate synonym phrases for an answer using GPT."""
@@ -38,24 +42,72 @@ The goal is to match how different people might describe the same map. Be creati
 Return ONLY a JSON array of lowercase strings, nothing else. Example:
 ["phrase 1", "phrase 2", "phrase 3"]"""
 
+        content = await self._complete_with_retries(prompt, temperature=0.7)
+        if content is None:
+            return []
+
+        # Parse JSON array from response
+        try:
+            synonyms = json.loads(content)
+            if isinstance(synonyms, list):
+                return [str(s).lower() for s in synonyms[:count]]
+        except json.JSONDecodeError:
+            pass
+
+        return []
+
+    async def generate_likely_guesses(self, answer: str, count: int = 200) -> list[str]:
+        """Generate guesses players are likely to type for a map, right or wrong.
+
+        Scored at publish time (services/precompute.py) so the first players
+        of a new puzzle don't wait on embedding calls for common guesses.
+        """
+        prompt = f"""A map shows: "{answer}"
+
+Players of a guessing game see only the map and type short guesses of what it shows.
+List {count} different guesses players are likely to type. Include:
+- Common wrong guesses about related topics (e.g., "population" for an income map)
+- Near misses that get part of the concept (e.g., "income" for "median household income")
+- Correct guesses phrased in different ways
+- Short one- or two-word guesses as well as longer ones
+
+Return ONLY a JSON array of lowercase strings, nothing else. Example:
+["guess 1", "guess 2", "guess 3"]"""
+
+        content = await self._complete_with_retries(prompt, temperature=0.9)
+        if content is None:
+            return []
+
+        try:
+            guesses = json.loads(content)
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(guesses, list):
+            return []
+        return [str(g).strip().lower() for g in guesses[:count] if str(g).strip()]
+
+    async def _complete_with_retries(self, prompt: str, temperature: float) -> str | None:
+        """Single-prompt chat completion, retried on rate limits. None on failure."""
         last_error = None
         for attempt in range(self.MAX_RETRIES):
             try:
-                response = await self.client.post(
-                    self.CHAT_URL,
-                    headers={
-                        "Authorization": f"Bearer {self.settings.openai_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": "gpt-4o-mini",
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.7,
-                    },
-                )
-                response.raise_for_status()
+                async with self.upstream.guard():
+                    response = await self.http.client.post(
+                        self.chat_url,
+                        headers={
+                            "Authorization": f"Bearer {self.settings.openai_api_key}",
+                            "Content-Type": "application/json",
+                        },
+                        json={
+                            "model": "gpt-4o-mini",
+                            "messages": [
+                                {"role": "user", "content": prompt}
+                            ],
+                            "temperature": temperature,
+                        },
+                        timeout=self.TIMEOUT,
+                    )
+                    response.raise_for_status()
                 data = response.json()
                 break
             except httpx.HTTPStatusError as e:
@@ -66,28 +118,18 @@ Return ONLY a JSON array of lowercase strings, nothing else. Example:
                     print(f"Rate limited, waiting {wait_time}s before retry...")
                     await asyncio.sleep(wait_time)
                 else:
-                    # Non-retryable error - return empty list instead of failing
+                    # Non-retryable error - return nothing instead of failing
                     print(f"LLM error: {e}")
-                    return []
+                    return None
             except Exception as e:
                 print(f"LLM error: {e}")
-                return []
+                return None
         else:
-            # All retries failed - return empty instead of raising
+            # All retries failed - return nothing instead of raising
             print(f"LLM failed after {self.MAX_RETRIES} retries")
-            return []
-
-        content = data["choices"][0]["message"]["content"].strip()
-
-        # Parse JSON array from response
-        try:
-            synonyms = json.loads(content)
-            if isinstance(synonyms, list):
-                return [str(s).lower() for s in synonyms[:count]]
-        except json.JSONDecodeError:
-            pass
+            return None
 
-        return []
+        return data["choices"][0]["message"]["content"].strip()
 
     async def check_guess_match(self, answer: str, guess: str, variants: list[str] | None = None) -> tuple[bool, float]:
         """
@@ -126,47 +168,49 @@ The user should demonstrate they understand what data/metric the map is displayi
 Respond with JSON only."""
 
         try:
-            response = await self.client.post(
-                self.CHAT_URL,
-                headers={
-                    "Authorization": f"Bearer {self.settings.openai_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0,
-                    "response_format": {
-                        "type": "json_schema",
-                        "json_schema": {
-                            "name": "guess_evaluation",
-                            "strict": True,
-                            "schema": {
-                                "type": "object",
-                                "properties": {
-                                    "is_correct": {
-                                        "type": "boolean",
-                                        "description": "Whether the guess correctly identifies what the map shows"
-                                    },
-                                    "confidence": {
-                                        "type": "number",
-                                        "description": "Confidence score from 0.0 to 1.0 indicating how close the guess is"
+            async with self.upstream.guard():
+                response = await self.http.client.post(
+                    self.chat_url,
+                    headers={
+                        "Authorization": f"Bearer {self.settings.openai_api_key}",
+                        "Content-Type": "application/json",
+                    },
+                    json={
+                        "model": "gpt-4o-mini",
+                        "messages": [
+                            {"role": "user", "content": prompt}
+                        ],
+                        "temperature": 0,
+                        "response_format": {
+                            "type": "json_schema",
+                            "json_schema": {
+                                "name": "guess_evaluation",
+                                "strict": True,
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "is_correct": {
+                                            "type": "boolean",
+                                            "description": "Whether the guess correctly identifies what the map shows"
+                                        },
+                                        "confidence": {
+                                            "type": "number",
+                                            "description": "Confidence score from 0.0 to 1.0 indicating how close the guess is"
+                                        },
+                                        "reasoning": {
+                                            "type": "string",
+                                            "description": "Brief explanation of the evaluation"
+                                        }
                                     },
-                                    "reasoning": {
-                                        "type": "string",
-                                        "description": "Brief explanation of the evaluation"
-                                    }
-                                },
-                                "required": ["is_correct", "confidence", "reasoning"],
-                                "additionalProperties": False
+                                    "required": ["is_correct", "confidence", "reasoning"],
+                                    "additionalProperties": False
+                                }
                             }
-                        }
+                        },
                     },
-                },
-            )
-            response.raise_for_status()
+                    timeout=self.TIMEOUT,
+                )
+                response.raise_for_status()
             data = response.json()
             content = data["choices"][0]["message"]["content"].strip()
             result = json.loads(content)
@@ -179,13 +223,13 @@ Respond with JSON only."""
 
             return (is_correct, confidence)
 
+        except UpstreamUnavailable:
+            # Refused before sending; callers fall back or shed
+            raise
         except Exception as e:
             print(f"LLM guess check error: {e}")
             raise LLMUnavailableError(f"LLM service unavailable: {e}") from e
 
-    async def close(self):
-        await self.client.aclose()
-
 
 # Singleton instance
 _llm_service: LLMService | None = None
@@ -0,0 +1,73 @@
+from typing import List, Optional
+
+import numpy as np
+
+from app.services.embedding import EmbeddingService
+from app.services.llm import LLMService
+from app.services.profiles import EmbeddingProfile, guess_profile, legacy_model
+from app.services.similarity import derived, unit_rows
+
+BATCH_SIZE = 256  # Texts per embeddings request
+
+
+def precomputed_profile(puzzle) -> str:
+    """Profile key the puzzle's precomputed table was scored under.
+
+    Tables from before the key was recorded were scored with full-size
+    legacy vectors.
+    """
+    if puzzle.precomputedProfile:
+        return puzzle.precomputedProfile
+    return EmbeddingProfile(model=legacy_model(puzzle), dimensions=0, quantized=False).key
+
+
+def precomputed_similarity(puzzle, guess_text: str) -> Optional[float]:
+    """Publish-time similarity of a lowercased guess, if it was precomputed.
+
+    None unless the table was scored under the profile guesses are embedded
+    with now: after a model or size change a live score could differ.
+    """
+    if not puzzle.precomputedGuesses or precomputed_profile(puzzle) != guess_profile().key:
+        return None
+    index = derived(puzzle, "precomputed", lambda: {g.text: g.similarity for g in puzzle.precomputedGuesses})
+    return index.get(guess_text)
+
+
+async def precompute_guesses(
+    answer: str,
+    answer_variants: List[dict],
+    embedding_service: EmbeddingService,
+    llm_service: LLMService,
+    count: int,
+    guesses: Optional[List[str]] = None,
+) -> List[dict]:
+    """Score likely guesses for a puzzle against its answer variants.
+
+    `guesses` defaults to `count` fresh LLM suggestions; pass the texts of an
+    existing table to re-score it after the answer changes. Returns
+    `[{text, similarity}, ...]` for `PuzzleMetadata.precomputedGuesses`, or an
+    empty list if nothing could be scored. The table is scored under
+    `guess_profile()`, whose key goes in `precomputedProfile`.
+    """
+    if guesses is None:
+        guesses = await llm_service.generate_likely_guesses(answer, count=count)
+
+    variant_texts = {v["text"] for v in answer_variants}
+    texts = list(dict.fromkeys(g for g in guesses if g and g not in variant_texts))
+    if not texts:
+        return []
+
+    embeddings = np.concatenate([
+        await embedding_service.embed_batch(texts[start:start + BATCH_SIZE])
+        for start in range(0, len(texts), BATCH_SIZE)
+    ])
+
+    # Cosine similarity of every guess to every variant in one product
+    dimensions = embeddings.shape[1]
+    answers = unit_rows([v["embedding"] for v in answer_variants], dimensions)
+    scores = (unit_rows(embeddings) @ answers.T).max(axis=1)
+
+    return [
+        {"text": text, "similarity": round(float(score), 4)}
+        for text, score in zip(texts, scores)
+    ]
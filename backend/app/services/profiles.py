@@ -0,0 +1,133 @@
+import base64
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.embedding import EmbeddingService
+from app.services.similarity import QuantizedRows, answer_matrix, derived, quantize_rows, unit_rows
+
+
+@dataclass(frozen=True)
+class EmbeddingProfile:
+    """How answer vectors are requested and stored: model, size and precision.
+
+    Puzzles keep one entry per profile in `embeddingProfiles`, next to the
+    legacy full-precision `answerEmbedding`/`answerVariants`, so workers on
+    different profiles can run side by side during a cutover.
+    """
+
+    model: str
+    dimensions: int  # 0 = the model's full size
+    quantized: bool
+
+    @property
+    def key(self) -> str:
+        size = str(self.dimensions) if self.dimensions else "full"
+        return f"{self.model}/{size}/{'int8' if self.quantized else 'f32'}"
+
+
+def guess_profile() -> EmbeddingProfile:
+    """Model, size and precision this worker embeds and scores guesses with."""
+    settings = get_settings()
+    return EmbeddingProfile(
+        model=settings.embedding_model,
+        dimensions=settings.embedding_dimensions,
+        quantized=settings.embedding_quantize,
+    )
+
+
+def active_profile() -> Optional[EmbeddingProfile]:
+    """The profile this worker scores with; None for legacy full float vectors.
+
+    Legacy vectors only stand in for the profile when they come from the
+    same model at full size and precision.
+    """
+    settings = get_settings()
+    if (not settings.embedding_dimensions and not settings.embedding_quantize
+            and settings.embedding_model == settings.legacy_embedding_model):
+        return None
+    return guess_profile()
+
+
+def legacy_model(puzzle) -> str:
+    """Model a puzzle's `answerEmbedding`/`answerVariants` vectors came from."""
+    return puzzle.embeddingModel or get_settings().legacy_embedding_model
+
+
+def scoring_matrix(puzzle):
+    """Answer vectors comparable with a guess embedded under the active settings, or None.
+
+    The puzzle's entry for the active profile if it has one, else its legacy
+    vectors truncated to the guess's size, but only when they come from the
+    model guesses are embedded with: cosine similarity across models is
+    meaningless.
+    """
+    settings = get_settings()
+    profile = active_profile()
+    if profile is not None:
+        matrix = profile_matrix(puzzle, profile.key)
+        if matrix is not None:
+            return matrix
+    if legacy_model(puzzle) != settings.embedding_model or not puzzle.answerEmbedding:
+        return None
+    return answer_matrix(puzzle, settings.embedding_dimensions or len(puzzle.answerEmbedding))
+
+
+def has_entry(puzzle, profile: EmbeddingProfile, texts: List[str]) -> bool:
+    """Whether `puzzle` already stores vectors for `profile` and exactly these texts."""
+    entry = (puzzle.embeddingProfiles or {}).get(profile.key)
+    return entry is not None and entry.texts == texts
+
+
+def puzzle_texts(puzzle) -> List[str]:
+    """Texts embedded for a puzzle: its variants (answer first), or just the answer."""
+    if puzzle.answerVariants:
+        return [v.text for v in puzzle.answerVariants]
+    return [puzzle.answer.lower()]
+
+
+def encode_entry(profile: EmbeddingProfile, texts: List[str], vectors) -> dict:
+    """Storage form of a profile entry (`ProfileEmbeddings` in the puzzle JSON)."""
+    units = unit_rows(vectors, profile.dimensions or None)
+    if profile.quantized:
+        rows = quantize_rows(units)
+        data, scales = rows.values.tobytes(), rows.scales.tolist()
+    else:
+        data, scales = units.astype("<f4").tobytes(), None
+    return {
+        "dimensions": units.shape[1],
+        "quantized": profile.quantized,
+        "texts": texts,
+        "vectors": base64.b64encode(data).decode("ascii"),
+        "scales": scales,
+    }
+
+
+def decode_entry(dimensions: int, quantized: bool, vectors: str, scales: Optional[List[float]]):
+    """Scoring matrix of a stored entry: float32 unit rows or QuantizedRows."""
+    raw = base64.b64decode(vectors)
+    if quantized:
+        values = np.frombuffer(raw, dtype=np.int8).reshape(-1, dimensions)
+        return QuantizedRows(values=values, scales=np.asarray(scales, dtype=np.float32))
+    return np.frombuffer(raw, dtype="<f4").reshape(-1, dimensions)
+
+
+def profile_matrix(puzzle, profile_key: str):
+    """Scoring matrix a puzzle stores for an embedding profile, or None; decoded once."""
+    entry = (puzzle.embeddingProfiles or {}).get(profile_key)
+    if entry is None:
+        return None
+    return derived(puzzle, ("profile", profile_key),
+                   lambda: decode_entry(entry.dimensions, entry.quantized, entry.vectors, entry.scales))
+
+
+async def build_entry(
+    profile: EmbeddingProfile, texts: List[str], embedding_service: EmbeddingService
+) -> dict:
+    """Embed answer and variant texts at the profile's size and encode them."""
+    vectors = await embedding_service.embed_batch(
+        texts, dimensions=profile.dimensions, model=profile.model
+    )
+    return encode_entry(profile, texts, vectors)
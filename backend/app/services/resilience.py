@@ -0,0 +1,260 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app import metrics
+from app.config import get_settings
+
+
+class UpstreamUnavailable(Exception):
+    """An outbound call was refused before it was sent."""
+
+    def __init__(self, upstream: str, message: str, retry_after: float):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The upstream's breaker is open; callers should use a local fallback."""
+
+
+class LoadShedError(UpstreamUnavailable):
+    """Too many calls already waiting on the upstream."""
+
+
+def _is_upstream_fault(exc: BaseException) -> bool:
+    """Errors that say something about the upstream's health (not our request)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """Opens on a high error rate or slow-call rate over the recent window.
+
+    After `breaker_open_seconds` it half-opens and lets a few probe calls
+    through: if they all succeed quickly the breaker closes, any failure
+    opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.settings = get_settings()
+        self.state = self.CLOSED
+        self.outcomes: deque[tuple[bool, bool]] = deque(maxlen=self.settings.breaker_window)
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.times_opened = 0
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError. Returns True for a probe."""
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.settings.breaker_open_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, "circuit open", remaining)
+            self.state = self.HALF_OPEN
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+            print(f"Circuit {self.name}: half-open, probing")
+
+        if self.state == self.HALF_OPEN:
+            if self.probes_in_flight >= self.settings.breaker_half_open_probes:
+                raise CircuitOpenError(self.name, "circuit half-open", 1.0)
+            self.probes_in_flight += 1
+            return True
+        return False
+
+    def record(self, probe: bool, ok: bool, seconds: float) -> None:
+        slow = seconds >= self.settings.breaker_slow_call_seconds
+        if probe:
+            self.probes_in_flight -= 1
+            if not ok or slow:
+                self._open()
+            else:
+                self.probe_successes += 1
+                if self.probe_successes >= self.settings.breaker_half_open_probes:
+                    self._close()
+            return
+
+        if self.state != self.CLOSED:
+            return  # Call admitted before the breaker opened
+        self.outcomes.append((ok, slow))
+        if len(self.outcomes) < self.settings.breaker_min_calls:
+            return
+        errors = sum(1 for ok_, _ in self.outcomes if not ok_)
+        slows = sum(1 for _, slow_ in self.outcomes if slow_)
+        if (
+            errors / len(self.outcomes) >= self.settings.breaker_error_rate
+            or slows / len(self.outcomes) >= self.settings.breaker_slow_call_rate
+        ):
+            self._open()
+
+    def release(self, probe: bool) -> None:
+        """A call was refused, or cancelled early by the caller: no verdict on the upstream."""
+        if probe:
+            self.probes_in_flight -= 1
+
+    def _open(self) -> None:
+        if self.state != self.OPEN:
+            print(f"Circuit {self.name}: open")
+            self.times_opened += 1
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+
+    def _close(self) -> None:
+        print(f"Circuit {self.name}: closed")
+        self.state = self.CLOSED
+        self.outcomes.clear()
+
+
+class AdmissionLimiter:
+    """Caps concurrent calls; a bounded number of callers may wait for a slot."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.in_flight = 0
+        self.shed = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if not self._slots.locked():
+            # Free slot: acquire() returns without suspending
+            await self._slots.acquire()
+        elif self.waiting >= self.max_queue:
+            self.shed += 1
+            raise LoadShedError(self.name, "queue full", self.queue_timeout)
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                raise LoadShedError(self.name, "timed out waiting for a slot", self.queue_timeout)
+            finally:
+                self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+
+class Upstream:
+    """Admission control and circuit breaking for one outbound API."""
+
+    def __init__(self, name: str, max_concurrency: int):
+        settings = get_settings()
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.limiter = AdmissionLimiter(
+            name, max_concurrency, settings.upstream_max_queue, settings.upstream_queue_timeout
+        )
+
+    @asynccontextmanager
+    async def guard(self):
+        """Wrap one outbound call; put `raise_for_status()` inside the block.
+
+        Raises CircuitOpenError or LoadShedError instead of sending the call.
+        A call cancelled after `breaker_slow_call_seconds` counts as slow:
+        callers give up on slow calls (hedging, the guess budget), so
+        otherwise the slowest calls would never reach the breaker.
+        """
+        probe = self.breaker.before_call()
+        admitted = False
+        try:
+            async with self.limiter.slot():
+                admitted = True
+                start = time.perf_counter()
+                try:
+                    yield
+                except asyncio.CancelledError:
+                    elapsed = time.perf_counter() - start
+                    if elapsed >= self.breaker.settings.breaker_slow_call_seconds:
+                        self.breaker.record(probe, True, elapsed)
+                    else:
+                        self.breaker.release(probe)
+                    metrics.UPSTREAM_SECONDS.observe(elapsed, upstream=self.name, outcome="cancelled")
+                    raise
+                except Exception as e:
+                    elapsed = time.perf_counter() - start
+                    self.breaker.record(probe, not _is_upstream_fault(e), elapsed)
+                    metrics.UPSTREAM_SECONDS.observe(elapsed, upstream=self.name, outcome="error")
+                    raise
+                else:
+                    elapsed = time.perf_counter() - start
+                    self.breaker.record(probe, True, elapsed)
+                    metrics.UPSTREAM_SECONDS.observe(elapsed, upstream=self.name, outcome="ok")
+        except BaseException:
+            # Shed, or cancelled while queued for a slot: a probe that never
+            # ran must give its place back, or the breaker stays half-open
+            if not admitted:
+                self.breaker.release(probe)
+            raise
+
+    def status(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "timesOpened": self.breaker.times_opened,
+            "inFlight": self.limiter.in_flight,
+            "waiting": self.limiter.waiting,
+            "shed": self.limiter.shed,
+        }
+
+
+# One instance per upstream API
+_upstreams: dict[str, Upstream] = {}
+
+
+def get_upstream(name: str) -> Upstream:
+    """`embeddings` or `chat`."""
+    if name not in _upstreams:
+        settings = get_settings()
+        limits = {
+            "embeddings": settings.embeddings_max_concurrency,
+            "chat": settings.chat_max_concurrency,
+        }
+        _upstreams[name] = Upstream(name, limits[name])
+    return _upstreams[name]
+
+
+def upstream_status() -> dict[str, dict]:
+    return {name: upstream.status() for name, upstream in _upstreams.items()}
+
+
+_BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+@metrics.collector
+def _upstream_samples():
+    status = upstream_status()
+    yield from metrics.family("upstream_breaker_state", "gauge", "Circuit breaker: 0 closed, 1 half-open, 2 open",
+                              (({"upstream": n}, _BREAKER_STATES[s["state"]]) for n, s in status.items()))
+    yield from metrics.family("upstream_breaker_opened_total", "counter", "Times the breaker opened",
+                              (({"upstream": n}, s["timesOpened"]) for n, s in status.items()))
+    yield from metrics.family("upstream_in_flight", "gauge", "Calls holding an admission slot",
+                              (({"upstream": n}, s["inFlight"]) for n, s in status.items()))
+    yield from metrics.family("upstream_waiting", "gauge", "Calls queued for an admission slot",
+                              (({"upstream": n}, s["waiting"]) for n, s in status.items()))
+    yield from metrics.family("upstream_shed_total", "counter", "Calls refused by admission control",
+                              (({"upstream": n}, s["shed"]) for n, s in status.items()))
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
@@ -5,10 +6,13 @@ from typing import Optional, Dict
 import time
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from app import call_budget, metrics
 from app.config import get_settings
 from app.models.puzzle import PuzzleMetadata, PuzzleIndex, PuzzleIndexEntry
+from app.services.l2cache import get_l2_cache
 
 
 class S3PuzzleService:
@@ -20,24 +24,58 @@ class S3PuzzleService:
 
     def __init__(self):
         self.settings = get_settings()
-        self.s3_client = boto3.client(
+        self.s3_client = self._new_client()
+        self._puzzle_cache: Dict[str, tuple[PuzzleMetadata, float]] = {}
+        self._active_puzzle_cache: tuple[Optional[str], float] | None = None
+        self.l2 = get_l2_cache()
+
+    def _new_client(self):
+        client = boto3.client(
             "s3",
             region_name=self.settings.aws_region,
             aws_access_key_id=self.settings.aws_access_key_id,
             aws_secret_access_key=self.settings.aws_secret_access_key,
+            # Custom endpoints (local stand-ins) don't resolve bucket subdomains
+            endpoint_url=self.settings.s3_endpoint_url or None,
+            config=Config(s3={"addressing_style": "path"}) if self.settings.s3_endpoint_url else None,
         )
-        self._puzzle_cache: Dict[str, tuple[PuzzleMetadata, float]] = {}
-        self._active_puzzle_cache: tuple[Optional[str], float] | None = None
-
-    def get_puzzle(self, puzzle_id: Optional[str] = None) -> PuzzleMetadata:
-        """Fetch puzzle from S3 with caching."""
+        call_budget.instrument_s3_client(client)
+        return client
+
+    def reset_client(self) -> None:
+        """New client and connection pool, keeping the puzzle cache (after a fork: sockets can't be shared)."""
+        self.s3_client = self._new_client()
+
+    def _cached(self, puzzle_id: str) -> Optional[PuzzleMetadata]:
+        """This worker's copy of a puzzle, if fresh; never does I/O."""
+        entry = self._puzzle_cache.get(puzzle_id)
+        if entry is not None and time.time() - entry[1] < self.CACHE_TTL:
+            metrics.PUZZLE_CACHE.inc(result="hit")
+            return entry[0]
+        return None
+
+    async def get_puzzle_async(self, puzzle_id: Optional[str] = None) -> PuzzleMetadata:
+        """get_puzzle for async routes: cache hits inline, S3 and Redis calls in a thread."""
+        if puzzle_id and puzzle_id.lower() != "latest":
+            cached = self._cached(puzzle_id)
+            if cached is not None:
+                return cached
+        return await asyncio.to_thread(self.get_puzzle, puzzle_id)
+
+    def get_puzzle(self, puzzle_id: Optional[str] = None, use_cache: bool = True) -> PuzzleMetadata:
+        """Fetch puzzle from S3 with caching: this worker's cache, then the shared L2 cache."""
         resolved_id = self._resolve_puzzle_id(puzzle_id)
 
         # Check cache
-        if resolved_id in self._puzzle_cache:
-            cached_puzzle, cached_time = self._puzzle_cache[resolved_id]
-            if time.time() - cached_time < self.CACHE_TTL:
-                return cached_puzzle
+        if use_cache:
+            cached = self._cached(resolved_id)
+            if cached is not None:
+                return cached
+            metrics.PUZZLE_CACHE.inc(result="miss")
+            puzzle = self.l2.get_puzzle(resolved_id)
+            if puzzle is not None:
+                self._puzzle_cache[resolved_id] = (puzzle, time.time())
+                return puzzle
 
         key = f"{self.settings.s3_puzzle_prefix}{resolved_id}.json"
 
@@ -52,6 +90,7 @@ class S3PuzzleService:
 
             # Cache the result
             self._puzzle_cache[resolved_id] = (puzzle, time.time())
+            self.l2.put_puzzle(puzzle)
 
             return puzzle
         except ClientError as e:
@@ -184,8 +223,7 @@ class S3PuzzleService:
     def update_puzzle_in_index(self, puzzle: PuzzleMetadata) -> None:
         """Update a puzzle in the index (alias for add_puzzle_to_index)."""
         # Invalidate cache first
-        if puzzle.id in self._puzzle_cache:
-            del self._puzzle_cache[puzzle.id]
+        self._invalidate(puzzle)
         self.add_puzzle_to_index(puzzle)
 
     def toggle_endless_pool(self, puzzle_id: str, in_pool: bool) -> PuzzleMetadata:
@@ -211,8 +249,7 @@ class S3PuzzleService:
         self.save_puzzle_index(index)
 
         # Invalidate cache
-        if puzzle_id in self._puzzle_cache:
-            del self._puzzle_cache[puzzle_id]
+        self._invalidate(puzzle)
 
         return puzzle
 
@@ -257,11 +294,23 @@ class S3PuzzleService:
         self.save_puzzle_index(index)
 
         # Invalidate cache
-        if puzzle_id in self._puzzle_cache:
-            del self._puzzle_cache[puzzle_id]
+        self._invalidate(puzzle)
 
         return puzzle
 
+    def save_puzzle(self, puzzle: PuzzleMetadata) -> None:
+        """Write a puzzle's metadata to S3 and refresh it in the caches."""
+        self._save_puzzle(puzzle)
+        self._invalidate(puzzle)
+
+    def _invalidate(self, puzzle: PuzzleMetadata) -> None:
+        """After a puzzle was saved: drop this worker's copy and publish the new one to the shared cache.
+
+        Other workers' own caches still serve the old version for up to CACHE_TTL.
+        """
+        self._puzzle_cache.pop(puzzle.id, None)
+        self.l2.publish_puzzle(puzzle)
+
     def _save_puzzle(self, puzzle: PuzzleMetadata) -> None:
         """Save a puzzle's metadata back to S3."""
         key = f"{self.settings.s3_puzzle_prefix}{puzzle.id}.json"
@@ -1,19 +1,119 @@
-import math
-from typing import List
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence, Union
 
+import numpy as np
 
-def cosine_similarity(a: List[float], b: List[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    if not a or not b:
+
+def unit_rows(vectors: Sequence, dimensions: Optional[int] = None) -> np.ndarray:
+    """Stack vectors as float32 rows, truncated to `dimensions` and L2-normalised.
+
+    Truncating and renormalising is how text-embedding-3 vectors are shortened,
+    so full-size stored vectors can be compared with shortened ones. All-zero
+    rows stay zero and score 0 against everything.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if dimensions:
+        matrix = matrix[:, :dimensions]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+@dataclass
+class QuantizedRows:
+    """Unit vectors stored as int8 rows; `values[i] * scales[i]` is unit length again.
+
+    int8 is the stored and transferred form. Scoring uses `unit_rows()`, the
+    rows widened back to float32 once: numpy's integer matmul doesn't use
+    BLAS, and a few dozen rows cost a few KB as floats.
+    """
+
+    values: np.ndarray  # int8, (rows, dimensions)
+    scales: np.ndarray  # float32, (rows,)
+    _widened: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+
+    def unit_rows(self) -> np.ndarray:
+        if self._widened is None:
+            self._widened = self.values.astype(np.float32) * self.scales[:, None]
+        return self._widened
+
+    @property
+    def size(self) -> int:
+        return self.values.size
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def nbytes(self) -> int:
+        """Stored size: the int8 rows and their scales."""
+        return self.values.nbytes + self.scales.nbytes
+
+    @property
+    def resident_nbytes(self) -> int:
+        """Memory held once scored: the stored rows plus the float32 widening."""
+        return self.nbytes + (self._widened.nbytes if self._widened is not None else 0)
+
+
+def _quantize(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Symmetric per-row int8: largest component maps to +-127
+    peak = np.maximum(np.abs(matrix).max(axis=1, keepdims=True), 1e-9)
+    values = np.rint(matrix / peak * 127).astype(np.int8)
+    norms = np.linalg.norm(values.astype(np.float32), axis=1)
+    return values, (1.0 / np.maximum(norms, 1e-9)).astype(np.float32)
+
+
+def quantize_rows(unit_matrix: np.ndarray) -> QuantizedRows:
+    values, scales = _quantize(unit_matrix)
+    return QuantizedRows(values=values, scales=scales)
+
+
+def best_similarity(answer_matrix: Union[np.ndarray, QuantizedRows], vector: Sequence[float]) -> float:
+    """Highest cosine similarity between `vector` and any row of a unit-row matrix.
+
+    int8 rows are scored as their cached float32 widening against the
+    unquantized guess.
+    """
+    if answer_matrix.size == 0 or len(vector) == 0:
         return 0.0
+    unit = unit_rows(vector, answer_matrix.shape[1])[0]
+    if isinstance(answer_matrix, QuantizedRows):
+        answer_matrix = answer_matrix.unit_rows()
+    # float32 rounding can land a hair above 1
+    return min(float((answer_matrix @ unit).max()), 1.0)
 
-    size = min(len(a), len(b))
-    dot_product = sum(a[i] * b[i] for i in range(size))
-    norm_a = math.sqrt(sum(x * x for x in a[:size]))
-    norm_b = math.sqrt(sum(x * x for x in b[:size]))
 
-    denominator = norm_a * norm_b
-    if denominator < 1e-9:
+def derived(puzzle, key, build: Callable):
+    """Per-puzzle cache of scoring data built from its fields, e.g. decoded matrices.
+
+    Lives on the puzzle object (`PuzzleMetadata._derived`), so it goes when
+    the puzzle drops out of the S3 service's cache.
+    """
+    cache = puzzle._derived
+    value = cache.get(key)
+    if value is None:
+        value = cache[key] = build()
+    return value
+
+
+def answer_matrix(puzzle, dimensions: int) -> np.ndarray:
+    """A puzzle's answer and variant embeddings as unit rows of `dimensions` floats, built once per size."""
+    def build():
+        vectors = [puzzle.answerEmbedding] + [v.embedding for v in puzzle.answerVariants or []]
+        vectors = [v for v in vectors if v]
+        if not vectors:
+            return np.empty((0, dimensions), dtype=np.float32)
+        return unit_rows(vectors, dimensions)
+
+    return derived(puzzle, ("answer", dimensions), build)
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Calculate cosine similarity between two vectors."""
+    if len(a) == 0 or len(b) == 0:
         return 0.0
 
-    return dot_product / denominator
+    size = min(len(a), len(b))
+    return best_similarity(unit_rows(a, size), b)
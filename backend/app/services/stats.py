@@ -0,0 +1,402 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.config import get_settings
+from app.db.database import get_db_session
+from app.db.models import PuzzleStats
+
+
+class BucketSketch:
+    """Fixed-width histogram over a bounded range.
+
+    Mergeable by bucket-wise addition, so partial sketches from several
+    workers combine into exactly the sketch a single process would have built.
+    Quantiles are accurate to one bucket width.
+    """
+
+    def __init__(self, lo: float, hi: float, buckets: int, counts: Optional[List[int]] = None):
+        self.lo = lo
+        self.hi = hi
+        self.buckets = buckets
+        self.counts = list(counts) if counts else [0] * buckets
+        self.total = sum(self.counts)
+
+    def _index(self, value: float) -> int:
+        if value <= self.lo:
+            return 0
+        if value >= self.hi:
+            return self.buckets - 1
+        return int((value - self.lo) / (self.hi - self.lo) * self.buckets)
+
+    def add(self, value: float, count: int = 1) -> None:
+        self.counts[self._index(value)] += count
+        self.total += count
+
+    def merge(self, other: "BucketSketch") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        """Value below which a fraction q of observations fall (bucket midpoint)."""
+        if self.total == 0:
+            return 0.0
+        target = q * self.total
+        running = 0
+        width = (self.hi - self.lo) / self.buckets
+        for i, c in enumerate(self.counts):
+            running += c
+            if running >= target and c:
+                return self.lo + (i + 0.5) * width
+        return self.hi
+
+    def rank(self, value: float) -> float:
+        """Fraction of observations strictly below the bucket containing value."""
+        if self.total == 0:
+            return 0.0
+        return sum(self.counts[: self._index(value)]) / self.total
+
+    def to_dict(self) -> dict:
+        return {"lo": self.lo, "hi": self.hi, "buckets": self.buckets, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BucketSketch":
+        return cls(data["lo"], data["hi"], data["buckets"], data.get("counts"))
+
+
+class HeavyHitters:
+    """Space-Saving top-K sketch.
+
+    Tracks at most `capacity` items; counts are upper bounds. Merging sums the
+    counters of both sketches and keeps the `capacity` largest.
+    """
+
+    def __init__(self, capacity: int, counts: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = dict(counts) if counts else {}
+
+    def add(self, item: str, count: int = 1) -> None:
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+        else:
+            victim = min(self.counts, key=self.counts.__getitem__)
+            floor = self.counts.pop(victim)
+            self.counts[item] = floor + count
+
+    def merge(self, other: "HeavyHitters") -> None:
+        for item, count in other.counts.items():
+            self.counts[item] = self.counts.get(item, 0) + count
+        if len(self.counts) > self.capacity:
+            keep = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[: self.capacity]
+            self.counts = dict(keep)
+
+    def top(self, n: int) -> List[tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+    def to_dict(self) -> dict:
+        return {"capacity": self.capacity, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HeavyHitters":
+        return cls(data["capacity"], data.get("counts"))
+
+
+MAX_GUESS_CHARS = 40
+_UNLISTED_CHARS = re.compile(r"[^\w\s'&.,-]")
+
+
+def normalize_wrong_guess(guess_text: str) -> str:
+    """The form a wrong guess is counted (and publicly listed) under.
+
+    Letters, digits and a little punctuation only, whitespace collapsed and
+    cut to MAX_GUESS_CHARS: the stats endpoint is unauthenticated, so it
+    must not republish arbitrary player text.
+    """
+    text = " ".join(_UNLISTED_CHARS.sub("", guess_text.lower()).split())
+    return text[:MAX_GUESS_CHARS].rstrip()
+
+
+class PuzzleAggregate:
+    """Per-puzzle aggregate of all players' games. Every field is mergeable."""
+
+    def __init__(self, top_k_capacity: int):
+        self.guesses = 0
+        self.hints = 0
+        self.solved = 0
+        self.failed = 0
+        self.solve_histogram: Dict[int, int] = {}  # attempts used -> solved games
+        self.similarity = BucketSketch(0.0, 1.0, 100)
+        self.wrong_guesses = HeavyHitters(top_k_capacity)
+
+    @property
+    def finished(self) -> int:
+        return self.solved + self.failed
+
+    def record_guess(self, guess_text: str, similarity: float, is_correct: bool) -> None:
+        self.guesses += 1
+        self.similarity.add(similarity)
+        if not is_correct:
+            text = normalize_wrong_guess(guess_text)
+            if text:
+                self.wrong_guesses.add(text)
+
+    def record_hint(self) -> None:
+        self.hints += 1
+
+    def record_finish(self, solved: bool, attempts_used: int) -> None:
+        if solved:
+            self.solved += 1
+            self.solve_histogram[attempts_used] = self.solve_histogram.get(attempts_used, 0) + 1
+        else:
+            self.failed += 1
+
+    def merge(self, other: "PuzzleAggregate") -> None:
+        self.guesses += other.guesses
+        self.hints += other.hints
+        self.solved += other.solved
+        self.failed += other.failed
+        for n, count in other.solve_histogram.items():
+            self.solve_histogram[n] = self.solve_histogram.get(n, 0) + count
+        self.similarity.merge(other.similarity)
+        self.wrong_guesses.merge(other.wrong_guesses)
+
+    def to_dict(self) -> dict:
+        return {
+            "guesses": self.guesses,
+            "hints": self.hints,
+            "solved": self.solved,
+            "failed": self.failed,
+            "solveHistogram": {str(n): c for n, c in self.solve_histogram.items()},
+            "similarity": self.similarity.to_dict(),
+            "wrongGuesses": self.wrong_guesses.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, top_k_capacity: int) -> "PuzzleAggregate":
+        agg = cls(top_k_capacity)
+        agg.guesses = data.get("guesses", 0)
+        agg.hints = data.get("hints", 0)
+        agg.solved = data.get("solved", 0)
+        agg.failed = data.get("failed", 0)
+        agg.solve_histogram = {int(n): c for n, c in data.get("solveHistogram", {}).items()}
+        if "similarity" in data:
+            agg.similarity = BucketSketch.from_dict(data["similarity"])
+        if "wrongGuesses" in data:
+            agg.wrong_guesses = HeavyHitters.from_dict(data["wrongGuesses"])
+            agg.wrong_guesses.capacity = top_k_capacity
+        return agg
+
+    def summary(self, top_k: int, min_count: int = 1) -> dict:
+        """Precomputed read view. Everything the stats endpoint returns comes from here.
+
+        Wrong guesses made fewer than `min_count` times are left out, so no
+        single player can put text on the public list.
+        """
+        solved_attempts = sum(n * c for n, c in self.solve_histogram.items())
+        wrong: Dict[str, int] = {}
+        for guess, count in self.wrong_guesses.counts.items():
+            # Again here for aggregates stored before guesses were normalised
+            text = normalize_wrong_guess(guess)
+            if text:
+                wrong[text] = wrong.get(text, 0) + count
+        top_wrong = sorted(wrong.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+        return {
+            "playersFinished": self.finished,
+            "solved": self.solved,
+            "failed": self.failed,
+            "solveRate": round(self.solved / self.finished, 3) if self.finished else 0.0,
+            "totalGuesses": self.guesses,
+            "hintsUsed": self.hints,
+            "guessDistribution": dict(sorted(self.solve_histogram.items())),
+            "averageGuesses": round(solved_attempts / self.solved, 2) if self.solved else 0.0,
+            "similarityQuantiles": {
+                "p25": round(self.similarity.quantile(0.25), 3),
+                "p50": round(self.similarity.quantile(0.50), 3),
+                "p75": round(self.similarity.quantile(0.75), 3),
+                "p90": round(self.similarity.quantile(0.90), 3),
+            },
+            "topWrongGuesses": [
+                {"guess": g, "count": c} for g, c in top_wrong if c >= min_count
+            ],
+        }
+
+
+class PuzzleStatsService:
+    """Streaming per-puzzle aggregates.
+
+    Each worker accumulates deltas in memory on the guess/hint path; a
+    background task merges them into the `puzzle_stats` row periodically.
+    Reads are served from a cached summary of the stored aggregate.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, PuzzleAggregate] = {}
+        self._summaries: Dict[str, tuple[dict, float]] = {}
+
+    @property
+    def _capacity(self) -> int:
+        # Track more items than we display so Space-Saving's error stays small
+        return self.settings.stats_top_k * 4
+
+    def _pending_for(self, puzzle_id: str) -> PuzzleAggregate:
+        agg = self._pending.get(puzzle_id)
+        if agg is None:
+            agg = PuzzleAggregate(self._capacity)
+            self._pending[puzzle_id] = agg
+        return agg
+
+    def record_guess(
+        self,
+        puzzle_id: str,
+        guess_text: str,
+        similarity: float,
+        is_correct: bool,
+        attempts_used: int,
+        game_over: bool,
+    ) -> None:
+        """Fold one recorded guess into this worker's pending aggregate."""
+        with self._lock:
+            agg = self._pending_for(puzzle_id)
+            agg.record_guess(guess_text, similarity, is_correct)
+            if game_over:
+                agg.record_finish(is_correct, attempts_used)
+
+    def record_hint(self, puzzle_id: str, attempts_used: int, game_over: bool) -> None:
+        """Fold one revealed hint into this worker's pending aggregate."""
+        with self._lock:
+            agg = self._pending_for(puzzle_id)
+            agg.record_hint()
+            if game_over:
+                agg.record_finish(False, attempts_used)
+
+    def flush(self) -> int:
+        """Merge pending deltas into the database. Returns the number of puzzles written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        failed: Dict[str, PuzzleAggregate] = {}
+        for puzzle_id, delta in pending.items():
+            try:
+                self._merge_into_db(puzzle_id, delta)
+                self._summaries.pop(puzzle_id, None)
+            except Exception as e:
+                print(f"Stats flush failed for {puzzle_id}: {e}")
+                failed[puzzle_id] = delta
+
+        # Put back anything we couldn't write so the next flush retries it
+        if failed:
+            with self._lock:
+                for puzzle_id, delta in failed.items():
+                    delta.merge(self._pending.get(puzzle_id, PuzzleAggregate(self._capacity)))
+                    self._pending[puzzle_id] = delta
+        return len(pending) - len(failed)
+
+    def _merge_into_db(self, puzzle_id: str, delta: PuzzleAggregate) -> None:
+        # Optimistic concurrency on `version`: another worker may flush the
+        # same puzzle between our read and write, in which case we re-read.
+        for _ in range(5):
+            with get_db_session() as db:
+                row = db.get(PuzzleStats, puzzle_id)
+                if row is None:
+                    merged = PuzzleAggregate(self._capacity)
+                    merged.merge(delta)
+                    db.add(PuzzleStats(
+                        puzzle_date=puzzle_id,
+                        payload=json.dumps(merged.to_dict()),
+                        version=1,
+                        updated_at=datetime.now(timezone.utc),
+                    ))
+                    try:
+                        db.commit()
+                        return
+                    except Exception:
+                        db.rollback()
+                        continue
+
+                merged = PuzzleAggregate.from_dict(json.loads(row.payload), self._capacity)
+                merged.merge(delta)
+                updated = (
+                    db.query(PuzzleStats)
+                    .filter(PuzzleStats.puzzle_date == puzzle_id, PuzzleStats.version == row.version)
+                    .update({
+                        PuzzleStats.payload: json.dumps(merged.to_dict()),
+                        PuzzleStats.version: row.version + 1,
+                        PuzzleStats.updated_at: datetime.now(timezone.utc),
+                    }, synchronize_session=False)
+                )
+                db.commit()
+                if updated:
+                    return
+        raise RuntimeError("too much contention on puzzle_stats row")
+
+    def _cached_summary(self, puzzle_id: str) -> Optional[dict]:
+        cached = self._summaries.get(puzzle_id)
+        if cached is not None and time.time() - cached[1] < self.settings.stats_cache_ttl:
+            return cached[0]
+        return None
+
+    async def get_summary_async(self, puzzle_id: str) -> dict:
+        """get_summary for async routes: cache hits inline, the database read in a thread."""
+        cached = self._cached_summary(puzzle_id)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self.get_summary, puzzle_id)
+
+    def get_summary(self, puzzle_id: str) -> dict:
+        """Cached summary of the stored aggregate for a puzzle."""
+        cached = self._cached_summary(puzzle_id)
+        if cached is not None:
+            return cached
+
+        with get_db_session() as db:
+            row = db.get(PuzzleStats, puzzle_id)
+            payload = json.loads(row.payload) if row else {}
+        agg = PuzzleAggregate.from_dict(payload, self._capacity)
+        summary = agg.summary(self.settings.stats_top_k, self.settings.stats_wrong_guess_min_count)
+        self._summaries[puzzle_id] = (summary, time.time())
+        return summary
+
+    async def run_periodic_flush(self) -> None:
+        """Background loop started from the app lifespan."""
+        while True:
+            await asyncio.sleep(self.settings.stats_flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"Stats flush error: {e}")
+
+
+def beat_percent(summary: dict, attempts_used: int, solved: bool) -> float:
+    """Share of finished players who did worse than the given result.
+
+    Failures rank below every solve; among solvers fewer attempts is better.
+    """
+    finished = summary["playersFinished"]
+    if finished == 0 or not solved:
+        return 0.0
+    worse = summary["failed"] + sum(
+        count for n, count in summary["guessDistribution"].items() if n > attempts_used
+    )
+    return round(100.0 * worse / finished, 1)
+
+
+# Singleton instance
+_stats_service: PuzzleStatsService | None = None
+
+
+def get_stats_service() -> PuzzleStatsService:
+    global _stats_service
+    if _stats_service is None:
+        _stats_service = PuzzleStatsService()
+    return _stats_service
@@ -0,0 +1,91 @@
+import math
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+from app.services.similarity import unit_rows
+
+
+@dataclass
+class VariantReduction:
+    """Variants kept for storage and what dropping the rest costs."""
+
+    variants: List[dict]  # [{text, embedding}, ...], answer first
+    dropped: List[dict] = field(default_factory=list)  # [{text, keptAs, similarity}, ...]
+
+    @property
+    def aliases(self) -> List[str]:
+        """Texts of the dropped variants, still matched by string and by the LLM."""
+        return [d["text"] for d in self.dropped]
+
+    def coverage_loss(self, threshold: float) -> float:
+        """Most a guess scoring `threshold` against a dropped variant can lose against the kept set.
+
+        Angles obey the triangle inequality: the guess's angle to the dropped
+        variant's stand-in is at most its angle to the dropped variant plus
+        the angle between the two.
+        """
+        if not self.dropped:
+            return 0.0
+        spread = max(math.acos(min(d["similarity"], 1.0)) for d in self.dropped)
+        angle = math.acos(max(-1.0, min(threshold, 1.0)))
+        return round(threshold - math.cos(min(angle + spread, math.pi)), 4)
+
+    def report(self, threshold: float) -> dict:
+        return {
+            "variantsBefore": len(self.variants) + len(self.dropped),
+            "variantsAfter": len(self.variants),
+            "coverageLoss": self.coverage_loss(threshold),
+            "dropped": self.dropped,
+        }
+
+
+def reduce_variants(answer_variants: List[dict], tolerance: float) -> VariantReduction:
+    """Keep a subset of variants that covers every variant within `tolerance`.
+
+    A variant is covered when some kept variant has cosine similarity of at
+    least `1 - tolerance` to it. The answer (first variant) is always kept;
+    others are picked greedily, each time the one covering the most variants
+    still uncovered, so tight clusters ("gdp per capita", "gdp per-capita")
+    collapse to one member. `tolerance <= 0` keeps everything.
+
+    The loss for a guess is larger than `tolerance`: the bound holds on
+    angles, and 0.02 already allows about 11 degrees, which can take a guess
+    at 0.85 against a dropped variant to about 0.73 against the kept set
+    (see `VariantReduction.coverage_loss`). Dropped texts should still be
+    kept for string and LLM matching (`PuzzleMetadata.variantAliases`).
+    """
+    # Exact repeats add nothing whatever the tolerance
+    by_text = {}
+    for variant in answer_variants:
+        by_text.setdefault(variant["text"], variant)
+    variants = list(by_text.values())
+    if tolerance <= 0 or len(variants) < 2:
+        return VariantReduction(variants=variants)
+
+    units = unit_rows([v["embedding"] for v in variants])
+    covers = (units @ units.T) >= 1.0 - tolerance
+
+    kept = [0]
+    uncovered = ~covers[0]
+    while uncovered.any():
+        gains = (covers & uncovered).sum(axis=1)
+        gains[kept] = -1
+        pick = int(np.argmax(gains))
+        kept.append(pick)
+        uncovered &= ~covers[pick]
+    kept.sort()
+
+    similarities = units @ units[kept].T
+    dropped = []
+    for i in range(len(variants)):
+        if i in kept:
+            continue
+        nearest = int(np.argmax(similarities[i]))
+        dropped.append({
+            "text": variants[i]["text"],
+            "keptAs": variants[kept[nearest]]["text"],
+            "similarity": round(float(similarities[i, nearest]), 4),
+        })
+    return VariantReduction(variants=[variants[i] for i in kept], dropped=dropped)
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.models.puzzle import PuzzleMetadata
+
+
+@dataclass
+class StoredVerdict:
+    is_correct: bool
+    similarity: float
+    llm_correct: Optional[bool] = None  # check_guess_match result, when the LLM was asked
+
+
+def _fingerprint(puzzle: PuzzleMetadata) -> tuple:
+    """Everything a verdict depends on: editing the puzzle or the embedding settings starts a fresh store."""
+    settings = get_settings()
+    variants = tuple(v.text for v in puzzle.answerVariants or []) + tuple(puzzle.variantAliases or [])
+    embedding = (settings.embedding_model, settings.embedding_dimensions, settings.embedding_quantize)
+    return (puzzle.id, puzzle.answer, puzzle.similarityThreshold, puzzle.similarityMode, variants, embedding)
+
+
+class PuzzleVerdicts:
+    """Judged guesses for one puzzle, as a fixed-size ring of unit vectors.
+
+    Rows of `vectors` are L2-normalised so a matrix-vector product gives the
+    cosine similarity to every stored guess at once. When full, the oldest
+    guess is overwritten.
+    """
+
+    MIN_LOOKUPS = 20  # Before this the hit rate isn't trusted
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.vectors: Optional[np.ndarray] = None  # Allocated on first add, once the dimension is known
+        self.verdicts: list[Optional[StoredVerdict]] = [None] * capacity
+        self.texts: list[Optional[str]] = [None] * capacity
+        self.by_text: dict[str, int] = {}
+        self.size = 0
+        self.next_slot = 0
+        self.lookups = 0
+        self.hits = 0
+
+    def exact(self, text: str) -> Optional[StoredVerdict]:
+        slot = self.by_text.get(text)
+        return self.verdicts[slot] if slot is not None else None
+
+    def nearest_llm_verdict(self, unit: np.ndarray, min_similarity: float) -> Optional[bool]:
+        """LLM verdict of the closest stored guess, if it is within epsilon."""
+        self.lookups += 1
+        if self.size == 0 or self.vectors.shape[1] != unit.shape[0]:
+            return None
+        sims = self.vectors[:self.size] @ unit
+        close = np.flatnonzero(sims >= min_similarity)
+        # Closest first; only guesses the LLM actually judged can lend their verdict
+        for slot in close[np.argsort(sims[close])[::-1]]:
+            verdict = self.verdicts[slot]
+            if verdict.llm_correct is not None:
+                self.hits += 1
+                return verdict.llm_correct
+        return None
+
+    def hit_rate(self) -> Optional[float]:
+        if self.lookups < self.MIN_LOOKUPS:
+            return None
+        return self.hits / self.lookups
+
+    def add(self, text: str, unit: np.ndarray, verdict: StoredVerdict) -> None:
+        if self.vectors is None or self.vectors.shape[1] != unit.shape[0]:
+            self.vectors = np.empty((self.capacity, unit.shape[0]), dtype=np.float32)
+            self.size = 0
+            self.next_slot = 0
+            self.by_text.clear()
+        slot = self.next_slot
+        old_text = self.texts[slot]
+        if old_text is not None and self.by_text.get(old_text) == slot:
+            del self.by_text[old_text]
+        self.vectors[slot] = unit
+        self.verdicts[slot] = verdict
+        self.texts[slot] = text
+        self.by_text[text] = slot
+        self.next_slot = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+
+class VerdictStore:
+    """Reuses verdicts of earlier guesses of the same puzzle.
+
+    An identical guess text reuses the whole verdict with no API call. A
+    guess whose embedding is within `verdict_reuse_epsilon` (cosine distance)
+    of one the LLM already judged reuses the LLM's answer. Stores for the
+    least recently used puzzles are dropped beyond `verdict_store_puzzles`.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._puzzles: OrderedDict[tuple, PuzzleVerdicts] = OrderedDict()
+
+    def _for(self, puzzle: PuzzleMetadata, create: bool = False) -> Optional[PuzzleVerdicts]:
+        key = _fingerprint(puzzle)
+        store = self._puzzles.get(key)
+        if store is not None:
+            self._puzzles.move_to_end(key)
+        elif create:
+            store = self._puzzles[key] = PuzzleVerdicts(self.settings.verdict_store_capacity)
+            while len(self._puzzles) > self.settings.verdict_store_puzzles:
+                self._puzzles.popitem(last=False)
+        return store
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm < 1e-9:
+            return None
+        return vector / norm
+
+    def exact(self, puzzle: PuzzleMetadata, text: str) -> Optional[StoredVerdict]:
+        store = self._for(puzzle)
+        return store.exact(text) if store is not None else None
+
+    def nearest_llm_verdict(self, puzzle: PuzzleMetadata, embedding) -> Optional[bool]:
+        store = self._for(puzzle, create=True)
+        unit = self._unit(embedding)
+        if unit is None:
+            return None
+        return store.nearest_llm_verdict(unit, 1.0 - self.settings.verdict_reuse_epsilon)
+
+    def hit_rate(self, puzzle: PuzzleMetadata) -> Optional[float]:
+        """Share of LLM-mode lookups answered from the store; None until enough were made."""
+        store = self._for(puzzle)
+        return store.hit_rate() if store is not None else None
+
+    def add(self, puzzle: PuzzleMetadata, text: str, embedding, verdict: StoredVerdict) -> None:
+        unit = self._unit(embedding)
+        if unit is not None:
+            self._for(puzzle, create=True).add(text, unit, verdict)
+
+
+# Singleton instance
+_verdict_store: VerdictStore | None = None
+
+
+def get_verdict_store() -> VerdictStore:
+    global _verdict_store
+    if _verdict_store is None:
+        _verdict_store = VerdictStore()
+    return _verdict_store
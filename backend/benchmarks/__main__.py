@@ -0,0 +1,122 @@
+"""Microbenchmarks for the guess hot path.
+
+Usage (from backend/):
+    python -m benchmarks run                          # all benchmarks, results.json
+    python -m benchmarks run -k fuzzy --out fuzzy.json
+    python -m benchmarks compare baseline.json results.json
+
+Record the baseline from the base branch on the same machine, then run the
+branch: absolute timings from another machine mean nothing, so none are
+committed. `compare` scales every median by the run's own reference
+workload and exits 1 when any benchmark got slower than the baseline, in
+those units, by more than --tolerance (default 20%).
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+
+MODULES = ["benchmarks.bench_scoring", "benchmarks.bench_models", "benchmarks.bench_responses",
+           "benchmarks.bench_db"]
+
+
+def _load() -> list:
+    # Scratch database and no outbound credentials, set before the app reads its settings
+    workdir = tempfile.mkdtemp(prefix="benchmarks-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ["ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+    for name in MODULES:
+        importlib.import_module(name)
+    from benchmarks.harness import registered
+    return registered()
+
+
+def run(args: argparse.Namespace) -> int:
+    from benchmarks.harness import REFERENCE, environment, run_one
+
+    benchmarks = _load()
+    # Timed on both sides of the run, to catch the host slowing down part-way
+    references = [run_one(REFERENCE)]
+    results = {}
+    for bench in benchmarks:
+        if args.k and args.k not in bench.name:
+            continue
+        result = run_one(bench)
+        results[bench.name] = result
+        print(f"{bench.name:42} {result['medianUs']:>12.3f} us/op  (min {result['minUs']:.3f}, "
+              f"{result['opsPerRound']} ops/round)")
+    references.append(run_one(REFERENCE))
+    reference = min(references, key=lambda r: r["minUs"])
+    print(f"{REFERENCE.name:42} {reference['minUs']:>12.3f} us/op  (reference, fastest round)")
+    with open(args.out, "w") as f:
+        json.dump({"meta": environment(), "reference": reference, "benchmarks": results},
+                  f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Wrote {len(results)} results to {args.out}")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.baseline) as f:
+        baseline_run = json.load(f)
+    with open(args.results) as f:
+        current_run = json.load(f)
+    baseline, current = baseline_run["benchmarks"], current_run["benchmarks"]
+
+    # How much faster this run's machine was than the baseline's, on the same fixed work
+    if "reference" in baseline_run and "reference" in current_run:
+        # Fastest rounds: noise only ever adds time, so they track the host's speed best
+        speedup = baseline_run["reference"]["minUs"] / current_run["reference"]["minUs"]
+        print(f"Reference workload: current run {speedup:.2f}x the speed of the baseline run; ratios adjusted")
+    else:
+        speedup = 1.0
+        print("No reference workload in both files: comparing absolute timings")
+
+    regressions = []
+    print(f"{'benchmark':42} {'baseline us':>12} {'current us':>12} {'ratio':>7}")
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current or name not in baseline:
+            print(f"{name:42} {'(only in ' + ('baseline' if name in baseline else 'results') + ')':>33}")
+            continue
+        before, after = baseline[name]["medianUs"], current[name]["medianUs"]
+        ratio = after * speedup / before if before else 1.0
+        flag = ""
+        if ratio > 1 + args.tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - args.tolerance:
+            flag = "  faster"
+        print(f"{name:42} {before:>12.3f} {after:>12.3f} {ratio:>6.2f}x{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Backend microbenchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks and write results as JSON")
+    run_parser.add_argument("-k", help="Only benchmarks whose name contains this")
+    run_parser.add_argument("--out", default="results.json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--tolerance", type=float, default=0.20,
+                                help="Allowed slowdown of the median before it counts as a regression")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Attempt recording and player stats against a scratch SQLite database.
+
+`benchmarks.__main__` points DATABASE_URL at a temporary file before this
+module imports the app, so the real database is never touched.
+"""
+import asyncio
+import itertools
+from datetime import date, timedelta
+
+from app.db.database import SessionLocal, engine
+from app.db.migrations import upgrade
+from app.routes.puzzle import get_player_stats
+from app.services.attempts import AttemptService
+from benchmarks.harness import benchmark
+
+HISTORY_DAYS = 365
+
+upgrade(engine)
+
+
+def _seed_history(player_id: str, days: int) -> None:
+    """A year of daily games: most solved in 3-6 guesses, every tenth lost."""
+    db = SessionLocal()
+    try:
+        service = AttemptService(db)
+        start = date(2024, 1, 1)
+        for day in range(days):
+            puzzle_id = (start + timedelta(days=day)).isoformat()
+            guesses = 10 if day % 10 == 0 else 3 + day % 4
+            for n in range(guesses):
+                service.record_attempt(player_id, puzzle_id, f"guess {n}", 0.3 + n * 0.05,
+                                       is_correct=day % 10 != 0 and n == guesses - 1)
+    finally:
+        db.close()
+
+
+@benchmark("attempts/record_attempt")
+def record_attempt():
+    db = SessionLocal()
+    service = AttemptService(db)
+    players = (f"bench_writer_{i}" for i in itertools.count())
+    # A fresh player every 10 guesses keeps each game's state row small, as in production
+    state = {"player": next(players), "n": 0}
+
+    def op():
+        if state["n"] == 10:
+            state["player"], state["n"] = next(players), 0
+        state["n"] += 1
+        service.record_attempt(state["player"], "2025-01-01", "median income", 0.42, is_correct=False)
+
+    return op
+
+
+@benchmark(f"player_stats/{HISTORY_DAYS}-days")
+def player_stats():
+    _seed_history("bench_reader", HISTORY_DAYS)
+    db = SessionLocal()
+    loop = asyncio.new_event_loop()  # One loop for all calls, so loop setup isn't timed
+    return lambda: loop.run_until_complete(get_player_stats(player_id=None, x_player_id="bench_reader", db=db))
@@ -0,0 +1,40 @@
+"""Puzzle JSON parsing and serialisation, as done on every S3 load and admin save."""
+import json
+
+import numpy as np
+
+from app.models.puzzle import PuzzleMetadata
+from benchmarks.harness import benchmark
+
+
+def _puzzle_data(variants: int) -> dict:
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((variants, 1536)).astype(np.float32).tolist()
+    return {
+        "id": "2025-01-01",
+        "imageUrl": "https://example.invalid/map.png",
+        "answer": "median household income",
+        "answerEmbedding": vectors[0],
+        "answerVariants": [{"text": f"variant {i}", "embedding": v} for i, v in enumerate(vectors)],
+        "hints": ["money", "per household", "middle value"],
+        "precomputedGuesses": [{"text": f"guess {i}", "similarity": 0.5} for i in range(200)],
+    }
+
+
+@benchmark("puzzle/parse-20-variants")
+def parse_20():
+    data = _puzzle_data(20)
+    return lambda: PuzzleMetadata(**data)
+
+
+@benchmark("puzzle/json-parse-20-variants")
+def json_parse_20():
+    # What S3PuzzleService.get_puzzle does with the object body
+    body = json.dumps(_puzzle_data(20)).encode("utf-8")
+    return lambda: PuzzleMetadata(**json.loads(body.decode("utf-8")))
+
+
+@benchmark("puzzle/model_dump-20-variants")
+def dump_20():
+    puzzle = PuzzleMetadata(**_puzzle_data(20))
+    return lambda: puzzle.model_dump()
@@ -0,0 +1,82 @@
+"""Response serialisation: FastAPI's response_model path against json_response, and compression.
+
+The `fastapi-default` cases are what routes did before `json_response`:
+re-validate the returned model against `response_model`, encode it to
+JSON-able data and `json.dumps` it.
+"""
+import asyncio
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models.puzzle import AttemptInfo, AttemptsResponse, PuzzleIndexEntry
+from app.responses import brotli, compress, json_response
+from benchmarks.harness import benchmark
+
+
+def _attempts(count: int) -> AttemptsResponse:
+    return AttemptsResponse(
+        attempts=[
+            AttemptInfo(guess=f"guess number {i}", similarity=0.1 + i / 100, correct=False,
+                        timestamp="2025-01-01T12:00:00", isHint=i % 5 == 0)
+            for i in range(count)
+        ],
+        gameState={"solved": False, "totalGuesses": count, "hintsRevealed": count // 5},
+    )
+
+
+def _index(count: int) -> dict:
+    entries = [
+        PuzzleIndexEntry(id=f"2025-{i:04d}", answer=f"answer {i}", imageUrl=f"https://example.invalid/{i}.png",
+                         createdAt="2025-01-01T00:00:00", scheduledDate=f"2025-01-{i % 28 + 1:02d}")
+        for i in range(count)
+    ]
+    return {"puzzles": [p.model_dump() for p in entries]}
+
+
+def _fastapi_default(model_type, content):
+    # No response_model: FastAPI only runs jsonable_encoder
+    field = create_model_field(name="Response", type_=model_type, mode="serialization") if model_type else None
+    loop = asyncio.new_event_loop()
+
+    def op():
+        data = loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+        return JSONResponse(data).body
+
+    return op
+
+
+@benchmark("response/attempts-50-fastapi-default")
+def attempts_default():
+    return _fastapi_default(AttemptsResponse, _attempts(50))
+
+
+@benchmark("response/attempts-50-json_response")
+def attempts_direct():
+    content = _attempts(50)
+    return lambda: json_response(content).body
+
+
+@benchmark("response/puzzles-all-500-fastapi-default")
+def index_default():
+    return _fastapi_default(None, _index(500))
+
+
+@benchmark("response/puzzles-all-500-json_response")
+def index_direct():
+    content = _index(500)
+    return lambda: json_response(content).body
+
+
+@benchmark("compress/gzip-puzzles-all-500")
+def gzip_index():
+    body = json_response(_index(500)).body
+    return lambda: compress(body, "gzip")
+
+
+if brotli is not None:
+    @benchmark("compress/br-puzzles-all-500")
+    def brotli_index():
+        body = json_response(_index(500)).body
+        return lambda: compress(body, "br")
@@ -0,0 +1,77 @@
+"""Guess scoring: vector similarity, the fuzzy gate and guided-hint replay."""
+import random
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.models.puzzle import GuidedHint, PuzzleMetadata
+from app.services.evaluation import GuessEvaluator, select_guided_hint
+from app.services.similarity import best_similarity, cosine_similarity, quantize_rows, unit_rows
+from benchmarks.harness import benchmark
+
+FULL = 1536
+rng = np.random.default_rng(0)
+
+
+def _vectors(rows: int, dimensions: int = FULL) -> np.ndarray:
+    return rng.standard_normal((rows, dimensions)).astype(np.float32)
+
+
+def _words(count: int) -> list[str]:
+    vocab = ["median", "household", "income", "population", "density", "annual", "rainfall", "rate",
+             "per", "capita", "gdp", "average", "percent", "adults", "county", "state", "growth"]
+    return [" ".join(random.Random(i).sample(vocab, 3)) for i in range(count)]
+
+
+@benchmark("cosine_similarity/list-1536")
+def cosine_lists():
+    a, b = _vectors(2).tolist()
+    return lambda: cosine_similarity(a, b)
+
+
+@benchmark("best_similarity/f32-20x1536")
+def best_f32():
+    matrix, guess = unit_rows(_vectors(20)), _vectors(1)[0]
+    return lambda: best_similarity(matrix, guess)
+
+
+@benchmark("best_similarity/int8-20x256")
+def best_int8():
+    matrix, guess = quantize_rows(unit_rows(_vectors(20), 256)), _vectors(1)[0][:256]
+    return lambda: best_similarity(matrix, guess)
+
+
+def _puzzle(variants: int) -> PuzzleMetadata:
+    texts = _words(variants)
+    vectors = _vectors(variants)
+    return PuzzleMetadata(
+        id="2025-01-01", imageUrl="https://example.invalid/map.png", answer=texts[0],
+        answerEmbedding=vectors[0].tolist(),
+        answerVariants=[{"text": t, "embedding": v.tolist()} for t, v in zip(texts, vectors)],
+    )
+
+
+@benchmark("fuzzy_gate/10-variants")
+def fuzzy_10():
+    puzzle, evaluator = _puzzle(10), GuessEvaluator.__new__(GuessEvaluator)
+    return lambda: evaluator.fuzzy_score(puzzle, "average household earnings")
+
+
+@benchmark("fuzzy_gate/50-variants")
+def fuzzy_50():
+    puzzle, evaluator = _puzzle(50), GuessEvaluator.__new__(GuessEvaluator)
+    return lambda: evaluator.fuzzy_score(puzzle, "average household earnings")
+
+
+@benchmark("guided_hints/200-attempts-10-hints")
+def guided_hints():
+    hints = [
+        GuidedHint(triggerWords=[w, w + "s"], similarityRange=(0.2 + i * 0.05, 0.9), hint=f"hint {i}", priority=i)
+        for i, w in enumerate(["income", "population", "rain", "gdp", "growth",
+                               "density", "rate", "county", "state", "adults"])
+    ]
+    attempts = [
+        SimpleNamespace(is_hint=i % 7 == 0, guess_text=text, similarity_score=random.Random(i).random())
+        for i, text in enumerate(_words(200))
+    ]
+    return lambda: select_guided_hint(hints, attempts, "median household income growth", 0.7)
@@ -0,0 +1,96 @@
+import gc
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+ROUNDS = 7
+MIN_ROUND_SECONDS = 0.1
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[], Callable[[], object]]  # Returns the operation to time
+    ops: int = 1  # Operations performed by one call, for per-op figures
+
+
+_benchmarks: list[Benchmark] = []
+
+
+def benchmark(name: str, ops: int = 1):
+    """Register `setup`; it builds the inputs and returns the callable to time."""
+    def register(setup):
+        _benchmarks.append(Benchmark(name, setup, ops))
+        return setup
+    return register
+
+
+def registered() -> list[Benchmark]:
+    return list(_benchmarks)
+
+
+def _reference():
+    data = list(range(5000, 0, -1))
+    return lambda: sorted(data, key=lambda x: (x * 7919) % 5003)
+
+
+# Fixed pure-Python workload timed in every run. `compare` scales each
+# median by its fastest round, so a machine or run that is uniformly faster or slower
+# (another host, CPU frequency, load) doesn't show up as a change.
+REFERENCE = Benchmark("reference/sort-5000", _reference)
+
+
+def _calls_per_round(op: Callable[[], object]) -> int:
+    # Grow the call count until one round takes long enough to time reliably
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            op()
+        if time.perf_counter() - start >= MIN_ROUND_SECONDS or calls >= 1_000_000:
+            return calls
+        calls *= 4
+
+
+def run_one(bench: Benchmark) -> dict:
+    op = bench.setup()
+    op()  # Warm caches and lazy imports
+    calls = _calls_per_round(op)
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            for _ in range(calls):
+                op()
+            timings.append((time.perf_counter() - start) / (calls * bench.ops))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "medianUs": round(statistics.median(timings) * 1e6, 3),
+        "minUs": round(min(timings) * 1e6, 3),
+        "stdevUs": round(statistics.stdev(timings) * 1e6, 3),
+        "rounds": ROUNDS,
+        "opsPerRound": calls * bench.ops,
+    }
+
+
+def environment() -> dict:
+    import numpy
+    import pydantic
+    import sqlalchemy
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": numpy.__version__,
+        "pydantic": pydantic.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+        "recordedAt": datetime.now(timezone.utc).isoformat(),
+    }
@@ -0,0 +1,90 @@
+"""Production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Sized and tuned from Settings (WEB_WORKERS, WEB_MAX_REQUESTS, ...; see
+app/config.py). With WEB_PRELOAD the master imports the app and loads the
+current puzzle once; workers fork from it and share that memory
+copy-on-write. Send HUP for a graceful reload, TERM for a graceful stop.
+"""
+import gc
+import math
+import os
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def _cgroup_cpu_limit() -> float | None:
+    """CPUs the container's cgroup quota allows (v2, then v1), or None if unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """Cores this process may run on: its affinity mask, capped by the cgroup quota.
+
+    cpu_count() reports the host's cores, which inside a container limited
+    to 2 CPUs on a 32-core host would mean 32 workers.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available outside Linux
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+bind = f"{settings.host}:{settings.port}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = settings.web_workers or available_cpus()
+preload_app = settings.web_preload
+max_requests = settings.web_max_requests
+max_requests_jitter = settings.web_max_requests_jitter
+timeout = settings.web_timeout
+graceful_timeout = settings.web_graceful_timeout
+keepalive = settings.web_keepalive
+# The proxy that terminates TLS and sets X-Forwarded-* (FORWARDED_ALLOW_IPS)
+forwarded_allow_ips = settings.forwarded_allow_ips
+accesslog = None
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker forks
+    server.log.info("Starting %d workers (%s)", workers, "WEB_WORKERS" if settings.web_workers else "available CPUs")
+    if preload_app:
+        from app.preload import preload_puzzles
+
+        try:
+            server.log.info("Preloaded puzzle %s", preload_puzzles())
+        except Exception as e:
+            # Workers retry on their own and report not-ready until it works
+            server.log.warning("Puzzle preload failed: %s", e)
+        # Move everything loaded so far out of the GC's reach: collections in
+        # the workers would otherwise touch (and so copy) every shared page
+        gc.collect()
+        gc.freeze()
+    if workers > 1 and settings.rate_limit_storage == "memory":
+        server.log.warning("RATE_LIMIT_STORAGE=memory with %d workers: each keeps its own limits", workers)
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app.preload import reset_after_fork
+
+        reset_after_fork()
@@ -0,0 +1,117 @@
+"""Local stand-in for the OpenAI embeddings and chat completions APIs.
+
+Usage:
+    python -m loadtest.fake_openai --port 8901 --embed-ms 80 --chat-ms 600 --error-rate 0.01
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8901/v1.
+Embeddings come from loadtest/vectors.py; the chat endpoint judges guesses
+by word overlap and answers synonym / likely-guess prompts with shuffled
+phrasings, in the same response shapes the services parse.
+"""
+import argparse
+import base64
+import json
+import random
+import re
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from loadtest.latency import LatencyModel
+from loadtest.vectors import embed_text, word_overlap
+
+_ANSWER = re.compile(r'The correct answer is: "([^"]*)"')
+_GUESS = re.compile(r'The user guessed: "([^"]*)"')
+_QUOTED = re.compile(r'"([^"]+)"')
+
+
+def _error(status: int) -> JSONResponse:
+    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+    return JSONResponse({"error": {"message": "injected failure", "type": kind}}, status_code=status)
+
+
+def _chat_content(prompt: str) -> str:
+    answer, guess = _ANSWER.search(prompt), _GUESS.search(prompt)
+    if answer and guess:
+        overlap = word_overlap(answer.group(1), guess.group(1))
+        return json.dumps({
+            "is_correct": overlap >= 0.6,
+            "confidence": round(overlap, 2),
+            "reasoning": "word overlap",
+        })
+    # Synonym and likely-guess prompts: a JSON array of phrasings of the quoted answer
+    quoted = _QUOTED.search(prompt)
+    words = (quoted.group(1) if quoted else "map data").split()
+    phrasings = set()
+    for _ in range(40):
+        sample = random.sample(words, k=random.randint(1, len(words)))
+        phrasings.add(" ".join(sample))
+    return json.dumps(sorted(phrasings))
+
+
+def create_app(embed_latency: LatencyModel, chat_latency: LatencyModel) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        await embed_latency.wait()
+        status = embed_latency.failure()
+        if status:
+            return _error(status)
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions", 0)
+        data = []
+        for i, text in enumerate(texts):
+            vector = embed_text(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return {"object": "list", "data": data, "model": body.get("model"), "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        await chat_latency.wait()
+        status = chat_latency.failure()
+        if status:
+            return _error(status)
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        return {
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": _chat_content(prompt)}}],
+        }
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--embed-ms", type=float, default=80.0, help="Median embeddings latency")
+    parser.add_argument("--chat-ms", type=float, default=600.0, help="Median chat latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Log-normal spread of both")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of calls failing with 429")
+
+
+def app_from_args(args: argparse.Namespace) -> FastAPI:
+    return create_app(
+        LatencyModel(args.embed_ms, args.sigma, args.error_rate, args.throttle_rate),
+        LatencyModel(args.chat_ms, args.sigma, args.error_rate, args.throttle_rate),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI API for load tests")
+    parser.add_argument("--port", type=int, default=8901)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(app_from_args(args), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
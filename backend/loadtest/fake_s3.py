@@ -0,0 +1,98 @@
+"""Filesystem-backed stand-in for the S3 object calls the app makes.
+
+Usage:
+    python -m loadtest.fake_s3 --port 8902 --root /tmp/loadtest-s3 --get-ms 15
+
+Point the app at it with S3_ENDPOINT_URL=http://127.0.0.1:8902 (any
+credentials). Objects live at <root>/<bucket>/<key>. Supports GetObject,
+PutObject, HeadObject and DeleteObject with path-style addressing, which is
+all S3PuzzleService and the archive use.
+"""
+import argparse
+import hashlib
+import os
+from email.utils import formatdate
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from loadtest.latency import LatencyModel
+
+_NO_SUCH_KEY = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    "<Error><Code>NoSuchKey</Code><Message>The specified key does not exist.</Message>"
+    "<Key>{key}</Key></Error>"
+)
+
+
+def create_app(root: str, get_latency: LatencyModel, put_latency: LatencyModel) -> FastAPI:
+    app = FastAPI(title="Fake S3")
+
+    def path_for(bucket: str, key: str) -> str:
+        path = os.path.realpath(os.path.join(root, bucket, key))
+        if not path.startswith(os.path.realpath(root) + os.sep):
+            raise ValueError(key)
+        return path
+
+    def object_headers(path: str, body: bytes) -> dict:
+        return {
+            "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+            "Last-Modified": formatdate(os.path.getmtime(path), usegmt=True),
+        }
+
+    @app.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD"])
+    async def get_object(bucket: str, key: str, request: Request):
+        await get_latency.wait()
+        path = path_for(bucket, key)
+        if not os.path.isfile(path):
+            return Response(_NO_SUCH_KEY.format(key=key), status_code=404, media_type="application/xml")
+        with open(path, "rb") as f:
+            body = f.read()
+        headers = object_headers(path, body)
+        if request.method == "HEAD":
+            return Response(status_code=200, headers={**headers, "Content-Length": str(len(body))})
+        return Response(body, media_type="application/octet-stream", headers=headers)
+
+    @app.put("/{bucket}/{key:path}")
+    async def put_object(bucket: str, key: str, request: Request):
+        await put_latency.wait()
+        path = path_for(bucket, key)
+        body = await request.body()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial object
+        tmp = f"{path}.tmp-{os.getpid()}-{id(request)}"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+        return Response(status_code=200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    @app.delete("/{bucket}/{key:path}")
+    async def delete_object(bucket: str, key: str):
+        path = path_for(bucket, key)
+        if os.path.isfile(path):
+            os.remove(path)
+        return Response(status_code=204)
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--root", default="loadtest-s3", help="Directory holding <bucket>/<key> files")
+    parser.add_argument("--get-ms", type=float, default=15.0, help="Median GetObject latency")
+    parser.add_argument("--put-ms", type=float, default=40.0, help="Median PutObject latency")
+
+
+def app_from_args(args: argparse.Namespace) -> FastAPI:
+    return create_app(args.root, LatencyModel(args.get_ms), LatencyModel(args.put_ms))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake S3 for load tests")
+    parser.add_argument("--port", type=int, default=8902)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(app_from_args(args), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import asyncio
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class LatencyModel:
+    """Log-normal response time with a median and a spread.
+
+    `sigma` 0.5 puts p99 at about 3.2x the median, close to what OpenAI
+    embeddings show on a normal day; raise it to model a bad one.
+    """
+
+    median_ms: float
+    sigma: float = 0.5
+    error_rate: float = 0.0  # Fraction answered with a 500
+    throttle_rate: float = 0.0  # Fraction answered with a 429
+
+    def sample(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return random.lognormvariate(0, self.sigma) * self.median_ms / 1000
+
+    async def wait(self) -> None:
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def failure(self) -> int | None:
+        """Status code to fail this call with, or None."""
+        roll = random.random()
+        if roll < self.error_rate:
+            return 500
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return None
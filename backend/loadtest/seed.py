@@ -0,0 +1,115 @@
+"""Write a catalog of realistic puzzles into the fake S3 root.
+
+Usage:
+    python -m loadtest.seed --root loadtest-s3 --bucket loadtest --days 30
+
+Today's puzzle (New York date, as the app resolves it) and the N-1 days
+before it are written with full-size answer and variant vectors from
+loadtest/vectors.py, hints and a guided hint, and listed in the index and
+daily schedule. PUZZLES also gives the traffic generator the answers and
+typical wrong guesses to send.
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.models.puzzle import PuzzleIndex, PuzzleIndexEntry, PuzzleMetadata
+from loadtest.vectors import embed_text
+
+# (answer, synonyms, hints, wrong guesses players typically try)
+PUZZLES = [
+    ("median household income", ["household income", "median income by household", "typical household earnings"],
+     ["money", "per household", "middle value"], ["income", "wealth", "poverty rate", "gdp", "average salary"]),
+    ("population density", ["people per square mile", "density of population", "population per area"],
+     ["people", "per area", "crowding"], ["population", "urban areas", "cities", "housing density", "land area"]),
+    ("obesity rate", ["percent obese", "adult obesity", "obesity prevalence"],
+     ["health", "weight", "percent of adults"], ["diabetes", "health", "fast food", "heart disease", "bmi"]),
+    ("average annual rainfall", ["yearly precipitation", "annual precipitation", "rainfall per year"],
+     ["weather", "water", "per year"], ["rain", "humidity", "drought", "snowfall", "climate"]),
+    ("unemployment rate", ["jobless rate", "percent unemployed", "unemployment"],
+     ["jobs", "economy", "percent"], ["employment", "jobs", "labor force", "poverty", "income"]),
+    ("life expectancy", ["average lifespan", "expected years of life", "longevity"],
+     ["health", "years", "age"], ["mortality", "age", "death rate", "health care", "elderly population"]),
+    ("broadband internet access", ["households with broadband", "high speed internet", "internet access"],
+     ["technology", "households", "connection"], ["internet", "cell coverage", "wifi", "computers", "technology"]),
+    ("corn production", ["corn output", "maize production", "corn harvest"],
+     ["agriculture", "crop", "bushels"], ["corn", "farms", "agriculture", "wheat production", "soybeans"]),
+    ("median home value", ["house prices", "median house price", "home values"],
+     ["real estate", "housing", "dollars"], ["rent", "housing", "property tax", "income", "home ownership"]),
+    ("voter turnout", ["percent who voted", "election participation", "turnout rate"],
+     ["elections", "percent", "ballots"], ["election results", "republican", "democrat", "voting", "registration"]),
+]
+
+
+def build_puzzle(puzzle_id: str, answer: str, synonyms: list[str], hints: list[str]) -> PuzzleMetadata:
+    texts = [answer] + synonyms
+    variants = [{"text": t, "embedding": embed_text(t).tolist()} for t in texts]
+    return PuzzleMetadata(
+        id=puzzle_id,
+        imageUrl=f"https://example.invalid/maps/{puzzle_id}.png",
+        answer=answer,
+        maxGuesses=5,
+        similarityThreshold=0.85,
+        answerEmbedding=variants[0]["embedding"],
+        answerVariants=variants,
+        hints=hints,
+        guidedHints=[{
+            "triggerWords": answer.split()[:1],
+            "similarityRange": [0.3, 0.85],
+            "hint": f"You're close: think about how {answer.split()[0]} is measured.",
+        }],
+        sourceText="Load-test data",
+        createdAt=f"{puzzle_id}T00:00:00+00:00",
+        scheduledDate=puzzle_id,
+        inEndlessPool=True,
+    )
+
+
+def seed(root: str, bucket: str, days: int, prefix: str = "puzzles/") -> list[str]:
+    """Write `days` puzzles ending today; returns their IDs, newest first."""
+    today = datetime.now(ZoneInfo("America/New_York")).date()
+    base = os.path.join(root, bucket)
+    os.makedirs(os.path.join(base, prefix), exist_ok=True)
+
+    index = PuzzleIndex()
+    ids = []
+    for day in range(days):
+        puzzle_id = (today - timedelta(days=day)).isoformat()
+        answer, synonyms, hints, _ = PUZZLES[day % len(PUZZLES)]
+        puzzle = build_puzzle(puzzle_id, answer, synonyms, hints)
+        with open(os.path.join(base, f"{prefix}{puzzle_id}.json"), "w") as f:
+            json.dump(puzzle.model_dump(exclude_none=True), f)
+        index.puzzles.append(PuzzleIndexEntry(
+            id=puzzle_id, answer=answer, imageUrl=puzzle.imageUrl, createdAt=puzzle.createdAt,
+            inEndlessPool=True, scheduledDate=puzzle_id,
+        ))
+        index.dailySchedule[puzzle_id] = puzzle_id
+        index.endlessPool.append(puzzle_id)
+        ids.append(puzzle_id)
+
+    with open(os.path.join(base, f"{prefix}index.json"), "w") as f:
+        json.dump(index.model_dump(), f)
+    return ids
+
+
+def puzzle_for(puzzle_id: str) -> tuple:
+    """PUZZLES entry seeded under `puzzle_id`."""
+    today = datetime.now(ZoneInfo("America/New_York")).date()
+    day = (today - datetime.strptime(puzzle_id, "%Y-%m-%d").date()).days
+    return PUZZLES[day % len(PUZZLES)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed the fake S3 root with puzzles")
+    parser.add_argument("--root", default="loadtest-s3")
+    parser.add_argument("--bucket", default="loadtest")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+    ids = seed(args.root, args.bucket, args.days)
+    print(f"Seeded {len(ids)} puzzles ({ids[-1]} .. {ids[0]}) into {args.root}/{args.bucket}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Run the whole load test offline: fakes, seeded data, the app, then traffic.
+
+Usage (from backend/):
+    python -m loadtest.stack --players 500 --ramp 20
+    python -m loadtest.stack --workers 4 --embed-ms 150 --sigma 0.8 --error-rate 0.02 --json report.json
+
+Starts the fake OpenAI and S3 servers, seeds a temporary S3 root and
+SQLite database, launches the app with uvicorn pointed at them (rate
+limiting off, since every player comes from one address), runs the
+traffic generator, prints the report and shuts everything down.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from loadtest import fake_openai, fake_s3, traffic
+from loadtest.seed import seed
+
+BUCKET = "loadtest"
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+def _spawn(args: list[str], env: dict | None = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], env={**os.environ, **(env or {})})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test of the backend")
+    parser.add_argument("--app-port", type=int, default=8900)
+    parser.add_argument("--openai-port", type=int, default=8901)
+    parser.add_argument("--s3-port", type=int, default=8902)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--days", type=int, default=30, help="Puzzles to seed")
+    parser.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra setting for the app, e.g. EMBEDDING_DIMENSIONS=256 (repeatable)")
+    fake_openai.add_arguments(parser)
+    fake_s3.add_arguments(parser)
+    traffic.add_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    s3_root = os.path.join(workdir, "s3")
+    ids = seed(s3_root, BUCKET, args.days)
+    print(f"Seeded {len(ids)} puzzles in {s3_root}; today's is {ids[0]}")
+
+    common = [
+        "--embed-ms", str(args.embed_ms), "--chat-ms", str(args.chat_ms), "--sigma", str(args.sigma),
+        "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+    ]
+    app_env = {
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.openai_port}/v1",
+        "S3_ENDPOINT_URL": f"http://127.0.0.1:{args.s3_port}",
+        "S3_BUCKET_NAME": BUCKET,
+        "AWS_ACCESS_KEY_ID": "loadtest",
+        "AWS_SECRET_ACCESS_KEY": "loadtest",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    for item in args.app_env:
+        name, _, value = item.partition("=")
+        app_env[name] = value
+
+    processes = [
+        _spawn(["-m", "loadtest.fake_openai", "--port", str(args.openai_port), *common]),
+        _spawn(["-m", "loadtest.fake_s3", "--port", str(args.s3_port), "--root", s3_root,
+                "--get-ms", str(args.get_ms), "--put-ms", str(args.put_ms)]),
+    ]
+    try:
+        subprocess.run([sys.executable, "-m", "app.db.migrate"], env={**os.environ, **app_env}, check=True)
+        processes.append(_spawn([
+            "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.app_port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ], app_env))
+        for port in (args.openai_port, args.s3_port, args.app_port):
+            _wait_ready(f"http://127.0.0.1:{port}/docs")
+        traffic.run_from_args(f"http://127.0.0.1:{args.app_port}", args)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+    print(f"Work files left in {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Async traffic generator modelling the midnight release spike.
+
+Usage:
+    python -m loadtest.traffic --base-url http://127.0.0.1:8000 --players 500 --ramp 20
+
+Players arrive over `--ramp` seconds, front-loaded like the rush after a new
+puzzle goes live. Each one fetches /api/puzzle, guesses until solved or out
+of guesses (popular wrong guesses first, the answer or a synonym more likely
+as attempts go on), sometimes takes a hint, then checks their stats and the
+puzzle's. Latency is reported per endpoint as throughput and p50/p95/p99.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+from loadtest.seed import puzzle_for
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+    failures: int = 0  # Transport errors and 5xx
+
+    def add(self, seconds: float, status: int | None) -> None:
+        self.latencies.append(seconds)
+        if status is None or status >= 500:
+            self.failures += 1
+        if status is not None:
+            self.statuses[status] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(q: float) -> float:
+            return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 1) if ordered else 0.0
+
+        return {
+            "requests": len(ordered),
+            "failures": self.failures,
+            "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+            "p50Ms": pct(0.50),
+            "p95Ms": pct(0.95),
+            "p99Ms": pct(0.99),
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class TrafficGenerator:
+    def __init__(self, base_url: str, players: int, ramp: float, think: float, hint_rate: float):
+        self.base_url = base_url.rstrip("/")
+        self.players = players
+        self.ramp = ramp
+        self.think = think
+        self.hint_rate = hint_rate
+        self.stats: dict[str, EndpointStats] = defaultdict(EndpointStats)
+
+    async def _call(self, client: httpx.AsyncClient, name: str, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.stats[name].add(time.perf_counter() - start, None)
+            return None
+        self.stats[name].add(time.perf_counter() - start, response.status_code)
+        return response
+
+    async def _pause(self) -> None:
+        if self.think > 0:
+            await asyncio.sleep(random.expovariate(1 / self.think))
+
+    @staticmethod
+    def _pick_guess(attempt: int, answer: str, synonyms: list[str], wrong: list[str]) -> str:
+        # Popular wrong guesses are shared across players (cache and verdict-store
+        # hits); a few are unique so the embedding path stays busy too
+        if random.random() < 0.15 + 0.15 * attempt:
+            return random.choice([answer] + synonyms)
+        if random.random() < 0.2:
+            return f"{random.choice(wrong)} {random.randint(1, 10_000)}"
+        weights = [1 / (rank + 1) for rank in range(len(wrong))]
+        return random.choices(wrong, weights=weights)[0]
+
+    async def _player(self, client: httpx.AsyncClient, delay: float) -> None:
+        await asyncio.sleep(delay)
+        response = await self._call(client, "GET /api/puzzle", "GET", "/api/puzzle")
+        if response is None or response.status_code != 200:
+            return
+        puzzle_id = response.json()["id"]
+        headers = {"X-Player-ID": response.headers.get("X-Player-ID") or f"lt_{random.getrandbits(64):x}"}
+        answer, synonyms, _hints, wrong = puzzle_for(puzzle_id)
+        took_hint = False
+
+        for attempt in range(10):
+            await self._pause()
+            if not took_hint and attempt == 2 and random.random() < self.hint_rate:
+                took_hint = True
+                await self._call(client, "GET /api/puzzle/{id}/hint", "GET",
+                                 f"/api/puzzle/{puzzle_id}/hint", headers=headers)
+                continue
+            guess = self._pick_guess(attempt, answer, synonyms, wrong)
+            response = await self._call(client, "POST /api/puzzle/{id}/guess", "POST",
+                                        f"/api/puzzle/{puzzle_id}/guess", json={"guess": guess}, headers=headers)
+            if response is None or response.status_code != 200:
+                break
+            if response.json().get("gameOver"):
+                break
+
+        await self._call(client, "GET /api/player/stats", "GET", "/api/player/stats", headers=headers)
+        await self._call(client, "GET /api/puzzle/{id}/stats", "GET", f"/api/puzzle/{puzzle_id}/stats")
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=max(self.players, 10), max_keepalive_connections=max(self.players, 10))
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30.0) as client:
+            # Front-loaded arrivals: half the players show up in the first quarter of the ramp
+            delays = [self.ramp * random.random() ** 2 for _ in range(self.players)]
+            started = time.perf_counter()
+            await asyncio.gather(*(self._player(client, d) for d in delays))
+            elapsed = time.perf_counter() - started
+        return {
+            "players": self.players,
+            "elapsedSeconds": round(elapsed, 2),
+            "endpoints": {name: s.summary(elapsed) for name, s in sorted(self.stats.items())},
+        }
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['players']} players in {report['elapsedSeconds']}s")
+    print(f"{'endpoint':34} {'reqs':>7} {'fail':>5} {'rps':>7} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}  statuses")
+    for name, s in report["endpoints"].items():
+        statuses = " ".join(f"{code}:{n}" for code, n in s["statuses"].items())
+        print(f"{name:34} {s['requests']:>7} {s['failures']:>5} {s['rps']:>7} "
+              f"{s['p50Ms']:>8} {s['p95Ms']:>8} {s['p99Ms']:>8}  {statuses}")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--players", type=int, default=300)
+    parser.add_argument("--ramp", type=float, default=20.0, help="Seconds over which players arrive")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean seconds between a player's actions")
+    parser.add_argument("--hint-rate", type=float, default=0.3, help="Fraction of players taking a hint")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+
+
+def run_from_args(base_url: str, args: argparse.Namespace) -> dict:
+    generator = TrafficGenerator(base_url, args.players, args.ramp, args.think, args.hint_rate)
+    report = asyncio.run(generator.run())
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Release-spike traffic against a running backend")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    add_arguments(parser)
+    args = parser.parse_args()
+    run_from_args(args.base_url, args)
+
+
+if __name__ == "__main__":
+    main()
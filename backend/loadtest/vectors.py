@@ -0,0 +1,42 @@
+"""Deterministic stand-in embeddings shared by the fake OpenAI server and the seeder.
+
+A text's vector is the normalised sum of one fixed random vector per word,
+plus a little per-text noise. Texts sharing words score high against each
+other and unrelated ones near zero, which is enough to exercise every
+verdict path (fuzzy, threshold, LLM floor) with realistic-looking vectors.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+import numpy as np
+
+FULL_DIMENSIONS = 1536  # text-embedding-3-small
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+@lru_cache(maxsize=50_000)
+def _word_vector(word: str) -> np.ndarray:
+    return np.random.default_rng(_seed(word)).standard_normal(FULL_DIMENSIONS).astype(np.float32)
+
+
+def embed_text(text: str, dimensions: int = 0) -> np.ndarray:
+    """Unit float32 vector for `text`, shortened like text-embedding-3 when `dimensions` is set."""
+    words = _WORD.findall(text.lower()) or [text.lower()]
+    vector = np.sum([_word_vector(w) for w in words], axis=0)
+    vector += 0.15 * np.random.default_rng(_seed("text:" + text)).standard_normal(FULL_DIMENSIONS)
+    if dimensions:
+        vector = vector[:dimensions]
+    return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+
+def word_overlap(a: str, b: str) -> float:
+    """Jaccard overlap of the words of two texts (the fake LLM's judgement)."""
+    wa, wb = set(_WORD.findall(a.lower())), set(_WORD.findall(b.lower()))
+    if not wa or not wb:
+        return 0.0
+    return len(wa & wb) / len(wa | wb)
@@ -0,0 +1,97 @@
+"""The app under test, wired to the load-test S3 and OpenAI stand-ins.
+
+The stand-ins (loadtest/fake_s3.py, loadtest/fake_openai.py) run as local
+servers with no added latency, so every boto3 call and SQL statement the
+app makes is real and accounted by CallBudgetMiddleware. Settings are read
+once, so the environment is set here, before the app is imported.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import pytest
+
+from loadtest.seed import seed
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = "tests"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_workdir = tempfile.mkdtemp(prefix="backend-tests-")
+_openai_port, _s3_port = _free_port(), _free_port()
+os.environ.update({
+    "OPENAI_API_KEY": "sk-test",
+    "OPENAI_BASE_URL": f"http://127.0.0.1:{_openai_port}/v1",
+    "S3_ENDPOINT_URL": f"http://127.0.0.1:{_s3_port}",
+    "S3_BUCKET_NAME": BUCKET,
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "DATABASE_URL": f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    "MIGRATE_ON_STARTUP": "true",
+    "RATE_LIMIT_ENABLED": "false",
+    "IO_CALLS_HEADER": "true",
+    "REDIS_URL": "",
+})
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+@pytest.fixture(scope="session")
+def puzzle_ids() -> list[str]:
+    """Seeded puzzle IDs, today's first."""
+    return seed(os.path.join(_workdir, "s3"), BUCKET, days=3)
+
+
+@pytest.fixture(scope="session")
+def stand_ins(puzzle_ids):
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "loadtest.fake_openai", "--port", str(_openai_port),
+                          "--embed-ms", "0", "--chat-ms", "0"], cwd=BACKEND),
+        subprocess.Popen([sys.executable, "-m", "loadtest.fake_s3", "--port", str(_s3_port),
+                          "--root", os.path.join(_workdir, "s3"), "--get-ms", "0", "--put-ms", "0"], cwd=BACKEND),
+    ]
+    try:
+        for port in (_openai_port, _s3_port):
+            _wait_ready(f"http://127.0.0.1:{port}/docs")
+        yield
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+@pytest.fixture(scope="session")
+def client(stand_ins):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def player() -> dict:
+    """Headers of a player the app hasn't seen yet."""
+    return {"X-Player-ID": f"test-{uuid.uuid4().hex[:12]}"}
@@ -0,0 +1,40 @@
+"""Archived attempts stay readable, and current, while the archive job keeps appending."""
+import pytest
+
+from app.config import get_settings
+from app.db import keys
+from app.db.database import get_db_session
+from app.services.archive import AttemptArchive
+
+
+@pytest.mark.parametrize("location", ["local", "s3"])
+def test_reader_sees_attempts_archived_after_its_first_read(client, puzzle_ids, player, tmp_path,
+                                                            monkeypatch, location):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "archive_location", location)
+    monkeypatch.setattr(settings, "archive_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "archive_s3_prefix", f"{tmp_path.name}/")
+    monkeypatch.setattr(settings, "archive_cache_ttl", 0.0)
+    puzzle_id = puzzle_ids[1]
+    # The job and the web worker are separate processes, each with its own cache
+    job, worker = AttemptArchive(), AttemptArchive()
+
+    def archive_now():
+        with get_db_session() as db:
+            job.archive_puzzle(db, keys.puzzle_key(db, puzzle_id))
+
+    client.post(f"/api/puzzle/{puzzle_id}/guess", json={"guess": "rainfall"}, headers=player)
+    archive_now()
+    assert [a.guess_text for a in worker.get_attempts(player["X-Player-ID"], puzzle_id)] == ["rainfall"]
+
+    client.post(f"/api/puzzle/{puzzle_id}/guess", json={"guess": "river length"}, headers=player)
+    archive_now()
+    guesses = [a.guess_text for a in worker.get_attempts(player["X-Player-ID"], puzzle_id)]
+    assert guesses == ["rainfall", "river length"]
+
+    # Unchanged since: validated, not downloaded again
+    downloads = []
+    read_raw = worker._read_raw
+    monkeypatch.setattr(worker, "_read_raw", lambda pid: downloads.append(pid) or read_raw(pid))
+    assert len(worker.get_attempts(player["X-Player-ID"], puzzle_id)) == 2
+    assert downloads == []
@@ -0,0 +1,49 @@
+"""Profile calibration: the full-precision side uses the puzzle's model, and memory is what scoring holds."""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+from app.config import get_settings
+from app.jobs import calibrate_profile
+from app.jobs.calibrate_profile import calibrate_puzzle
+from app.services.embedding import EmbeddingService
+from app.services.profiles import EmbeddingProfile
+from app.services.resilience import Upstream
+from app.services.s3 import get_s3_service
+
+
+def test_calibration_against_a_new_quantized_model(client, puzzle_ids, player, monkeypatch):
+    client.post(f"/api/puzzle/{puzzle_ids[0]}/guess", json={"guess": "rainfall"}, headers=player)
+    settings = get_settings()
+    puzzle = get_s3_service().get_puzzle(puzzle_ids[0])
+    profile = EmbeddingProfile(model="text-embedding-3-large", dimensions=256, quantized=True)
+    monkeypatch.setattr(settings, "embedding_model", profile.model)
+    monkeypatch.setattr(settings, "embedding_dimensions", profile.dimensions)
+    monkeypatch.setattr(settings, "embedding_quantize", True)
+
+    # The job runs on its own event loop, away from the app's client and limiter
+    service = EmbeddingService()
+    service.upstream = Upstream("embeddings", 4)
+    monkeypatch.setattr(calibrate_profile, "get_embedding_service", lambda: service)
+    calls = []
+    embed_batch = service.embed_batch
+
+    async def spy(texts, dimensions=None, model=None):
+        calls.append((dimensions, model or settings.embedding_model))
+        return await embed_batch(texts, dimensions=dimensions, model=model)
+
+    async def scenario():
+        service.http = SimpleNamespace(client=httpx.AsyncClient())
+        return await calibrate_puzzle(puzzle.model_copy(), profile, limit=20)
+
+    monkeypatch.setattr(service, "embed_batch", spy)
+    result = asyncio.run(scenario())
+
+    # Baseline guesses from the model the stored vectors came from, at full size
+    assert (0, puzzle.embeddingModel or settings.legacy_embedding_model) in calls
+    assert (256, "text-embedding-3-large") in calls
+    # int8 rows are stored small but widened to float32 for scoring
+    rows = len(puzzle.answerVariants or []) or 1
+    assert result["profileStoredBytes"] == rows * (256 + 4)
+    assert result["profileMatrixBytes"] == result["profileStoredBytes"] + rows * 256 * 4
@@ -0,0 +1,96 @@
+"""Every route in ROUTE_BUDGETS, on a cold puzzle cache and a new player, stays within its budget."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.call_budget import ROUTE_BUDGETS, CallBudgetMiddleware, assert_call_budget
+from app.config import get_settings
+from app.services.s3 import get_s3_service
+from loadtest.seed import puzzle_for
+
+
+@pytest.fixture
+def cold_cache(client):
+    """Empty this worker's puzzle caches, so the request pays for its S3 reads."""
+    s3 = get_s3_service()
+    s3._puzzle_cache.clear()
+    s3._active_puzzle_cache = None
+
+
+def test_every_budgeted_route_is_covered():
+    covered = {
+        "GET /api/puzzle", "GET /api/puzzle/{puzzle_id}", "POST /api/puzzle/{puzzle_id}/guess",
+        "GET /api/puzzle/{puzzle_id}/hint", "GET /api/puzzle/{puzzle_id}/attempts",
+        "GET /api/player/stats", "GET /api/puzzle/{puzzle_id}/stats",
+    }
+    assert covered == set(ROUTE_BUDGETS)
+
+
+def test_current_puzzle(client, cold_cache, player):
+    response = client.get("/api/puzzle", headers=player)
+    assert response.status_code == 200
+    assert_call_budget(response, route="GET /api/puzzle")
+
+
+def test_puzzle_by_id(client, cold_cache, puzzle_ids, player):
+    response = client.get(f"/api/puzzle/{puzzle_ids[0]}", headers=player)
+    assert response.status_code == 200
+    assert_call_budget(response, route="GET /api/puzzle/{puzzle_id}")
+
+
+def test_wrong_guess_with_guided_hint(client, cold_cache, puzzle_ids, player):
+    # Shares the word the seeded guided hint triggers on, without matching the answer
+    answer = puzzle_for(puzzle_ids[0])[0]
+    guess = f"{answer.split()[0]} rainfall totals"
+    response = client.post(f"/api/puzzle/{puzzle_ids[0]}/guess", json={"guess": guess}, headers=player)
+    assert response.status_code == 200
+    body = response.json()
+    assert not body["correct"] and body["guidedHint"] is not None
+    assert_call_budget(response, route="POST /api/puzzle/{puzzle_id}/guess")
+
+
+def test_correct_guess(client, cold_cache, puzzle_ids, player):
+    answer = puzzle_for(puzzle_ids[0])[0]
+    response = client.post(f"/api/puzzle/{puzzle_ids[0]}/guess", json={"guess": answer}, headers=player)
+    assert response.status_code == 200
+    assert response.json()["correct"]
+    assert_call_budget(response, route="POST /api/puzzle/{puzzle_id}/guess")
+
+
+def test_hint(client, cold_cache, puzzle_ids, player):
+    response = client.get(f"/api/puzzle/{puzzle_ids[0]}/hint", headers=player)
+    assert response.status_code == 200
+    assert_call_budget(response, route="GET /api/puzzle/{puzzle_id}/hint")
+
+
+def test_attempts(client, cold_cache, puzzle_ids, player):
+    client.post(f"/api/puzzle/{puzzle_ids[0]}/guess", json={"guess": "rainfall"}, headers=player)
+    response = client.get(f"/api/puzzle/{puzzle_ids[0]}/attempts", headers=player)
+    assert response.status_code == 200
+    assert_call_budget(response, route="GET /api/puzzle/{puzzle_id}/attempts")
+
+
+def test_player_stats(client, player):
+    response = client.get("/api/player/stats", headers=player)
+    assert response.status_code == 200
+    assert_call_budget(response, route="GET /api/player/stats")
+
+
+def test_puzzle_stats(client, puzzle_ids):
+    response = client.get(f"/api/puzzle/{puzzle_ids[0]}/stats")
+    assert response.status_code == 200
+    assert_call_budget(response, route="GET /api/puzzle/{puzzle_id}/stats")
+
+
+def test_io_header_is_only_for_admins_in_production(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "io_calls_header", False)
+    app = FastAPI()
+    app.add_api_route("/ping", lambda: {"ok": True})
+    app.add_middleware(CallBudgetMiddleware)
+
+    with TestClient(app) as c:
+        assert "x-io-calls" not in c.get("/ping").headers
+        assert "x-io-calls" not in c.get("/ping", headers={"X-Admin-Password": "wrong"}).headers
+        admin = c.get("/ping", headers={"X-Admin-Password": settings.admin_password})
+    assert admin.headers["x-io-calls"] == "s3=0, sql=0"
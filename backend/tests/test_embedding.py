@@ -0,0 +1,102 @@
+"""Embedding client on a fake transport: hedging a slow call, and decoding base64 float32."""
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import pytest
+
+from app.services.embedding import EmbeddingBudgetExceeded, EmbeddingService
+
+
+def _b64(values) -> str:
+    return base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii")
+
+
+class FakeOpenAI:
+    """Answers each embeddings call after its own delay, recording what happened to it."""
+
+    def __init__(self, *delays: float):
+        self.delays = list(delays)
+        self.bodies: list[dict] = []
+        self.outcomes: list[str] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        call = len(self.bodies)
+        self.bodies.append(json.loads(request.content))
+        try:
+            await asyncio.sleep(self.delays[call])
+        except asyncio.CancelledError:
+            self.outcomes.append(f"call {call} cancelled")
+            raise
+        self.outcomes.append(f"call {call} answered")
+        return httpx.Response(200, json={"data": [{"index": 0, "embedding": _b64([call, 0.5, -2.0])}]})
+
+
+def _service(fake: FakeOpenAI) -> EmbeddingService:
+    service = EmbeddingService()
+    service.http = SimpleNamespace(client=httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    return service
+
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    fake = FakeOpenAI(5.0, 0.0)
+    service = _service(fake)
+
+    async def scenario():
+        embedding = await service._embed_hedged("rainfall", budget=1.0)
+        await asyncio.sleep(0)  # Let the cancelled loser unwind
+        return embedding
+
+    embedding = asyncio.run(scenario())
+    # Sent after half the budget (no latency history yet); the hedge's answer is the one used
+    assert embedding.tolist() == [1.0, 0.5, -2.0]
+    assert fake.outcomes == ["call 1 answered", "call 0 cancelled"]
+    assert service.hedged_calls == 1
+    assert len(service.latency.samples) == 2  # The loser's time still counts towards the tail
+
+
+def test_fast_call_is_not_hedged():
+    fake = FakeOpenAI(0.0)
+    service = _service(fake)
+    embedding = asyncio.run(service._embed_hedged("rainfall", budget=1.0))
+    assert embedding.tolist() == [0.0, 0.5, -2.0]
+    assert fake.outcomes == ["call 0 answered"]
+    assert service.hedged_calls == 0
+
+
+def test_budget_runs_out_and_both_calls_are_cancelled():
+    fake = FakeOpenAI(5.0, 5.0)
+    service = _service(fake)
+
+    async def scenario():
+        try:
+            await service._embed_hedged("rainfall", budget=0.5)
+        finally:
+            await asyncio.sleep(0)
+
+    with pytest.raises(EmbeddingBudgetExceeded):
+        asyncio.run(scenario())
+    assert sorted(fake.outcomes) == ["call 0 cancelled", "call 1 cancelled"]
+    assert service.budget_exceeded == 1
+
+
+def test_batch_asks_for_base64_and_decodes_float32_in_input_order():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={"data": [
+            {"index": 1, "embedding": [0.25, 0.75]},  # A server that ignored encoding_format
+            {"index": 0, "embedding": _b64([1.5, -0.1])},
+        ]})
+
+    service = EmbeddingService()
+    service.http = SimpleNamespace(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    matrix = asyncio.run(service.embed_batch(["first", "second"], dimensions=2))
+
+    assert bodies[0]["encoding_format"] == "base64" and bodies[0]["dimensions"] == 2
+    assert matrix.dtype == np.float32
+    assert matrix.tolist() == [[1.5, np.float32(-0.1)], [0.25, 0.75]]
@@ -0,0 +1,87 @@
+"""The shared L2 cache on fakeredis: puzzle publication, read-through fills, verdicts and outages."""
+import asyncio
+
+import fakeredis
+import numpy as np
+import pytest
+
+from app.call_budget import track
+from app.models.puzzle import PuzzleMetadata
+from app.services import l2cache
+from app.services.l2cache import L2Cache
+from app.services.s3 import get_s3_service
+from app.services.verdicts import StoredVerdict
+
+
+@pytest.fixture
+def l2(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(l2cache, "get_sync_redis", lambda: fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(l2cache, "get_redis", lambda: fakeredis.FakeAsyncRedis(server=server))
+    cache = L2Cache()
+    cache.enabled = True
+    return cache
+
+
+def _puzzle(answer: str) -> PuzzleMetadata:
+    return PuzzleMetadata(id="2024-01-01", imageUrl="https://example.invalid/map.png", answer=answer,
+                          answerEmbedding=[1.0, 0.0])
+
+
+def test_read_through_fill_never_replaces_a_saved_version(l2):
+    # A read of the old version that lands after the save published the new one
+    l2.publish_puzzle(_puzzle("new answer"))
+    l2.put_puzzle(_puzzle("old answer"))
+    assert l2.get_puzzle("2024-01-01").answer == "new answer"
+
+
+def test_read_through_fill_is_short_lived(l2):
+    l2.put_puzzle(_puzzle("answer"))
+    redis = l2cache.get_sync_redis()
+    assert 0 < redis.ttl(l2._puzzle_key("2024-01-01")) <= l2.settings.l2_puzzle_fill_ttl
+    l2.publish_puzzle(_puzzle("answer"))
+    assert redis.ttl(l2._puzzle_key("2024-01-01")) > l2.settings.l2_puzzle_fill_ttl
+
+
+def test_saved_puzzle_reaches_other_workers_without_s3(client, puzzle_ids, l2, monkeypatch):
+    s3 = get_s3_service()
+    monkeypatch.setattr(s3, "l2", l2)
+    s3._puzzle_cache.clear()
+    puzzle = s3.get_puzzle(puzzle_ids[1])
+    s3.save_puzzle(PuzzleMetadata(**{**puzzle.model_dump(), "sourceText": "Edited"}))
+
+    # Another worker: nothing cached locally, so it asks the shared cache
+    s3._puzzle_cache.clear()
+    with track() as usage:
+        reloaded = asyncio.run(s3.get_puzzle_async(puzzle_ids[1]))
+    assert reloaded.sourceText == "Edited"
+    assert usage.count("s3") == 0
+
+
+def test_verdicts_and_embeddings_round_trip(l2):
+    puzzle = _puzzle("answer")
+
+    async def scenario():
+        l2.put_verdict(puzzle, "guess", StoredVerdict(is_correct=False, similarity=0.4321, llm_correct=None))
+        l2.put_embedding("guess", np.array([0.25, -0.5], dtype=np.float32))
+        await asyncio.gather(*l2._writes)
+        return await l2.get_verdict(puzzle, "guess"), await l2.get_embedding("guess")
+
+    verdict, embedding = asyncio.run(scenario())
+    assert verdict == StoredVerdict(is_correct=False, similarity=0.4321, llm_correct=None)
+    assert embedding.tolist() == [0.25, -0.5]
+
+
+def test_outage_is_a_miss_and_backs_off(l2, monkeypatch):
+    calls = 0
+
+    class Down:
+        def get(self, key):
+            nonlocal calls
+            calls += 1
+            raise ConnectionError("down")
+
+    monkeypatch.setattr(l2cache, "get_sync_redis", lambda: Down())
+    assert l2.get_puzzle("2024-01-01") is None
+    assert l2.get_puzzle("2024-01-01") is None
+    assert calls == 1  # The second lookup was skipped
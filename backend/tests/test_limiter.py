@@ -0,0 +1,79 @@
+"""Rate limiter stores: the Redis script on fakeredis, and the SQLite store under lock contention."""
+import asyncio
+import sqlite3
+import threading
+import time
+
+import fakeredis
+
+from app.limiter import Bucket, RedisStore, SQLiteStore
+
+
+def _buckets(player: str) -> list[Bucket]:
+    # 3 per player, 4 for the address, each refilled at one token per second
+    return [Bucket(f"rl:{{ip}}:/guess:{player}", 3, 1.0), Bucket("rl:{ip}:/guess", 4, 1.0)]
+
+
+def test_redis_store_limits_players_and_addresses():
+    store = RedisStore(fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer()))
+
+    async def scenario():
+        now = 1000.0
+        first = [await store.take(_buckets("a"), now) for _ in range(4)]
+        # Another player on the same address only has the address bucket's last token
+        other = [await store.take(_buckets("b"), now) for _ in range(2)]
+        later = await store.take(_buckets("a"), now + 1.0)
+        return first, other, later
+
+    first, other, later = asyncio.run(scenario())
+    assert [allowed for allowed, _ in first] == [True, True, True, False]
+    assert first[3][1] == 1.0  # Player bucket empty: one token back in a second
+    assert [allowed for allowed, _ in other] == [True, False]
+    assert later == (True, 0.0)
+
+
+def test_sqlite_store_waits_for_a_locked_database(tmp_path):
+    path = str(tmp_path / "limits.db")
+    store = SQLiteStore(path)
+    assert asyncio.run(store.take(_buckets("a"), 1000.0)) == (True, 0.0)
+
+    # Another worker process holding the write lock for a moment
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        locked.set()
+        release.wait()
+        conn.execute("COMMIT")
+        conn.close()
+
+    holder = threading.Thread(target=hold_lock, daemon=True)
+    holder.start()
+    locked.wait()
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        asyncio.get_running_loop().call_later(0.3, release.set)
+        started = time.monotonic()
+        result = await store.take(_buckets("a"), 1000.0)
+        ticker.cancel()
+        return result, time.monotonic() - started, ticks
+
+    try:
+        result, waited, ticks = asyncio.run(scenario())
+    finally:
+        release.set()
+        holder.join()
+    # The check queued behind the lock instead of failing open, and the loop kept running meanwhile
+    assert result == (True, 0.0)
+    assert waited >= 0.25
+    assert ticks >= 10
@@ -0,0 +1,97 @@
+"""The migration chain, from a database created before versioned migrations existed."""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db.migrations import (
+    SchemaOutOfDateError,
+    check_schema_version,
+    current_version,
+    latest_version,
+    upgrade,
+)
+from app.db.models import NAMED_PUZZLE_KEY_BASE
+
+
+def _legacy_database(path: str):
+    # String-keyed tables as created by the original create_all, before is_hint existed
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE user_attempts (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id VARCHAR(64) NOT NULL,
+                puzzle_date VARCHAR(10) NOT NULL,
+                guess_text VARCHAR(512) NOT NULL,
+                similarity_score FLOAT NOT NULL,
+                is_correct BOOLEAN,
+                created_at DATETIME
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE daily_game_state (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id VARCHAR(64) NOT NULL,
+                puzzle_date VARCHAR(10) NOT NULL,
+                solved BOOLEAN,
+                total_guesses INTEGER,
+                hints_revealed INTEGER
+            )
+        """))
+        conn.execute(text(
+            "INSERT INTO user_attempts (id, user_id, puzzle_date, guess_text, similarity_score, is_correct, created_at) "
+            "VALUES (1, 'p_a', '2024-03-05', 'rainfall', 0.4, 0, '2024-03-05 10:00:00.000000'), "
+            "(2, 'p_b', '2024-03-05', 'rainfall', 0.4, 0, '2024-03-05 11:00:00.000000'), "
+            "(3, 'p_a', 'bonus-rivers', 'river length', 1.0, 1, '2024-03-06 09:30:00.500000')"
+        ))
+        conn.execute(text(
+            "INSERT INTO daily_game_state (user_id, puzzle_date, solved, total_guesses, hints_revealed) "
+            "VALUES ('p_a', '2024-03-05', 0, 1, 0), ('p_a', 'bonus-rivers', 1, 1, 2)"
+        ))
+    return engine
+
+
+def test_legacy_database_upgrades_to_the_latest_version(tmp_path):
+    engine = _legacy_database(str(tmp_path / "legacy.db"))
+    assert current_version(engine) == 0
+
+    applied = upgrade(engine)
+    assert len(applied) == latest_version()
+    assert current_version(engine) == latest_version()
+    check_schema_version(engine)
+    assert upgrade(engine) == []  # A second deploy has nothing to do
+
+    with engine.connect() as conn:
+        attempts = conn.execute(text(
+            "SELECT a.id, p.public_id, a.puzzle_key, g.text, a.guess_text, a.is_hint, a.created_at "
+            "FROM user_attempts a JOIN players p ON p.id = a.player_key "
+            "LEFT JOIN guess_texts g ON g.id = a.guess_id ORDER BY a.id"
+        )).all()
+        named_key = conn.execute(text(
+            "SELECT id FROM puzzle_keys WHERE puzzle_id = 'bonus-rivers'"
+        )).scalar_one() + NAMED_PUZZLE_KEY_BASE
+        states = conn.execute(text(
+            "SELECT p.public_id, s.puzzle_key, s.solved, s.hints_revealed, s.archived "
+            "FROM daily_game_state s JOIN players p ON p.id = s.player_key ORDER BY s.puzzle_key"
+        )).all()
+        guess_texts = conn.execute(text("SELECT COUNT(*) FROM guess_texts")).scalar_one()
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar_one()
+
+    assert [tuple(row) for row in attempts] == [
+        (1, "p_a", 20240305, "rainfall", None, 0, 1709632800000),
+        (2, "p_b", 20240305, "rainfall", None, 0, 1709636400000),
+        (3, "p_a", named_key, "river length", None, 0, 1709717400500),
+    ]
+    assert guess_texts == 2  # Repeated guesses share one row
+    assert [tuple(row) for row in states] == [
+        ("p_a", 20240305, 0, 0, 0),
+        ("p_a", named_key, 1, 2, 0),
+    ]
+    assert journal_mode == "wal"
+
+
+def test_partial_upgrade_is_reported_at_boot(tmp_path):
+    engine = _legacy_database(str(tmp_path / "legacy.db"))
+    upgrade(engine, target=2)
+    assert current_version(engine) == 2
+    with pytest.raises(SchemaOutOfDateError, match="version 2"):
+        check_schema_version(engine)
@@ -0,0 +1,35 @@
+"""Precomputed guess similarities are only used under the profile they were scored with."""
+from app.config import get_settings
+from app.models.puzzle import PuzzleMetadata
+from app.services.precompute import precomputed_similarity
+from app.services.profiles import guess_profile
+
+
+def _puzzle(**fields) -> PuzzleMetadata:
+    return PuzzleMetadata(id="2024-01-01", imageUrl="https://example.invalid/map.png", answer="median income",
+                          answerEmbedding=[1.0, 0.0], precomputedGuesses=[{"text": "wages", "similarity": 0.61}],
+                          **fields)
+
+
+def test_table_is_used_under_its_own_profile(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "embedding_dimensions", 256)
+    puzzle = _puzzle(precomputedProfile=guess_profile().key)
+    assert precomputed_similarity(puzzle, "wages") == 0.61
+    assert precomputed_similarity(puzzle, "salary") is None
+
+    # Guesses now embedded at another size: the scores no longer apply
+    monkeypatch.setattr(settings, "embedding_dimensions", 512)
+    assert precomputed_similarity(puzzle, "wages") is None
+
+
+def test_table_without_a_profile_needs_full_size_legacy_settings(monkeypatch):
+    settings = get_settings()
+    puzzle = _puzzle()
+    assert precomputed_similarity(puzzle, "wages") == 0.61
+
+    monkeypatch.setattr(settings, "embedding_dimensions", 256)
+    assert precomputed_similarity(puzzle, "wages") is None
+    monkeypatch.setattr(settings, "embedding_dimensions", 0)
+    monkeypatch.setattr(settings, "embedding_model", "text-embedding-3-large")
+    assert precomputed_similarity(puzzle, "wages") is None
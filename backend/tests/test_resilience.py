@@ -0,0 +1,124 @@
+"""Circuit breaker transitions, and guesses falling back to the fuzzy match when embeddings fail."""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.models.puzzle import PuzzleMetadata
+from app.services.embedding import EmbeddingService
+from app.services.evaluation import GuessEvaluator
+from app.services.llm import LLMService
+from app.services.resilience import CircuitBreaker, CircuitOpenError, Upstream
+
+
+def _age(breaker: CircuitBreaker) -> None:
+    """As if breaker_open_seconds had passed since it opened."""
+    breaker.opened_at -= breaker.settings.breaker_open_seconds
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test")
+    for _ in range(breaker.settings.breaker_min_calls):
+        breaker.record(breaker.before_call(), False, 0.01)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_breaker_opens_on_errors_and_refuses_calls():
+    breaker = CircuitBreaker("test")
+    for _ in range(breaker.settings.breaker_min_calls - 1):
+        breaker.record(breaker.before_call(), False, 0.01)
+    assert breaker.state == CircuitBreaker.CLOSED  # Too few calls to judge yet
+
+    breaker.record(breaker.before_call(), False, 0.01)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker("test")
+    for _ in range(breaker.settings.breaker_min_calls):
+        breaker.record(breaker.before_call(), True, breaker.settings.breaker_slow_call_seconds)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probes_close_the_breaker():
+    breaker = _open_breaker()
+    _age(breaker)
+    probes = [breaker.before_call() for _ in range(breaker.settings.breaker_half_open_probes)]
+    assert breaker.state == CircuitBreaker.HALF_OPEN and all(probes)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Only so many probes at once
+
+    for probe in probes:
+        breaker.record(probe, True, 0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = _open_breaker()
+    _age(breaker)
+    breaker.record(breaker.before_call(), False, 0.01)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_refused_probe_gives_its_place_back():
+    breaker = _open_breaker()
+    _age(breaker)
+    for _ in range(breaker.settings.breaker_half_open_probes):
+        breaker.release(breaker.before_call())
+    assert breaker.before_call() is True
+
+
+def _evaluator(handler) -> tuple[GuessEvaluator, EmbeddingService, list]:
+    requests = []
+
+    async def record(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return handler(request)
+
+    embedding = EmbeddingService()
+    embedding.http = SimpleNamespace(client=httpx.AsyncClient(transport=httpx.MockTransport(record)))
+    embedding.upstream = Upstream("embeddings", 4)  # Not the app's shared breaker
+    return GuessEvaluator(embedding, LLMService()), embedding, requests
+
+
+def _puzzle() -> PuzzleMetadata:
+    return PuzzleMetadata(id="2024-01-01", imageUrl="https://example.invalid/map.png",
+                          answer="median household income", answerEmbedding=[1.0, 0.0, 0.0],
+                          embeddingModel=get_settings().embedding_model, similarityMode="embedding")
+
+
+def _overloaded(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(503, json={"error": "overloaded"})
+
+
+def _refused(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("refused", request=request)
+
+
+@pytest.mark.parametrize("failure", [_overloaded, _refused])
+def test_upstream_errors_degrade_to_the_fuzzy_match(failure):
+    evaluator, embedding, requests = _evaluator(failure)
+    verdict = asyncio.run(evaluator.evaluate(_puzzle(), "median income", budget=1.0))
+
+    assert verdict.degraded and not verdict.is_correct
+    assert verdict.similarity == evaluator.fuzzy_score(_puzzle(), "median income")
+    # The first call failed early, so the hedge went out at once; both count against the breaker
+    assert len(requests) == 2
+    assert [ok for ok, _ in embedding.upstream.breaker.outcomes] == [False, False]
+
+
+def test_open_breaker_degrades_without_calling_out():
+    evaluator, embedding, requests = _evaluator(lambda request: httpx.Response(200))
+    embedding.upstream.breaker._open()
+    verdict = asyncio.run(evaluator.evaluate(_puzzle(), "rainfall", budget=1.0))
+    assert verdict.degraded
+    assert requests == []
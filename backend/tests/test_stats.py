@@ -0,0 +1,38 @@
+"""Puzzle stats: wrong-guess publication rules and the stats route's database read."""
+import asyncio
+
+from app.services.stats import PuzzleAggregate, get_stats_service, normalize_wrong_guess
+
+
+def test_wrong_guesses_are_normalised_and_need_several_players():
+    agg = PuzzleAggregate(top_k_capacity=50)
+    for _ in range(3):
+        agg.record_guess("  GDP <script>  per   capita ", 0.4, False)
+    agg.record_guess("visit example.com/x?y=1 " + "z" * 80, 0.1, False)
+    agg.record_guess("median income", 1.0, True)
+
+    summary = agg.summary(top_k=10, min_count=3)
+    assert summary["topWrongGuesses"] == [{"guess": "gdp script per capita", "count": 3}]
+    assert len(normalize_wrong_guess("x" * 100)) == 40
+
+
+def test_stats_route_reads_the_database_off_the_event_loop(client, puzzle_ids, monkeypatch):
+    stats = get_stats_service()
+    stats._summaries.clear()
+    seen = []
+    real = stats.get_summary
+
+    def spy(puzzle_id):
+        try:
+            asyncio.get_running_loop()
+            seen.append("event loop")
+        except RuntimeError:
+            seen.append("thread")
+        return real(puzzle_id)
+
+    monkeypatch.setattr(stats, "get_summary", spy)
+    first = client.get(f"/api/puzzle/{puzzle_ids[2]}/stats")
+    second = client.get(f"/api/puzzle/{puzzle_ids[2]}/stats")
+    assert first.status_code == second.status_code == 200
+    # The miss went through a worker thread; the hit never left the loop
+    assert seen == ["thread"]
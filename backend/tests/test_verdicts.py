@@ -0,0 +1,60 @@
+"""The verdict store: exact reuse, nearest-neighbour reuse of LLM verdicts, and the ring."""
+import numpy as np
+
+from app.models.puzzle import PuzzleMetadata
+from app.services.verdicts import PuzzleVerdicts, StoredVerdict, VerdictStore
+
+
+def _puzzle(answer: str = "median income") -> PuzzleMetadata:
+    return PuzzleMetadata(id="2024-01-01", imageUrl="https://example.invalid/map.png", answer=answer,
+                          answerEmbedding=[1.0, 0.0, 0.0])
+
+
+def _near(angle: float) -> list[float]:
+    """A vector at `angle` radians from (1, 0, 0), deliberately not unit length."""
+    return [3.0 * np.cos(angle), 3.0 * np.sin(angle), 0.0]
+
+
+def test_nearest_llm_verdict_reuses_the_closest_judged_guess():
+    store = VerdictStore()
+    puzzle = _puzzle()
+    store.add(puzzle, "household income", _near(0.0), StoredVerdict(False, 0.8, llm_correct=True))
+    store.add(puzzle, "income median", _near(0.1), StoredVerdict(False, 0.8, llm_correct=False))
+    store.add(puzzle, "wages", _near(0.05), StoredVerdict(False, 0.5))  # Never sent to the LLM
+
+    # All three are within epsilon (0.02, about 0.2 rad); the closest one lends its verdict
+    assert store.nearest_llm_verdict(puzzle, _near(0.01)) is True
+    # Closest stored guess is "wages", which has no LLM verdict, so the next one counts
+    assert store.nearest_llm_verdict(puzzle, _near(0.06)) is False
+    # Nothing within epsilon
+    assert store.nearest_llm_verdict(puzzle, _near(1.0)) is None
+    assert store.nearest_llm_verdict(puzzle, [0.0, 0.0, 0.0]) is None
+
+    assert store.exact(puzzle, "wages") == StoredVerdict(False, 0.5)
+    assert store.exact(puzzle, "salary") is None
+
+
+def test_verdicts_are_dropped_when_the_puzzle_changes():
+    store = VerdictStore()
+    store.add(_puzzle(), "household income", _near(0.0), StoredVerdict(False, 0.8, llm_correct=True))
+    edited = _puzzle("household income")
+    assert store.exact(edited, "household income") is None
+    assert store.nearest_llm_verdict(edited, _near(0.0)) is None
+
+
+def test_ring_overwrites_the_oldest_guess():
+    ring = PuzzleVerdicts(capacity=2)
+    unit = np.array([1.0, 0.0], dtype=np.float32)
+    for i, text in enumerate(["a", "b", "c"]):
+        ring.add(text, unit, StoredVerdict(False, 0.1 * i, llm_correct=bool(i % 2)))
+
+    assert ring.exact("a") is None
+    assert ring.exact("b").similarity == 0.1
+    assert ring.exact("c").similarity == 0.2
+    assert ring.size == 2
+
+    # A different embedding size (the model changed) starts the ring over
+    ring.add("d", np.array([0.0, 1.0, 0.0], dtype=np.float32), StoredVerdict(True, 1.0, llm_correct=True))
+    assert ring.exact("b") is None
+    assert ring.size == 1
+    assert ring.nearest_llm_verdict(unit, 0.9) is None
@@ -31,6 +31,7 @@ interface PuzzleDetails {
   inEndlessPool: boolean;
   scheduledDate: string | null;
   answerVariants: string[];
+  variantAliases?: string[];
 }
 
 interface Props {
@@ -420,7 +421,9 @@ export default function CalendarView({ password }: Props) {
       setEditForm({
         answer: data.answer,
         hints: JSON.stringify(data.hints),
-        synonyms: JSON.stringify(data.answerVariants.filter(v => v.toLowerCase() !== data.answer.toLowerCase())),
+        synonyms: JSON.stringify(
+          [...data.answerVariants, ...(data.variantAliases ?? [])].filter(v => v.toLowerCase() !== data.answer.toLowerCase())
+        ),
         maxGuesses: data.maxGuesses,
         similarityThreshold: data.similarityThreshold,
         similarityMode: data.similarityMode || "embedding",